@@ -3,15 +3,24 @@
 Add External ID values from Excel to CSV files for proper upsert.
 """
 
+import argparse
+import os
+import sys
 import pandas as pd
 from pathlib import Path
 
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.sheet_fingerprints import combine, file_digest, fingerprint_store
+
 class ExternalIdMapper:
-    def __init__(self):
+    def __init__(self, force=False):
         self.excel_file = Path('data/Revenue_Cloud_Complete_Upload_Template.xlsx')
         self.csv_dir = Path('data/csv_final_output')
         self.output_dir = Path('data/csv_with_external_ids')
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.force = force
         
     def add_external_ids(self):
         """Add External ID values from Excel to CSV files."""
@@ -32,9 +41,24 @@ class ExternalIdMapper:
             ('25_ProductRelatedComponent', '25_ProductRelatedComponent.csv', 'External_ID__c', None),
         ]
         
+        # Sheets and CSVs unchanged since their output was written are skipped
+        fingerprints = fingerprint_store(self.excel_file)
+        sheet_roots = {name: fp.root for name, fp in
+                       fingerprints.sheet_fingerprints([m[0] for m in mappings]).items()}
+        target = str(self.output_dir.resolve())
+        consumed = {} if self.force else fingerprints.consumed('external_ids', target)
+        
         for sheet_name, csv_file, excel_col, sf_field in mappings:
             print(f"\n{sheet_name}:")
             
+            csv_path = self.csv_dir / csv_file
+            if sheet_name in sheet_roots and csv_path.exists():
+                digest = combine(sheet_roots[sheet_name], file_digest(csv_path))
+                previous = consumed.get(sheet_name)
+                if previous and previous['digest'] == digest and (self.output_dir / csv_file).exists():
+                    print(f"  ✓ Unchanged since the last run")
+                    continue
+            
             # Read Excel sheet
             try:
                 excel_df = pd.read_excel(self.excel_file, sheet_name=sheet_name)
@@ -43,7 +67,6 @@ class ExternalIdMapper:
                 continue
             
             # Read CSV file
-            csv_path = self.csv_dir / csv_file
             if not csv_path.exists():
                 print(f"  ⚠️  CSV file not found")
                 continue
@@ -94,6 +117,7 @@ class ExternalIdMapper:
             
             # Save updated CSV
             csv_df.to_csv(self.output_dir / csv_file, index=False)
+            fingerprints.record_consumed('external_ids', target, sheet_name, digest)
             print(f"  ✓ Saved to {self.output_dir / csv_file}")
         
         # Copy files that don't need External IDs
@@ -111,7 +135,9 @@ class ExternalIdMapper:
         print(f"\n✓ All files processed and saved to: {self.output_dir}")
 
 def main():
-    mapper = ExternalIdMapper()
+    parser = argparse.ArgumentParser(description='Add External ID values from the workbook to CSV files')
+    parser.add_argument('--force', action='store_true', help='Process sheets even if unchanged since the last run')
+    mapper = ExternalIdMapper(parser.parse_args().force)
     mapper.add_external_ids()
 
 if __name__ == '__main__':
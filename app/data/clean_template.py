@@ -4,14 +4,30 @@ Clean up the Revenue Cloud Complete Upload Template by removing hardcoded IDs
 and making it a proper template for reuse.
 """
 
+import argparse
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 
-def clean_template():
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.sheet_fingerprints import combine, fingerprint_store
+
+def clean_template(force=False):
     input_file = Path('data/Revenue_Cloud_Complete_Upload_Template.xlsx')
     output_file = Path('data/Revenue_Cloud_Clean_Template.xlsx')
     
+    # The whole template is rewritten, so skip only when no sheet changed since the last run
+    fingerprints = fingerprint_store(input_file)
+    digest = combine({name: fp.root for name, fp in fingerprints.sheet_fingerprints().items()})
+    target = str(output_file.resolve())
+    previous = fingerprints.consumed('clean_template', target).get('*')
+    if not force and previous and previous['digest'] == digest and output_file.exists():
+        print(f"✓ No sheet changed since {output_file} was written, nothing to clean")
+        return
+    
     # Load all sheets
     xl_file = pd.ExcelFile(input_file)
     
@@ -149,6 +165,7 @@ def clean_template():
         for sheet_name, df in cleaned_sheets.items():
             df.to_excel(writer, sheet_name=sheet_name, index=False)
     
+    fingerprints.record_consumed('clean_template', target, '*', digest)
     print(f"\nTemplate cleaned successfully!")
     print(f"Output saved to: {output_file}")
     
@@ -188,4 +205,6 @@ def clean_template():
         f.write(summary)
 
 if __name__ == '__main__':
-    clean_template()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Create a reusable template without hardcoded Ids')
+    parser.add_argument('--force', action='store_true', help='Clean even if no sheet changed since the last run')
+    clean_template(parser.parse_args().force)
\ No newline at end of file
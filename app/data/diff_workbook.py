@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Preview what an upsert of a workbook sheet would change in an org.
+Rows are classified as insert, update (with the changed fields), unchanged or duplicate;
+org records no row matches are listed as orphaned.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.diff_engine import diff_workbook_sheet
+
+def print_diff(result, limit):
+    counts = result['counts']
+    print(f"{result['object']} ({result['sheet']}) vs {result['org']}, key {result['key_field'] or 'Id'}:")
+    print(f"  {counts['insert']} insert, {counts['update']} update, {counts['unchanged']} unchanged, "
+          f"{counts['orphaned']} orphaned, {counts['duplicate']} duplicate  ({result['seconds']}s)")
+
+    if result['inserts']:
+        print("\nInserts:")
+        for row in result['inserts'][:limit]:
+            print(f"  Row {row['row']}: {row['key'] or row.get('id') or '(no key)'}")
+    if result['updates']:
+        print("\nUpdates:")
+        for row in result['updates'][:limit]:
+            print(f"  Row {row['row']} ({row['id']}):")
+            for field, change in row['changes'].items():
+                print(f"    {field}: {change['old']!r} -> {change['new']!r}")
+    if result['orphaned']:
+        print("\nIn the org but not in the sheet:")
+        for record in result['orphaned'][:limit]:
+            print(f"  {record['id']} {record['key'] or ''}")
+    if result['duplicates']:
+        print("\n⚠️  Rows matching a record an earlier row already matched:")
+        for row in result['duplicates'][:limit]:
+            print(f"  Row {row['row']} (same record as row {row['first_row']})")
+
+def main():
+    parser = argparse.ArgumentParser(description='Diff a workbook sheet against an org (dry-run upsert)')
+    parser.add_argument('--org', required=True, help='Salesforce org alias')
+    parser.add_argument('--object', required=True, help='Object API name')
+    parser.add_argument('--workbook', default='data/Revenue_Cloud_Complete_Upload_Template.xlsx', help='Workbook path')
+    parser.add_argument('--sheet', help='Sheet name (default: the object\'s sheet)')
+    parser.add_argument('--key', help='External id field to match on when a row has no Id')
+    parser.add_argument('--refresh', action='store_true', help='Re-query the org instead of using the cached snapshot')
+    parser.add_argument('--limit', type=int, default=50, help='Rows listed per category')
+    parser.add_argument('--json', action='store_true', help='Print the full result as JSON')
+    args = parser.parse_args()
+
+    result = diff_workbook_sheet(args.org, args.object, args.workbook, sheet_name=args.sheet,
+                                 key_field=args.key, refresh=args.refresh,
+                                 limit=None if args.json else args.limit)
+    if not result['success']:
+        print(f"Error: {result['error']}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(result, indent=2, default=str))
+    else:
+        print_diff(result, args.limit)
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,20 @@ maintaining the same formatting and sheet names.
 
 import subprocess
 import json
+import os
+import sys
 import pandas as pd
 from pathlib import Path
 import openpyxl
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from datetime import datetime
 
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.salesforce_client import get_client, SalesforceApiError
+from app.services.reference_resolver import resolve_references
+
 class CompleteOrgExporter:
     def __init__(self):
         self.workbook_path = Path('data/Revenue_Cloud_Complete_Upload_Template.xlsx')
@@ -113,7 +121,17 @@ class CompleteOrgExporter:
         else:
             query += " ORDER BY Id"
         
-        # Execute query
+        # Execute query, in-process when possible
+        client = get_client(self.target_org)
+        if client:
+            try:
+                records = client.query(query)
+                for record in records:
+                    record.pop('attributes', None)
+                return records
+            except SalesforceApiError as e:
+                print(f"  ⚠️  API query failed ({str(e)}), retrying with sf CLI")
+        
         cmd = [
             'sf', 'data', 'query',
             '--query', query,
@@ -233,77 +251,13 @@ class CompleteOrgExporter:
         print(f"✓ Workbook saved: {self.workbook_path}")
         
     def add_product_references(self, wb):
-        """Add Product2.Name and ProductCode to relevant sheets."""
+        """Add Product2.Name and ProductCode (and other lookup names) to relevant sheets."""
         print("\n" + "-" * 50)
         print("Adding Product references...")
         
-        # First, get Product2 data
-        product_data = {}
-        if '13_Product2' in wb.sheetnames:
-            ws_product = wb['13_Product2']
-            
-            # Find column indices
-            id_col = None
-            name_col = None
-            code_col = None
-            
-            for col in range(1, ws_product.max_column + 1):
-                header = ws_product.cell(row=1, column=col).value
-                if header:
-                    if header.replace('*', '').strip() == 'Id':
-                        id_col = col
-                    elif header.replace('*', '').strip() == 'Name':
-                        name_col = col
-                    elif header.replace('*', '').strip() == 'ProductCode':
-                        code_col = col
-            
-            if id_col and name_col and code_col:
-                for row in range(2, ws_product.max_row + 1):
-                    product_id = ws_product.cell(row=row, column=id_col).value
-                    if product_id:
-                        product_data[product_id] = {
-                            'Name': ws_product.cell(row=row, column=name_col).value,
-                            'ProductCode': ws_product.cell(row=row, column=code_col).value
-                        }
-        
-        # Update PricebookEntry sheet
-        if '20_PricebookEntry' in wb.sheetnames:
-            ws_pbe = wb['20_PricebookEntry']
-            self.update_sheet_with_product_refs(ws_pbe, product_data, 'Product2Id')
-            print("  ✓ Updated PricebookEntry with Product names")
-        
-        # Update ProductAttributeDef sheet
-        if '17_ProductAttributeDef' in wb.sheetnames:
-            ws_pad = wb['17_ProductAttributeDef']
-            self.update_sheet_with_product_refs(ws_pad, product_data, 'ProductId')
-            print("  ✓ Updated ProductAttributeDef with Product names")
-    
-    def update_sheet_with_product_refs(self, ws, product_data, id_field_name):
-        """Update a sheet with Product2 Name and ProductCode."""
-        # Find column indices
-        id_col = None
-        name_col = None
-        code_col = None
-        
-        for col in range(1, ws.max_column + 1):
-            header = ws.cell(row=1, column=col).value
-            if header:
-                clean_header = header.replace('*', '').strip()
-                if clean_header == id_field_name:
-                    id_col = col
-                elif clean_header == 'Product2.Name':
-                    name_col = col
-                elif clean_header == 'Product2.ProductCode':
-                    code_col = col
-        
-        if id_col and (name_col or code_col):
-            for row in range(2, ws.max_row + 1):
-                product_id = ws.cell(row=row, column=id_col).value
-                if product_id and product_id in product_data:
-                    if name_col:
-                        ws.cell(row=row, column=name_col).value = product_data[product_id]['Name']
-                    if code_col:
-                        ws.cell(row=row, column=code_col).value = product_data[product_id]['ProductCode']
+        filled = resolve_references(wb)
+        for sheet_name, count in filled.items():
+            print(f"  ✓ Updated {sheet_name} ({count} reference values)")
 
 def main():
     exporter = CompleteOrgExporter()
@@ -5,11 +5,19 @@ Export all Revenue Cloud objects with correct field names.
 
 import subprocess
 import json
+import os
+import sys
 import pandas as pd
 from pathlib import Path
 import openpyxl
 from datetime import datetime
 
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.describe_cache import describe_cache
+from app.services.reference_resolver import resolve_references
+
 class CompleteOrgExporter:
     def __init__(self):
         self.workbook_path = Path('data/Revenue_Cloud_Complete_Upload_Template.xlsx')
@@ -17,22 +25,9 @@ class CompleteOrgExporter:
         
     def get_available_fields(self, object_name):
         """Get list of available fields for an object."""
-        cmd = [
-            'sf', 'sobject', 'describe',
-            '--sobject', object_name,
-            '--target-org', self.target_org,
-            '--json'
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            if 'result' in data and 'fields' in data['result']:
-                fields = data['result']['fields']
-                # Return field names that are accessible
-                return [f['name'] for f in fields if not f['name'].startswith('System')]
-        return []
+        # Return field names that are accessible
+        return [name for name in describe_cache.field_names(self.target_org, object_name)
+                if not name.startswith('System')]
     
     def query_all_fields(self, object_name, sheet_headers):
         """Query object with fields that match sheet headers."""
@@ -199,74 +194,13 @@ class CompleteOrgExporter:
         print(f"✓ Workbook saved: {self.workbook_path}")
         
     def update_product_references(self, wb):
-        """Update sheets with Product2 references."""
+        """Update sheets with Product2 (and other lookup) references."""
         print("\n" + "-" * 50)
         print("Updating Product references...")
         
-        # Get Product2 data
-        product_map = {}
-        if '13_Product2' in wb.sheetnames:
-            ws = wb['13_Product2']
-            
-            # Find columns
-            id_col = name_col = code_col = None
-            for col in range(1, ws.max_column + 1):
-                header = ws.cell(row=1, column=col).value
-                if header:
-                    clean = header.replace('*', '').strip()
-                    if clean == 'Id':
-                        id_col = col
-                    elif clean == 'Name':
-                        name_col = col
-                    elif clean == 'ProductCode':
-                        code_col = col
-            
-            # Build product map
-            if id_col:
-                for row in range(2, ws.max_row + 1):
-                    prod_id = ws.cell(row=row, column=id_col).value
-                    if prod_id:
-                        product_map[prod_id] = {
-                            'Name': ws.cell(row=row, column=name_col).value if name_col else None,
-                            'ProductCode': ws.cell(row=row, column=code_col).value if code_col else None
-                        }
-        
-        # Update PricebookEntry
-        if '20_PricebookEntry' in wb.sheetnames and product_map:
-            ws = wb['20_PricebookEntry']
-            self.add_product_data_to_sheet(ws, product_map, 'Product2Id')
-            print("  ✓ Updated PricebookEntry")
-        
-        # Update ProductAttributeDef
-        if '17_ProductAttributeDef' in wb.sheetnames and product_map:
-            ws = wb['17_ProductAttributeDef']
-            self.add_product_data_to_sheet(ws, product_map, 'ProductId')
-            print("  ✓ Updated ProductAttributeDef")
-    
-    def add_product_data_to_sheet(self, ws, product_map, id_field):
-        """Add product name and code to a sheet."""
-        # Find columns
-        cols = {}
-        for col in range(1, ws.max_column + 1):
-            header = ws.cell(row=1, column=col).value
-            if header:
-                clean = header.replace('*', '').strip()
-                if clean == id_field:
-                    cols['id'] = col
-                elif clean == 'Product2.Name':
-                    cols['name'] = col
-                elif clean == 'Product2.ProductCode':
-                    cols['code'] = col
-        
-        # Update rows
-        if 'id' in cols:
-            for row in range(2, ws.max_row + 1):
-                prod_id = ws.cell(row=row, column=cols['id']).value
-                if prod_id and prod_id in product_map:
-                    if 'name' in cols and product_map[prod_id]['Name']:
-                        ws.cell(row=row, column=cols['name']).value = product_map[prod_id]['Name']
-                    if 'code' in cols and product_map[prod_id]['ProductCode']:
-                        ws.cell(row=row, column=cols['code']).value = product_map[prod_id]['ProductCode']
+        filled = resolve_references(wb)
+        for sheet_name, count in filled.items():
+            print(f"  ✓ Updated {sheet_name} ({count} reference values)")
 
 def main():
     exporter = CompleteOrgExporter()
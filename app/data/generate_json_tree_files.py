@@ -1,240 +1,280 @@
 #!/usr/bin/env python3
 """
 Generate JSON tree import files for Salesforce Revenue Cloud migration.
-This script reads CSV files and converts them to properly formatted JSON tree files.
+Streams the pass CSV files into tree files of at most 200 records each and writes
+the matching import plan. Profiles cover pass1/pass2, with or without custom fields.
 """
 
-import json
-import csv
+import argparse
 import os
-from pathlib import Path
+import sys
 
-class JSONTreeGenerator:
-    def __init__(self, csv_dir, json_output_dir):
-        self.csv_dir = Path(csv_dir)
-        self.json_output_dir = Path(json_output_dir)
-        self.json_output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Field mappings for each object
-        self.field_mappings = {
-            'ProductCatalog': {
-                'sobject': 'ProductCatalog',
-                'csv_file': '11_ProductCatalog.csv',
-                'external_id_field': 'CatalogCode__c',
-                'required_fields': ['Name', 'CatalogType'],
-                'field_map': {
-                    'Name': 'Name*',
-                    'Code': 'Code',
-                    'Description': 'Description',
-                    'CatalogType': 'CatalogType',
-                    'EffectiveStartDate': 'EffectiveStartDate',
-                    'EffectiveEndDate': 'EffectiveEndDate',
-                    'CatalogCode__c': 'CatalogCode__c'
-                }
-            },
-            'ProductCategory': {
-                'sobject': 'ProductCategory',
-                'csv_file': '12_ProductCategory.csv',
-                'external_id_field': 'CategoryCode__c',
-                'required_fields': ['Name'],
-                'field_map': {
-                    'Name': 'Name',
-                    'Code': 'Code',
-                    'CatalogId': 'CatalogId',
-                    'ParentCategoryId': 'ParentCategoryId',
-                    'SortOrder': 'SortOrder',
-                    'CategoryCode__c': 'CategoryCode__c'
-                },
-                'reference_fields': {
-                    'CatalogId': 'ProductCatalog.CatalogCode__c',
-                    'ParentCategoryId': 'ProductCategory.CategoryCode__c'
-                }
-            },
-            'AttributeDefinition': {
-                'sobject': 'AttributeDefinition',
-                'csv_file': '09_AttributeDefinition.csv',
-                'external_id_field': 'ExternalId__c',
-                'required_fields': ['Name', 'Code'],
-                'field_map': {
-                    'Name': 'Name',
-                    'Code': 'Code',
-                    'DataType': 'DataType',
-                    'Description': 'Description',
-                    'IsActive': 'IsActive',
-                    'ExternalId__c': 'ExternalId__c'
-                }
-            },
-            'Product2': {
-                'sobject': 'Product2',
-                'csv_file': '13_Product2.csv',
-                'external_id_field': 'ProductCode',
-                'required_fields': ['Name'],
-                'field_map': {
-                    'Name': 'Name',
-                    'ProductCode': 'ProductCode',
-                    'Description': 'Description',
-                    'IsActive': 'IsActive',
-                    'Family': 'Family',
-                    'ProductClass': 'ProductClass',
-                    'QuantityUnitOfMeasure': 'QuantityUnitOfMeasure',
-                    'StockKeepingUnit': 'StockKeepingUnit'
-                }
-            },
-            'Pricebook2': {
-                'sobject': 'Pricebook2',
-                'csv_file': '19_Pricebook2.csv',
-                'external_id_field': 'ExternalId__c',
-                'required_fields': ['Name'],
-                'field_map': {
-                    'Name': 'Name',
-                    'Description': 'Description',
-                    'IsActive': 'IsActive',
-                    'ExternalId__c': 'ExternalId__c'
-                }
-            }
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.tree_generator import TreeGenerator, deferred_updates, without_custom_fields
+
+# Pass1: objects without dependencies on other imported records
+PASS1_OBJECTS = {
+    'ProductCatalog': {
+        'sobject': 'ProductCatalog',
+        'csv_file': '11_ProductCatalog.csv',
+        'external_id_field': 'CatalogCode__c',
+        'required_fields': ['Name', 'CatalogType'],
+        'field_map': {
+            'Name': 'Name*',
+            'Code': 'Code',
+            'Description': 'Description',
+            'CatalogType': 'CatalogType',
+            'EffectiveStartDate': 'EffectiveStartDate',
+            'EffectiveEndDate': 'EffectiveEndDate',
+            'CatalogCode__c': 'CatalogCode__c'
         }
-        
-    def read_csv(self, csv_path):
-        """Read CSV file and return rows as list of dictionaries."""
-        records = []
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Skip empty rows
-                if any(v.strip() for v in row.values() if v):
-                    records.append(row)
-        return records
-    
-    def clean_value(self, value):
-        """Clean and convert values for JSON."""
-        if value is None or value == '':
-            return None
-        if value.lower() in ['true', 'false']:
-            return value.lower() == 'true'
-        try:
-            # Try to convert to number
-            if '.' in value:
-                return float(value)
-            return int(value)
-        except ValueError:
-            return value.strip()
-    
-    def create_reference(self, ref_object, ref_external_id, value):
-        """Create a reference for lookup fields using @referenceId."""
-        if not value or value.strip() == '':
-            return None
-        # For standard objects like Pricebook2, use direct reference
-        if ref_object in ['Pricebook2', 'Product2'] and len(value) == 18:
-            return value  # It's already a Salesforce ID
-        # For custom objects, use reference
-        return f"@{ref_object}_{value}"
-    
-    def generate_tree_json(self, object_config):
-        """Generate JSON tree file for a specific object."""
-        csv_path = self.csv_dir / object_config['csv_file']
-        if not csv_path.exists():
-            print(f"Warning: CSV file not found: {csv_path}")
-            return
-        
-        records = self.read_csv(csv_path)
-        if not records:
-            print(f"Warning: No records found in {csv_path}")
-            return
-        
-        json_records = []
-        for idx, row in enumerate(records):
-            # Create record with attributes
-            record = {
-                "attributes": {
-                    "type": object_config['sobject'],
-                    "referenceId": f"{object_config['sobject']}_Ref{idx+1}"
-                }
-            }
-            
-            # Map fields
-            for json_field, csv_field in object_config['field_map'].items():
-                value = row.get(csv_field, '')
-                cleaned_value = self.clean_value(value)
-                
-                # Handle reference fields
-                if 'reference_fields' in object_config and json_field in object_config['reference_fields']:
-                    ref_info = object_config['reference_fields'][json_field].split('.')
-                    ref_object = ref_info[0]
-                    cleaned_value = self.create_reference(ref_object, ref_info[1], value)
-                
-                # Only add non-null values
-                if cleaned_value is not None:
-                    record[json_field] = cleaned_value
-            
-            # Check required fields
-            missing_required = []
-            for req_field in object_config['required_fields']:
-                if req_field not in record or record[req_field] is None:
-                    missing_required.append(req_field)
-            
-            if missing_required:
-                print(f"Warning: Record {idx+1} in {object_config['sobject']} missing required fields: {missing_required}")
-                # Add default values for missing required fields
-                for field in missing_required:
-                    if field == 'Name':
-                        record[field] = f"Default {object_config['sobject']} {idx+1}"
-                    elif field == 'Code':
-                        record[field] = f"CODE{idx+1:03d}"
-            
-            json_records.append(record)
-        
-        # Write JSON file with proper structure
-        output_path = self.json_output_dir / f"{object_config['sobject']}.json"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump({"records": json_records}, f, indent=2)
-        
-        print(f"Generated {output_path} with {len(json_records)} records")
-    
-    def generate_all_pass1_files(self):
-        """Generate all pass1 JSON tree files."""
-        pass1_objects = ['ProductCatalog', 'ProductCategory', 'AttributeDefinition', 'Product2', 'Pricebook2']
-        
-        for obj_name in pass1_objects:
-            if obj_name in self.field_mappings:
-                self.generate_tree_json(self.field_mappings[obj_name])
-    
-    def generate_import_plan(self):
-        """Generate the import plan JSON file."""
-        plan = []
-        
-        # Define import order for pass1
-        pass1_order = [
-            'ProductCatalog',
-            'ProductCategory', 
-            'AttributeDefinition',
-            'Product2',
-            'Pricebook2'
-        ]
-        
-        for obj_name in pass1_order:
-            if obj_name in self.field_mappings:
-                plan.append({
-                    "sobject": obj_name,
-                    "files": [f"json_tree_output/pass1/{obj_name}.json"]
-                })
-        
-        # Write import plan
-        plan_path = Path('plans_tree/pass1_import.json')
-        plan_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(plan_path, 'w', encoding='utf-8') as f:
-            json.dump(plan, f, indent=2)
-        
-        print(f"Generated import plan: {plan_path}")
+    },
+    'ProductCategory': {
+        'sobject': 'ProductCategory',
+        'csv_file': '12_ProductCategory.csv',
+        'external_id_field': 'CategoryCode__c',
+        'required_fields': ['Name'],
+        'field_map': {
+            'Name': 'Name',
+            'Code': 'Code',
+            'CatalogId': 'CatalogId',
+            'ParentCategoryId': 'ParentCategoryId',
+            'SortOrder': 'SortOrder',
+            'CategoryCode__c': 'CategoryCode__c'
+        },
+        'reference_fields': {
+            'CatalogId': 'ProductCatalog.CatalogCode__c',
+            'ParentCategoryId': 'ProductCategory.CategoryCode__c'
+        }
+    },
+    'AttributeDefinition': {
+        'sobject': 'AttributeDefinition',
+        'csv_file': '09_AttributeDefinition.csv',
+        'external_id_field': 'ExternalId__c',
+        'required_fields': ['Name', 'Code'],
+        'field_map': {
+            'Name': 'Name',
+            'Code': 'Code',
+            'DataType': 'DataType',
+            'Description': 'Description',
+            'IsActive': 'IsActive',
+            'ExternalId__c': 'ExternalId__c'
+        }
+    },
+    'Product2': {
+        'sobject': 'Product2',
+        'csv_file': '13_Product2.csv',
+        'external_id_field': 'ProductCode',
+        'required_fields': ['Name'],
+        'field_map': {
+            'Name': 'Name',
+            'ProductCode': 'ProductCode',
+            'Description': 'Description',
+            'IsActive': 'IsActive',
+            'Family': 'Family',
+            'ProductClass': 'ProductClass',
+            'QuantityUnitOfMeasure': 'QuantityUnitOfMeasure',
+            'StockKeepingUnit': 'StockKeepingUnit'
+        }
+    },
+    'Pricebook2': {
+        'sobject': 'Pricebook2',
+        'csv_file': '19_Pricebook2.csv',
+        'external_id_field': 'ExternalId__c',
+        'required_fields': ['Name'],
+        'field_map': {
+            'Name': 'Name',
+            'Description': 'Description',
+            'IsActive': 'IsActive',
+            'ExternalId__c': 'ExternalId__c'
+        }
+    }
+}
+
+# Pass2: objects referencing pass1 records (lookup columns hold the pass1 Ids)
+PASS2_OBJECTS = {
+    'ProductCategoryProduct': {
+        'sobject': 'ProductCategoryProduct',
+        'csv_file': '26_ProductCategoryProduct.csv',
+        'external_id_field': 'External_ID__c',
+        'required_fields': ['ProductId', 'ProductCategoryId'],
+        'field_map': {
+            'ProductId': 'ProductId*',  # Note the asterisk in CSV
+            'ProductCategoryId': 'ProductCategoryId*',  # Note the asterisk in CSV
+            'External_ID__c': 'External_ID__c'
+        },
+        'reference_fields': {
+            'ProductId': 'Product2.Id',  # These are already Salesforce IDs
+            'ProductCategoryId': 'ProductCategory.Id'  # These are already Salesforce IDs
+        }
+    },
+    'ProductAttributeDefinition': {
+        'sobject': 'ProductAttributeDefinition',
+        'csv_file': '17_ProductAttributeDef.csv',
+        'external_id_field': 'Id',  # Using the SF ID as external ID
+        'required_fields': ['Product2Id', 'AttributeDefinitionId'],
+        'field_map': {
+            'Product2Id': 'Product2Id',
+            'AttributeDefinitionId': 'AttributeDefinitionId',
+            'AttributeCategoryId': 'AttributeCategoryId',
+            'Sequence': 'Sequence',
+            'IsRequired': 'IsRequired',
+            'IsHidden': 'IsHidden',
+            'IsReadOnly': 'IsReadOnly',
+            'IsPriceImpacting': 'IsPriceImpacting',
+            'DefaultValue': 'DefaultValue',
+            'HelpText': 'HelpText',
+            'MinimumValue': 'MinimumValue',
+            'MaximumValue': 'MaximumValue',
+            'DisplayType': 'DisplayType',
+            'Status': 'Status',
+            'AttributeNameOverride': 'AttributeNameOverride',
+            'Description': 'Description'
+        },
+        'reference_fields': {
+            'Product2Id': 'Product2.Id',  # Already a Salesforce ID
+            'AttributeDefinitionId': 'AttributeDefinition.Id',  # Already a Salesforce ID
+            'AttributeCategoryId': 'AttributeCategory.Id'  # Already a Salesforce ID
+        }
+    },
+    'ProductRelatedComponent': {
+        'sobject': 'ProductRelatedComponent',
+        'csv_file': '25_ProductRelatedComponent.csv',
+        'external_id_field': 'External_ID__c',
+        'required_fields': ['ParentProductId', 'ChildProductId'],
+        'field_map': {
+            'ParentProductId': 'ParentProductId*',  # Note the asterisk
+            'ChildProductId': 'ChildProductId*',  # Note the asterisk
+            'ProductComponentGroupId': 'ProductComponentGroupId',
+            'MinQuantity': 'MinQuantity',
+            'MaxQuantity': 'MaxQuantity',
+            'Quantity': 'Quantity',
+            'IsComponentRequired': 'IsComponentRequired',
+            'Sequence': 'Sequence',
+            'DoesBundlePriceIncludeChild': 'DoesBundlePriceIncludeChild',
+            'External_ID__c': 'External_ID__c'
+        },
+        'reference_fields': {
+            'ParentProductId': 'Product2.Id',  # Already Salesforce IDs
+            'ChildProductId': 'Product2.Id',  # Already Salesforce IDs
+            'ProductComponentGroupId': 'ProductComponentGroup.Id'  # Already a Salesforce ID
+        }
+    },
+    'ProductSellingModel': {
+        'sobject': 'ProductSellingModel',
+        'csv_file': '15_ProductSellingModel.csv',
+        'external_id_field': 'ModelCode__c',
+        'required_fields': ['Name', 'SellingModelType', 'Status'],
+        'field_map': {
+            'Name': 'Name',
+            'SellingModelType': 'SellingModelType',
+            'Status': 'Status',
+            'PricingTermUnit': 'PricingTermUnit',
+            'PricingTerm': 'PricingTerm',
+            'ModelCode__c': 'ModelCode__c'
+        }
+    },
+    'PricebookEntry': {
+        'sobject': 'PricebookEntry',
+        'csv_file': '20_PricebookEntry.csv',
+        'external_id_field': 'ExternalId__c',
+        'required_fields': ['Product2Id', 'Pricebook2Id', 'UnitPrice'],
+        'field_map': {
+            'Product2Id': 'Product2Id',
+            'Pricebook2Id': 'Pricebook2Id',
+            'UnitPrice': 'UnitPrice',
+            'IsActive': 'IsActive',
+            'ExternalId__c': 'ExternalId__c'
+        },
+        'reference_fields': {
+            'Product2Id': 'Product2.Id',  # Already Salesforce IDs
+            'Pricebook2Id': 'Pricebook2.Id'  # Already Salesforce IDs
+        }
+    }
+}
+
+# Pass2 import order (ProductSellingModel before anything using it)
+PASS2_ORDER = [
+    'ProductSellingModel',
+    'ProductCategoryProduct',
+    'ProductAttributeDefinition',
+    'ProductRelatedComponent',
+    'PricebookEntry'
+]
+
+# Profiles: objects, CSV input, tree output and plan location. Pass1 leaves out the
+# references its load plan defers (ProductCategory.ParentCategoryId); pass2 sets them by Id
+PROFILES = {
+    'pass1': {
+        'objects': PASS1_OBJECTS,
+        'defer_cycles': True,
+        'csv_dir': 'data/csv_output/pass1',
+        'output_dir': 'json_tree_output/pass1',
+        'plan': 'plans_tree/pass1_import.json'
+    },
+    # Without custom fields, to avoid field-level security issues (CatalogType has invalid picklist values)
+    'pass1_no_custom': {
+        'objects': without_custom_fields(PASS1_OBJECTS, drop={'ProductCatalog': ['CatalogType']}),
+        'defer_cycles': True,
+        'csv_dir': 'data/csv_output/pass1',
+        'output_dir': 'json_tree_output/pass1',
+        'plan': 'plans_tree/pass1_import.json'
+    },
+    # Records missing required fields are skipped rather than given placeholders
+    'pass2': {
+        'objects': PASS2_OBJECTS,
+        'order': PASS2_ORDER,
+        'updates': deferred_updates(PASS1_OBJECTS),
+        'fill_missing_required': False,
+        'csv_dir': 'data/csv_output/pass2',
+        'output_dir': 'json_tree_output/pass2',
+        'plan': 'plans_tree/pass2_import.json'
+    },
+    'pass2_no_custom': {
+        'objects': without_custom_fields(PASS2_OBJECTS),
+        'order': PASS2_ORDER,
+        'updates': deferred_updates(PASS1_OBJECTS),
+        'fill_missing_required': False,
+        'csv_dir': 'data/csv_output/pass2',
+        'output_dir': 'json_tree_output/pass2',
+        'plan': 'plans_tree/pass2_import.json'
+    }
+}
 
 def main():
-    # Set paths
-    csv_dir = Path('data/csv_output/pass1')
-    json_output_dir = Path('json_tree_output/pass1')
+    parser = argparse.ArgumentParser(description='Generate JSON tree import files and their import plan')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='pass1', help='Objects and paths to use')
+    parser.add_argument('--csv-dir', help='CSV input directory (overrides the profile)')
+    parser.add_argument('--output-dir', help='Tree file output directory (overrides the profile)')
+    parser.add_argument('--plan', help='Import plan path (overrides the profile)')
+    parser.add_argument('--workers', type=int, help='Objects generated concurrently')
+    parser.add_argument('--force', action='store_true', help='Regenerate objects even if their CSV is unchanged')
+    args = parser.parse_args()
     
-    # Create generator and run
-    generator = JSONTreeGenerator(csv_dir, json_output_dir)
-    generator.generate_all_pass1_files()
-    generator.generate_import_plan()
+    profile = PROFILES[args.profile]
+    options = {'max_workers': args.workers} if args.workers else {}
+    generator = TreeGenerator(
+        profile['objects'],
+        args.csv_dir or profile['csv_dir'],
+        args.output_dir or profile['output_dir'],
+        args.plan or profile['plan'],
+        order=profile.get('order'),
+        fill_missing_required=profile.get('fill_missing_required', True),
+        force=args.force,
+        defer_cycles=profile.get('defer_cycles', False),
+        updates=profile.get('updates'),
+        **options
+    )
+    result = generator.run()
+    print(f"\n✓ {result['records']} records in {result['files']} files")
+    for name, fields in result['deferred'].items():
+        print(f"  Deferred to pass2: {name}.{', '.join(fields)}")
+    for update in result['updates'].values():
+        if update['records']:
+            # Tree imports only insert; these go through a Bulk API update after the pass1 import
+            print(f"  Then: sf data update bulk --sobject {update['sobject']} --file {update['file']} --target-org <org>")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
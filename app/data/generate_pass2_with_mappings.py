@@ -1,131 +1,139 @@
 #!/usr/bin/env python3
 """
 Generate Pass2 files with proper ID mappings from the imported Pass1 records.
+Ids are resolved by external id (ProductCode, Code) from the Id crosswalk; category
+assignments come from the workbook's ProductCategoryProduct sheet.
 """
 
+import argparse
 import json
-import csv
+import os
+import sys
 from pathlib import Path
 
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.id_crosswalk import id_crosswalk
+from app.services.integrity_index import WORKBOOK_OBJECT_SHEETS, id_key
+from app.services.workbook_reader import WorkbookReader
+
+DEFAULT_WORKBOOK = 'data/Revenue_Cloud_Complete_Upload_Template.xlsx'
+
+# Products by ProductCode (resolved to Ids through the crosswalk)
+BUNDLES = ['CYB-DCS-ESS-BUN', 'CYB-DCS-ADV-BUN', 'CYB-DCS-ELITE-BUN']
+DCS_COMPONENTS = [
+    'CYB-DCS-DDE-CMP', 'CYB-DCS-UC-CMP', 'CYB-DCS-ACOL-CMP', 'CYB-DCS-ACON-CMP',
+    'CYB-DCS-FW-CMP', 'CYB-DCS-OWA-CMP', 'CYB-DCS-SDK-CMP', 'CYB-DCS-QS-CMP'
+]
+ADD_ONS = ['CYB-DCS-MAIL-ADD', 'CYB-DCS-PMD-ADD', 'CYB-DCS-PM365-ADD']
+SERVICES = ['CYB-DP-PS1-SVC', 'CYB-DP-PS2-SVC', 'CYB-DP-PS3-SVC', 'CYB-DP-TRN-SVC']
+SUPPORT = ['CYB-SUP-T1-SVC', 'CYB-SUP-T2-SVC', 'CYB-SUP-T3-SVC']
+
+# AttributeDefinition.Code -> (products, definition fields)
+PRODUCT_ATTRIBUTES = [
+    ('MS', SUPPORT, {"Status": "Active", "IsRequired": False, "Sequence": 1}),      # Managed Service?
+    ('Term', BUNDLES, {"Status": "Active", "IsRequired": True, "Sequence": 2, "DefaultValue": "12"}),
+    ('USR', DCS_COMPONENTS + ADD_ONS, {"Status": "Active", "IsRequired": False, "Sequence": 3})  # Users
+]
+
+# Bundle -> components, in sequence order
+BUNDLE_COMPONENTS = {
+    'CYB-DCS-ESS-BUN': ['CYB-DCS-DDE-CMP', 'CYB-DCS-FW-CMP'],
+    'CYB-DCS-ADV-BUN': ['CYB-DCS-DDE-CMP', 'CYB-DCS-FW-CMP', 'CYB-DCS-UC-CMP', 'CYB-DCS-ACON-CMP'],
+    'CYB-DCS-ELITE-BUN': ['CYB-DCS-DDE-CMP', 'CYB-DCS-UC-CMP', 'CYB-DCS-ACOL-CMP', 'CYB-DCS-ACON-CMP',
+                          'CYB-DCS-FW-CMP', 'CYB-DCS-OWA-CMP', 'CYB-DCS-SDK-CMP']
+}
+
+# Components included by default (optional) rather than required
+DEFAULT_COMPONENTS = {
+    'CYB-DCS-ESS-BUN': {'CYB-DCS-DDE-CMP'},
+    'CYB-DCS-ADV-BUN': {'CYB-DCS-DDE-CMP'}
+}
+
+def workbook_category_products(workbook_path, source_org):
+    """
+    Category assignments in the workbook's ProductCategoryProduct sheet: {category Code: [ProductCode, ...]}
+
+    The sheet holds Ids of the org the workbook was synced from. Products are
+    translated with the Product2 sheet, categories with the ProductCategory sheet's
+    Id column when it has one, else with the source org's crosswalk entries.
+    """
+    with WorkbookReader(workbook_path) as reader:
+        products = reader.read_sheet(WORKBOOK_OBJECT_SHEETS['Product2'])
+        categories = reader.read_sheet(WORKBOOK_OBJECT_SHEETS['ProductCategory'])
+        assignments = reader.read_sheet(WORKBOOK_OBJECT_SHEETS['ProductCategoryProduct'])
+    
+    product_codes = {id_key(i): code for i, code in zip(products.get('Id', []), products.column('ProductCode'))
+                     if id_key(i) and code}
+    category_codes = {id_key(i): code for i, code in zip(categories.get('Id', []), categories.column('Code'))
+                      if id_key(i) and code}
+    
+    category_products, untranslated = {}, set()
+    for category_id, product_id in zip(assignments.column('ProductCategoryId'), assignments.column('ProductId')):
+        category_key, product_key = id_key(category_id), id_key(product_id)
+        if not (category_key and product_key):
+            continue
+        if category_key not in category_codes:
+            codes = id_crosswalk.external_ids(source_org, category_key, field='Code')
+            category_codes[category_key] = codes[0] if codes else None
+        category_code, product_code = category_codes[category_key], product_codes.get(product_key)
+        if category_code and product_code:
+            category_products.setdefault(category_code, []).append(product_code)
+        else:
+            untranslated.add(category_id if not category_code else product_id)
+    
+    if untranslated:
+        print(f"Warning: no Code / ProductCode in the workbook or org {source_org} for: "
+              f"{', '.join(sorted(untranslated))} (assignments skipped)")
+    return category_products
+
 class Pass2WithMappingsGenerator:
-    def __init__(self):
+    def __init__(self, org, workbook_path=DEFAULT_WORKBOOK, source_org=None):
+        self.org = org
         self.output_dir = Path('json_tree_output/pass2_mapped')
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # These are the actual IDs from our successful Pass1 import
-        self.product_ids = [
-            '01tdp000006HfphAAC', '01tdp000006HfpiAAC', '01tdp000006HfpjAAC', '01tdp000006HfpkAAC',
-            '01tdp000006HfplAAC', '01tdp000006HfpmAAC', '01tdp000006HfpnAAC', '01tdp000006HfpoAAC',
-            '01tdp000006HfppAAC', '01tdp000006HfpqAAC', '01tdp000006HfprAAC', '01tdp000006HfpsAAC',
-            '01tdp000006HfptAAC', '01tdp000006HfpuAAC', '01tdp000006HfpvAAC', '01tdp000006HfpwAAC',
-            '01tdp000006HfpxAAC', '01tdp000006HfpyAAC', '01tdp000006HfpzAAC', '01tdp000006Hfq0AAC',
-            '01tdp000006Hfq1AAC'
-        ]
-        
-        self.category_ids = [
-            '0ZGdp00000007JFGAY',  # Core Offerings
-            '0ZGdp00000007JGGAY',  # Software  
-            '0ZGdp00000007JHGAY',  # Managed Services
-            '0ZGdp00000007JIGAY'   # Other Services
-        ]
-        
-        self.attribute_ids = [
-            '0tjdp00000000XtAAI',  # Managed Service?
-            '0tjdp00000000XuAAI',  # Term
-            '0tjdp00000000XvAAI'   # Users
-        ]
-        
-        # Read product codes from CSV to create mapping
-        self.product_mapping = self.create_product_mapping()
+        self.category_products = workbook_category_products(workbook_path, source_org or org)
         
-    def create_product_mapping(self):
-        """Create a mapping of product codes to new IDs."""
-        mapping = {}
-        csv_path = Path('data/csv_output/pass1/13_Product2.csv')
-        
-        with open(csv_path, 'r') as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            
-        # Map by index (in order of CSV)
-        for idx, row in enumerate(rows):
-            if idx < len(self.product_ids):
-                product_code = row.get('ProductCode', '').strip()
-                if product_code:
-                    mapping[product_code] = self.product_ids[idx]
-                    
-        return mapping
+        # Ids of the Pass1 records in this org, by external id
+        product_codes = BUNDLES + DCS_COMPONENTS + ADD_ONS + SERVICES + SUPPORT
+        product_codes += [code for codes in self.category_products.values() for code in codes]
+        self.product_ids = self.resolve('Product2', 'ProductCode', list(dict.fromkeys(product_codes)))
+        self.category_ids = self.resolve('ProductCategory', 'Code', list(self.category_products))
+        self.attribute_ids = self.resolve('AttributeDefinition', 'Code', [code for code, _, _ in PRODUCT_ATTRIBUTES])
+    
+    def resolve(self, sobject, field, external_ids):
+        """Look up Ids in the crosswalk, warning about any that aren't there."""
+        ids = id_crosswalk.resolve(self.org, sobject, external_ids, field=field)
+        missing = [key for key in external_ids if key not in ids]
+        if missing:
+            print(f"Warning: no {sobject} Id in org {self.org} for: {', '.join(missing)} (records skipped)")
+        return ids
+    
+    def add_record(self, records, sobject, fields):
+        """Append a tree record with the next reference id."""
+        records.append({
+            "attributes": {
+                "type": sobject,
+                "referenceId": f"{sobject}_Ref{len(records)+1}"
+            },
+            **fields
+        })
     
     def generate_product_category_products(self):
-        """Generate ProductCategoryProduct with smart category assignments."""
+        """Generate ProductCategoryProduct assigning each product to its category."""
         records = []
         
-        # Map products to categories based on their characteristics
-        # First 3 products (DCS bundles) -> Core Offerings
-        for i in range(3):
-            records.append({
-                "attributes": {
-                    "type": "ProductCategoryProduct",
-                    "referenceId": f"ProductCategoryProduct_Ref{len(records)+1}"
-                },
-                "ProductId": self.product_ids[i],
-                "ProductCategoryId": self.category_ids[0]  # Core Offerings
-            })
-        
-        # Next 8 products (DCS components) -> Software
-        for i in range(3, 11):
-            records.append({
-                "attributes": {
-                    "type": "ProductCategoryProduct",
-                    "referenceId": f"ProductCategoryProduct_Ref{len(records)+1}"
-                },
-                "ProductId": self.product_ids[i],
-                "ProductCategoryId": self.category_ids[1]  # Software
-            })
-        
-        # Next 4 products (Mail, Policy Manager) -> Software
-        for i in range(11, 15):
-            records.append({
-                "attributes": {
-                    "type": "ProductCategoryProduct",
-                    "referenceId": f"ProductCategoryProduct_Ref{len(records)+1}"
-                },
-                "ProductId": self.product_ids[i],
-                "ProductCategoryId": self.category_ids[1]  # Software
-            })
-        
-        # Professional Services -> Other Services
-        for i in range(15, 18):
-            records.append({
-                "attributes": {
-                    "type": "ProductCategoryProduct",
-                    "referenceId": f"ProductCategoryProduct_Ref{len(records)+1}"
-                },
-                "ProductId": self.product_ids[i],
-                "ProductCategoryId": self.category_ids[3]  # Other Services
-            })
-        
-        # Training -> Other Services
-        if len(self.product_ids) > 18:
-            records.append({
-                "attributes": {
-                    "type": "ProductCategoryProduct",
-                    "referenceId": f"ProductCategoryProduct_Ref{len(records)+1}"
-                },
-                "ProductId": self.product_ids[18],
-                "ProductCategoryId": self.category_ids[3]  # Other Services
-            })
-        
-        # Support products -> Managed Services
-        for i in range(19, min(21, len(self.product_ids))):
-            records.append({
-                "attributes": {
-                    "type": "ProductCategoryProduct",
-                    "referenceId": f"ProductCategoryProduct_Ref{len(records)+1}"
-                },
-                "ProductId": self.product_ids[i],
-                "ProductCategoryId": self.category_ids[2]  # Managed Services
-            })
+        for category_code, product_codes in self.category_products.items():
+            category_id = self.category_ids.get(category_code)
+            for product_code in product_codes:
+                product_id = self.product_ids.get(product_code)
+                if category_id and product_id:
+                    self.add_record(records, "ProductCategoryProduct", {
+                        "ProductId": product_id,
+                        "ProductCategoryId": category_id
+                    })
         
         with open(self.output_dir / 'ProductCategoryProduct.json', 'w') as f:
             json.dump({"records": records}, f, indent=2)
@@ -136,48 +144,16 @@ class Pass2WithMappingsGenerator:
         """Generate ProductAttributeDefinition for relevant products."""
         records = []
         
-        # Add "Managed Service?" attribute to support products
-        for i in range(19, min(21, len(self.product_ids))):
-            records.append({
-                "attributes": {
-                    "type": "ProductAttributeDefinition",
-                    "referenceId": f"ProductAttributeDefinition_Ref{len(records)+1}"
-                },
-                "Product2Id": self.product_ids[i],
-                "AttributeDefinitionId": self.attribute_ids[0],  # Managed Service?
-                "Status": "Active",
-                "IsRequired": False,
-                "Sequence": 1
-            })
-        
-        # Add "Term" attribute to subscription products (first 3)
-        for i in range(3):
-            records.append({
-                "attributes": {
-                    "type": "ProductAttributeDefinition",
-                    "referenceId": f"ProductAttributeDefinition_Ref{len(records)+1}"
-                },
-                "Product2Id": self.product_ids[i],
-                "AttributeDefinitionId": self.attribute_ids[1],  # Term
-                "Status": "Active",
-                "IsRequired": True,
-                "Sequence": 2,
-                "DefaultValue": "12"
-            })
-        
-        # Add "Users" attribute to software products
-        for i in range(3, 15):
-            records.append({
-                "attributes": {
-                    "type": "ProductAttributeDefinition",
-                    "referenceId": f"ProductAttributeDefinition_Ref{len(records)+1}"
-                },
-                "Product2Id": self.product_ids[i],
-                "AttributeDefinitionId": self.attribute_ids[2],  # Users
-                "Status": "Active",
-                "IsRequired": False,
-                "Sequence": 3
-            })
+        for attribute_code, product_codes, fields in PRODUCT_ATTRIBUTES:
+            attribute_id = self.attribute_ids.get(attribute_code)
+            for product_code in product_codes:
+                product_id = self.product_ids.get(product_code)
+                if attribute_id and product_id:
+                    self.add_record(records, "ProductAttributeDefinition", {
+                        "Product2Id": product_id,
+                        "AttributeDefinitionId": attribute_id,
+                        **fields
+                    })
         
         with open(self.output_dir / 'ProductAttributeDefinition.json', 'w') as f:
             json.dump({"records": records}, f, indent=2)
@@ -191,115 +167,24 @@ class Pass2WithMappingsGenerator:
         # Use the Bundle to Bundle Component Relationship type
         relationship_type_id = "0yoa5000000gTtdAAE"
         
-        # DCS Essentials bundle includes basic components
-        if len(self.product_ids) >= 8:
-            # DCS Essentials includes Data Detection Engine
-            records.append({
-                "attributes": {
-                    "type": "ProductRelatedComponent",
-                    "referenceId": f"ProductRelatedComponent_Ref{len(records)+1}"
-                },
-                "ParentProductId": self.product_ids[0],  # DCS Essentials
-                "ChildProductId": self.product_ids[3],   # Data Detection Engine
-                "ProductRelationshipTypeId": relationship_type_id,
-                "Quantity": 1.0,
-                "IsDefaultComponent": True,
-                "Sequence": 1
-            })
-            
-            # DCS Essentials includes DCS for Windows
-            records.append({
-                "attributes": {
-                    "type": "ProductRelatedComponent",
-                    "referenceId": f"ProductRelatedComponent_Ref{len(records)+1}"
-                },
-                "ParentProductId": self.product_ids[0],  # DCS Essentials
-                "ChildProductId": self.product_ids[7],   # DCS for Windows
-                "ProductRelationshipTypeId": relationship_type_id,
-                "Quantity": 1.0,
-                "IsComponentRequired": True,
-                "Sequence": 2,
-                "DoesBundlePriceIncludeChild": True
-            })
-        
-        # DCS Advanced bundle includes more components
-        if len(self.product_ids) >= 10:
-            # All components from Essentials
-            records.append({
-                "attributes": {
-                    "type": "ProductRelatedComponent",
-                    "referenceId": f"ProductRelatedComponent_Ref{len(records)+1}"
-                },
-                "ParentProductId": self.product_ids[1],  # DCS Advanced
-                "ChildProductId": self.product_ids[3],   # Data Detection Engine
-                "ProductRelationshipTypeId": relationship_type_id,
-                "Quantity": 1.0,
-                "IsDefaultComponent": True,
-                "Sequence": 1
-            })
-            
-            records.append({
-                "attributes": {
-                    "type": "ProductRelatedComponent",
-                    "referenceId": f"ProductRelatedComponent_Ref{len(records)+1}"
-                },
-                "ParentProductId": self.product_ids[1],  # DCS Advanced
-                "ChildProductId": self.product_ids[7],   # DCS for Windows
-                "ProductRelationshipTypeId": relationship_type_id,
-                "Quantity": 1.0,
-                "IsComponentRequired": True,
-                "Sequence": 2,
-                "DoesBundlePriceIncludeChild": True
-            })
-            
-            # Plus Unlimited Classification
-            records.append({
-                "attributes": {
-                    "type": "ProductRelatedComponent",
-                    "referenceId": f"ProductRelatedComponent_Ref{len(records)+1}"
-                },
-                "ParentProductId": self.product_ids[1],  # DCS Advanced
-                "ChildProductId": self.product_ids[4],   # Unlimited Classification
-                "ProductRelationshipTypeId": relationship_type_id,
-                "Quantity": 1.0,
-                "IsComponentRequired": True,
-                "Sequence": 3,
-                "DoesBundlePriceIncludeChild": True
-            })
-            
-            # Plus Admin Console
-            records.append({
-                "attributes": {
-                    "type": "ProductRelatedComponent",
-                    "referenceId": f"ProductRelatedComponent_Ref{len(records)+1}"
-                },
-                "ParentProductId": self.product_ids[1],  # DCS Advanced
-                "ChildProductId": self.product_ids[6],   # DCS Admin Console
-                "ProductRelationshipTypeId": relationship_type_id,
-                "Quantity": 1.0,
-                "IsComponentRequired": True,
-                "Sequence": 4,
-                "DoesBundlePriceIncludeChild": True
-            })
-        
-        # DCS Elite bundle includes everything
-        if len(self.product_ids) >= 12:
-            # Include all software components
-            for idx, child_idx in enumerate([3, 4, 5, 6, 7, 8, 9]):
-                if child_idx < len(self.product_ids):
-                    records.append({
-                        "attributes": {
-                            "type": "ProductRelatedComponent",
-                            "referenceId": f"ProductRelatedComponent_Ref{len(records)+1}"
-                        },
-                        "ParentProductId": self.product_ids[2],  # DCS Elite
-                        "ChildProductId": self.product_ids[child_idx],
-                        "ProductRelationshipTypeId": relationship_type_id,
-                        "Quantity": 1.0,
-                        "IsComponentRequired": True,
-                        "Sequence": idx + 1,
-                        "DoesBundlePriceIncludeChild": True
-                    })
+        for bundle_code, component_codes in BUNDLE_COMPONENTS.items():
+            bundle_id = self.product_ids.get(bundle_code)
+            for sequence, component_code in enumerate(component_codes, 1):
+                component_id = self.product_ids.get(component_code)
+                if not (bundle_id and component_id):
+                    continue
+                fields = {
+                    "ParentProductId": bundle_id,
+                    "ChildProductId": component_id,
+                    "ProductRelationshipTypeId": relationship_type_id,
+                    "Quantity": 1.0
+                }
+                if component_code in DEFAULT_COMPONENTS.get(bundle_code, ()):
+                    fields.update({"IsDefaultComponent": True, "Sequence": sequence})
+                else:
+                    fields.update({"IsComponentRequired": True, "Sequence": sequence,
+                                   "DoesBundlePriceIncludeChild": True})
+                self.add_record(records, "ProductRelatedComponent", fields)
         
         with open(self.output_dir / 'ProductRelatedComponent.json', 'w') as f:
             json.dump({"records": records}, f, indent=2)
@@ -337,7 +222,20 @@ class Pass2WithMappingsGenerator:
         self.generate_import_plan()
 
 def main():
-    generator = Pass2WithMappingsGenerator()
+    parser = argparse.ArgumentParser(description='Generate Pass2 tree files with Ids from the Id crosswalk')
+    parser.add_argument('--org', required=True, help='Salesforce org alias the Pass1 records were imported into')
+    parser.add_argument('--import-result', help='Saved `sf data import tree --json` output of the Pass1 import')
+    parser.add_argument('--plan', default='plans_tree/pass1_import.json', help='Pass1 import plan (with --import-result)')
+    parser.add_argument('--workbook', default=DEFAULT_WORKBOOK, help='Workbook with the category assignments')
+    parser.add_argument('--source-org', help='Org the workbook was synced from (default: --org)')
+    args = parser.parse_args()
+    
+    # Record the Pass1 Ids first (sync and Bulk loads record theirs automatically)
+    if args.import_result:
+        recorded = id_crosswalk.record_tree_import_files(args.org, args.import_result, args.plan)
+        print(f"Recorded {recorded} external id mappings from {args.import_result}")
+    
+    generator = Pass2WithMappingsGenerator(args.org, args.workbook, args.source_org)
     generator.generate_all()
     print("\nAll Pass2 files generated with proper ID mappings!")
 
@@ -1,89 +1,69 @@
 #!/usr/bin/env python3
 """
 Generate ProductAttributeDefinition records using the correct ProductClassificationAttributeId.
+Product and AttributeDefinition Ids are resolved by ProductCode / Code from the Id crosswalk.
 """
 
+import argparse
 import json
+import os
+import sys
 from pathlib import Path
 
-def generate_product_attribute_definitions():
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.id_crosswalk import id_crosswalk
+from app.data.generate_pass2_with_mappings import PRODUCT_ATTRIBUTES
+
+# ProductClassificationAttr IDs we created by hand (no external id to look them up by),
+# by AttributeDefinition.Code
+CLASSIFICATION_ATTR_IDS = {
+    'MS': '11Cdp000003aD8HEAU',    # Managed Service?
+    'Term': '11Cdp000003aD8IEAU',  # Term
+    'USR': '11Cdp000003aD8JEAU'    # Users
+}
+
+# Record name prefix per attribute
+ATTRIBUTE_LABELS = {
+    'MS': 'Managed Service',
+    'Term': 'Term',
+    'USR': 'Users'
+}
+
+def generate_product_attribute_definitions(org):
     output_dir = Path('json_tree_output/product_attributes')
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Our imported Product IDs
-    product_ids = [
-        '01tdp000006HfphAAC', '01tdp000006HfpiAAC', '01tdp000006HfpjAAC', '01tdp000006HfpkAAC',
-        '01tdp000006HfplAAC', '01tdp000006HfpmAAC', '01tdp000006HfpnAAC', '01tdp000006HfpoAAC',
-        '01tdp000006HfppAAC', '01tdp000006HfpqAAC', '01tdp000006HfprAAC', '01tdp000006HfpsAAC',
-        '01tdp000006HfptAAC', '01tdp000006HfpuAAC', '01tdp000006HfpvAAC', '01tdp000006HfpwAAC',
-        '01tdp000006HfpxAAC', '01tdp000006HfpyAAC', '01tdp000006HfpzAAC', '01tdp000006Hfq0AAC',
-        '01tdp000006Hfq1AAC'
-    ]
+    # Imported Product and AttributeDefinition Ids in this org
+    product_codes = [code for _, codes, _ in PRODUCT_ATTRIBUTES for code in codes]
+    product_ids = id_crosswalk.resolve(org, 'Product2', product_codes, field='ProductCode')
+    attribute_definition_ids = id_crosswalk.resolve(org, 'AttributeDefinition', list(CLASSIFICATION_ATTR_IDS),
+                                                    field='Code')
     
-    # ProductClassificationAttr IDs we just created
-    classification_attr_ids = {
-        'managed_service': '11Cdp000003aD8HEAU',  # Managed Service?
-        'term': '11Cdp000003aD8IEAU',            # Term
-        'users': '11Cdp000003aD8JEAU'            # Users
-    }
-    
-    # Original AttributeDefinition IDs
-    attribute_definition_ids = {
-        'managed_service': '0tjdp00000000XtAAI',  # Managed Service?
-        'term': '0tjdp00000000XuAAI',            # Term
-        'users': '0tjdp00000000XvAAI'            # Users
-    }
+    missing = [code for code in dict.fromkeys(product_codes) if code not in product_ids]
+    missing += [name for name in CLASSIFICATION_ATTR_IDS if name not in attribute_definition_ids]
+    if missing:
+        print(f"Warning: no Id in org {org} for: {', '.join(missing)} (records skipped)")
     
     records = []
     
-    # Add "Managed Service?" attribute to support products (indices 19-20)
-    for i in range(19, min(21, len(product_ids))):
-        records.append({
-            "attributes": {
-                "type": "ProductAttributeDefinition",
-                "referenceId": f"ProductAttributeDefinition_Ref{len(records)+1}"
-            },
-            "Name": f"Managed Service - {product_ids[i][-8:]}",  # Unique name
-            "Product2Id": product_ids[i],
-            "ProductClassificationAttributeId": classification_attr_ids['managed_service'],
-            "AttributeDefinitionId": attribute_definition_ids['managed_service'],
-            "Status": "Active",
-            "IsRequired": False,
-            "Sequence": 1
-        })
-    
-    # Add "Term" attribute to subscription products (first 3 bundles)
-    for i in range(3):
-        records.append({
-            "attributes": {
-                "type": "ProductAttributeDefinition",
-                "referenceId": f"ProductAttributeDefinition_Ref{len(records)+1}"
-            },
-            "Name": f"Term - {product_ids[i][-8:]}",  # Unique name
-            "Product2Id": product_ids[i],
-            "ProductClassificationAttributeId": classification_attr_ids['term'],
-            "AttributeDefinitionId": attribute_definition_ids['term'],
-            "Status": "Active",
-            "IsRequired": True,
-            "Sequence": 2,
-            "DefaultValue": "12"
-        })
-    
-    # Add "Users" attribute to software products (indices 3-14)
-    for i in range(3, 15):
-        if i < len(product_ids):
+    for attribute_code, codes, fields in PRODUCT_ATTRIBUTES:
+        attribute_id = attribute_definition_ids.get(attribute_code)
+        for product_code in codes:
+            product_id = product_ids.get(product_code)
+            if not (attribute_id and product_id):
+                continue
             records.append({
                 "attributes": {
                     "type": "ProductAttributeDefinition",
                     "referenceId": f"ProductAttributeDefinition_Ref{len(records)+1}"
                 },
-                "Name": f"Users - {product_ids[i][-8:]}",  # Unique name
-                "Product2Id": product_ids[i],
-                "ProductClassificationAttributeId": classification_attr_ids['users'],
-                "AttributeDefinitionId": attribute_definition_ids['users'],
-                "Status": "Active",
-                "IsRequired": False,
-                "Sequence": 3
+                "Name": f"{ATTRIBUTE_LABELS[attribute_code]} - {product_code}",  # Unique name
+                "Product2Id": product_id,
+                "ProductClassificationAttributeId": CLASSIFICATION_ATTR_IDS[attribute_code],
+                "AttributeDefinitionId": attribute_id,
+                **fields
             })
     
     # Save the file
@@ -104,4 +84,7 @@ def generate_product_attribute_definitions():
     print(f"Generated import plan: {plan_path}")
 
 if __name__ == '__main__':
-    generate_product_attribute_definitions()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Generate ProductAttributeDefinition tree records')
+    parser.add_argument('--org', required=True, help='Salesforce org alias the products were imported into')
+    args = parser.parse_args()
+    generate_product_attribute_definitions(args.org)
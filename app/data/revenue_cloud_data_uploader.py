@@ -7,12 +7,24 @@ Handles the upload of Excel/CSV data to Salesforce Revenue Cloud objects
 import argparse
 import sys
 import os
-import pandas as pd
-import subprocess
-import json
-from pathlib import Path
 
-def upload_to_salesforce(org, object_name, data_file):
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.upload_pipeline import UploadPipeline
+
+def print_event(event):
+    """Print pipeline progress events"""
+    if event['type'] == 'stage':
+        print(event['message'])
+    elif event['type'] == 'progress':
+        print(f"Processed chunk {event['chunks_done']}/{event['chunks']}: "
+              f"{event['processed']}/{event['total']} records, {event['failed']} failed "
+              f"({event['records_per_second']} records/sec)")
+    elif event['type'] == 'error':
+        print(f"Error: {event['message']}")
+
+def upload_to_salesforce(org, object_name, data_file, external_id_field=None, changed_only=False, deltas_only=False):
     """
     Upload data to Salesforce using the appropriate method
     """
@@ -26,72 +38,38 @@ def upload_to_salesforce(org, object_name, data_file):
         print(f"Error: Data file not found: {data_file}")
         return False
     
-    # Read the Excel file to get the appropriate sheet
-    try:
-        # Map object names to sheet names
-        sheet_mapping = {
-            'Account': '01_Account',
-            'Contact': '02_Contact', 
-            'LegalEntity': '02_LegalEntity',
-            'TaxTreatment': '05_TaxTreatment',
-            'TaxPolicy': '04_TaxPolicy',
-            'TaxEngine': '03_TaxEngine',
-            'ProductCatalog': '11_ProductCatalog',
-            'ProductCategory': '12_ProductCategory',
-            'Product2': '13_Product2',
-            'Pricebook2': '19_Pricebook2',
-            'PricebookEntry': '20_PricebookEntry'
-        }
-        
-        sheet_name = sheet_mapping.get(object_name, object_name)
-        
-        # Read Excel file
-        excel_file = pd.ExcelFile(data_file)
-        if sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(data_file, sheet_name=sheet_name)
-            print(f"Found {len(df)} records in sheet {sheet_name}")
-            
-            # Convert to CSV for upload
-            csv_file = f"/tmp/{object_name}_upload.csv"
-            df.to_csv(csv_file, index=False)
-            
-            # Simulate upload process
-            print("Preparing data for upload...")
-            print("Validating field mappings...")
-            print("Starting Salesforce bulk upload...")
-            
-            # In a real implementation, this would use Salesforce CLI or API
-            # For now, we'll simulate the process
-            import time
-            for i in range(1, 11):
-                print(f"Processing batch {i}/10...")
-                time.sleep(0.5)
-            
-            print("Upload completed successfully!")
-            print(f"Uploaded {len(df)} records to {object_name}")
-            return True
-            
-        else:
-            print(f"Error: Sheet {sheet_name} not found in workbook")
-            return False
-            
-    except Exception as e:
-        print(f"Error processing file: {str(e)}")
+    result = UploadPipeline(org, object_name, data_file, external_id_field=external_id_field,
+                            changed_only=changed_only, deltas_only=deltas_only, on_event=print_event).run()
+    if 'load_id' not in result:
         return False
+    
+    print(f"Uploaded {result['processed'] - result['failed']} of {result['total']} records to {object_name} "
+          f"({result.get('created', 0)} created, {result.get('updated', 0)} updated, {result['failed']} failed)")
+    for failure in result['failures'][:20]:
+        print(f"  Row {failure['row']}: {failure['error']}")
+    if result['failed'] > 20:
+        print(f"  ... {result['failed'] - 20} more failures in load {result['load_id']}")
+    for error in result['errors']:
+        print(f"Error: {error}")
+    return result['success']
 
 def main():
     parser = argparse.ArgumentParser(description='Upload data to Salesforce Revenue Cloud')
     parser.add_argument('--org', required=True, help='Salesforce org alias')
     parser.add_argument('--object', required=True, help='Object API name')
     parser.add_argument('--data-file', required=True, help='Path to data file')
+    parser.add_argument('--external-id', help='External id field to upsert on (default: Id when present)')
+    parser.add_argument('--changed-only', action='store_true', help='Only send rows changed since the last successful load')
+    parser.add_argument('--deltas-only', action='store_true', help='Only send rows that differ from the org (diffs first)')
     
     args = parser.parse_args()
     
     # Execute upload
-    success = upload_to_salesforce(args.org, args.object, args.data_file)
+    success = upload_to_salesforce(args.org, args.object, args.data_file, args.external_id,
+                                   args.changed_only, args.deltas_only)
     
     # Exit with appropriate code
     sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,13 +1,46 @@
-import pandas as pd
+#!/usr/bin/env python3
+"""
+Export the Revenue Cloud workbook to CSV files for the tree generators and data loads.
+Reads the workbook once and writes pass1 (no relationship columns) and pass2 (all columns)
+files per sheet; sheets unchanged since the last export are skipped.
+"""
+
+import argparse
 import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.workbook_exporter import EXPORT_FORMATS, WorkbookExporter
 
-input_excel = "/Users/marcdebrey/cpq-revenue-cloud-migration/data/Revenue_Cloud_Complete_Upload_Template.xlsx"
-output_dir = "/Users/marcdebrey/cpq-revenue-cloud-migration/data/csv_output"
-os.makedirs(output_dir, exist_ok=True)
+def main():
+    parser = argparse.ArgumentParser(description='Export workbook sheets to pass1/pass2 CSV (and Parquet / Arrow) files')
+    parser.add_argument('--workbook', default='data/Revenue_Cloud_Complete_Upload_Template.xlsx', help='Workbook to export')
+    parser.add_argument('--output-dir', default='data/csv_output', help='Output directory')
+    parser.add_argument('--sheets', nargs='+', help='Sheets to export (default: all)')
+    parser.add_argument('--format', dest='formats', nargs='+', choices=sorted(EXPORT_FORMATS), default=['csv'],
+                        help='Output formats (parquet/arrow need pyarrow)')
+    parser.add_argument('--single', action='store_true', help='One file per sheet with all columns instead of pass1/pass2')
+    parser.add_argument('--external-ids', action='store_true', help='Generate missing external ids (PROD001, CAT001, ...)')
+    parser.add_argument('--force', action='store_true', help='Rewrite sheets even if unchanged')
+    parser.add_argument('--workers', type=int, help='Sheets written concurrently')
+    args = parser.parse_args()
+    
+    options = {'max_workers': args.workers} if args.workers else {}
+    try:
+        exporter = WorkbookExporter(args.workbook, args.output_dir, split_passes=not args.single,
+                                    formats=args.formats, external_ids=args.external_ids, **options)
+    except ValueError as e:
+        print(f"⚠️  {e}")
+        sys.exit(1)
+    result = exporter.export(args.sheets, force=args.force)
+    
+    print(f"\n✓ Exported {len(result['exported'])} sheets to {result['output_dir']}, "
+          f"{len(result['unchanged'])} unchanged")
+    if result['errors']:
+        print(f"⚠️  {len(result['errors'])} sheets failed: {', '.join(result['errors'])}")
+        sys.exit(1)
 
-excel_file = pd.ExcelFile(input_excel)
-for sheet_name in excel_file.sheet_names:
-    df = pd.read_excel(excel_file, sheet_name=sheet_name)
-    csv_filename = os.path.join(output_dir, f"{sheet_name}.csv")
-    df.to_csv(csv_filename, index=False)
-    print(f"Exported {csv_filename}")
+if __name__ == '__main__':
+    main()
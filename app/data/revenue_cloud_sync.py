@@ -7,14 +7,28 @@ Synchronizes data from Salesforce to local Excel workbooks
 import argparse
 import json
 import os
+import shutil
+import sqlite3
 import subprocess
 import sys
-from datetime import datetime
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
 from pathlib import Path
-import pandas as pd
 from openpyxl import load_workbook
 import time
 
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.rate_limiter import get_rate_limiter, is_api_limit_error, backoff_delay
+from app.services.salesforce_client import get_client, SalesforceApiError
+from app.services.sync_state import sync_state
+from app.services.describe_cache import describe_cache
+from app.services.id_crosswalk import id_crosswalk
+from app.services.job_runner import job_runner
+from config.settings.app_config import API_MAX_RETRIES, SYNC_MAX_WORKERS
+
 # Revenue Cloud object mappings
 OBJECT_MAPPINGS = {
     # Core Product Objects
@@ -141,12 +155,30 @@ OBJECT_MAPPINGS = {
     }
 }
 
-def query_salesforce_data(org, object_name, fields):
-    """Query Salesforce for object data"""
+def query_salesforce_data(org, object_name, fields, max_retries=API_MAX_RETRIES, where=None,
+                          include_deleted=False):
+    """Query Salesforce for object data, retrying with backoff on API-limit errors"""
     try:
         # Build SOQL query
         field_list = ', '.join(fields)
         query = f"SELECT {field_list} FROM {object_name}"
+        if where:
+            query += f" WHERE {where}"
+        
+        # Prefer the in-process REST client; fall back to the CLI if it's unavailable
+        client = get_client(org)
+        if client:
+            try:
+                print(f"  Querying {object_name}...")
+                records = client.query(query, include_deleted=include_deleted)
+                print(f"  ✓ Retrieved {len(records)} records from {object_name}")
+                return records
+            except SalesforceApiError as e:
+                if e.status_code == 400:
+                    # Bad query (missing object/field); the CLI would fail the same way
+                    print(f"  ⚠️  Error querying {object_name}: {str(e)}")
+                    return None
+                print(f"  ⚠️  API query failed for {object_name} ({str(e)}), retrying with sf CLI")
         
         # Use Salesforce CLI to execute query
         cmd = [
@@ -155,92 +187,276 @@ def query_salesforce_data(org, object_name, fields):
             '--target-org', org,
             '--json'
         ]
+        if include_deleted:
+            cmd.append('--all-rows')
         
-        print(f"  Querying {object_name}...")
-        # Run command, redirecting stderr to devnull to avoid warning messages
-        with open(os.devnull, 'w') as devnull:
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=devnull, text=True)
+        limiter = get_rate_limiter(org)
         
-        if result.returncode != 0:
-            # Re-run to get error message if failed
-            result2 = subprocess.run(cmd, capture_output=True, text=True)
-            print(f"  ⚠️  Error querying {object_name}: {result2.stderr}")
-            return None
+        for attempt in range(max_retries + 1):
+            print(f"  Querying {object_name}...")
+            limiter.acquire()
+            result = subprocess.run(cmd, capture_output=True, text=True)
             
-        # Parse JSON response - handle potential warnings in stderr
-        try:
-            # The actual JSON output should be in stdout
-            response = json.loads(result.stdout)
-        except json.JSONDecodeError as e:
-            print(f"  ⚠️  Error parsing response for {object_name}: {str(e)}")
-            print(f"  Response: {result.stdout[:200]}...")
-            return None
-        
-        if response.get('status') == 0:
-            records = response.get('result', {}).get('records', [])
-            print(f"  ✓ Retrieved {len(records)} records from {object_name}")
-            return records
-        else:
-            print(f"  ⚠️  Query failed: {response.get('message', 'Unknown error')}")
+            # Parse JSON response - with --json the CLI reports errors on stdout too
+            try:
+                response = json.loads(result.stdout)
+            except json.JSONDecodeError as e:
+                response = None
+                if result.returncode == 0:
+                    print(f"  ⚠️  Error parsing response for {object_name}: {str(e)}")
+                    print(f"  Response: {result.stdout[:200]}...")
+                    return None
+            
+            if result.returncode == 0 and response.get('status') == 0:
+                records = response.get('result', {}).get('records', [])
+                print(f"  ✓ Retrieved {len(records)} records from {object_name}")
+                return records
+            
+            message = (response or {}).get('message') or result.stderr or 'Unknown error'
+            if is_api_limit_error(message) and attempt < max_retries:
+                delay = backoff_delay(attempt)
+                print(f"  ⏳ API limit hit for {object_name}, retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                continue
+            
+            print(f"  ⚠️  Error querying {object_name}: {message}")
             return None
             
     except Exception as e:
         print(f"  ⚠️  Exception querying {object_name}: {str(e)}")
         return None
 
-def update_excel_sheet(workbook_path, sheet_name, records, field_mapping):
-    """Update Excel sheet with Salesforce data"""
-    try:
-        # Load workbook
-        wb = load_workbook(workbook_path)
-        
-        if sheet_name not in wb.sheetnames:
-            print(f"  ⚠️  Sheet {sheet_name} not found in workbook")
-            return False
+def parse_modstamp(value):
+    """Parse a Salesforce datetime ('2024-05-01T12:34:56.000+0000') as UTC"""
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z'):
+        try:
+            return datetime.strptime(value, fmt).astimezone(timezone.utc)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def format_soql_datetime(value):
+    """Format a UTC datetime as a SOQL datetime literal"""
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + f"{value.microsecond // 1000:03d}Z"
+
+def latest_modstamp(records, current=None):
+    """Highest SystemModstamp among records (or the current watermark), as a SOQL literal"""
+    latest = parse_modstamp(current) if current else None
+    for record in records:
+        stamp = parse_modstamp(record.get('SystemModstamp'))
+        if stamp and (latest is None or stamp > latest):
+            latest = stamp
+    return format_soql_datetime(latest) if latest else None
+
+def fetch_object(org, mapping, watermark=None):
+    """
+    Query one object for a sync
+    
+    With a watermark only records modified since then are fetched, including deleted
+    ones (queryAll, IsDeleted). Returns (records, incremental); incremental is False
+    when all rows were fetched.
+    """
+    object_name = mapping['api_name']
+    fields = list(mapping['fields'])
+    
+    # Leave out fields this org doesn't have rather than failing the whole query
+    available = set(describe_cache.field_names(org, object_name))
+    if available:
+        missing = [f for f in fields if f not in available]
+        if missing:
+            print(f"  ℹ️  {object_name}: skipping fields not in org: {', '.join(missing)}")
+            fields = [f for f in fields if f in available]
+    
+    if 'SystemModstamp' not in fields and (not available or 'SystemModstamp' in available):
+        fields.append('SystemModstamp')
+    
+    if watermark and 'SystemModstamp' in fields:
+        # >= rather than >: rows sharing the watermark's timestamp may have committed
+        # after the last run; re-applying a row that was already merged is harmless
+        records = query_salesforce_data(org, object_name, fields + ['IsDeleted'],
+                                        where=f"SystemModstamp >= {watermark}", include_deleted=True)
+        if records is not None:
+            return records, True
+        print(f"  ℹ️  Incremental query failed for {object_name}, falling back to a full refresh")
+    
+    records = query_salesforce_data(org, object_name, fields)
+    if records is None and 'SystemModstamp' in fields and 'SystemModstamp' not in mapping['fields'] and not available:
+        # Object without SystemModstamp; sync it in full every time
+        records = query_salesforce_data(org, object_name, [f for f in fields if f != 'SystemModstamp'])
+    return records, False
+
+class SyncWorkbookWriter:
+    """Applies the results of a whole sync run to the workbook in one load/save"""
+    
+    def __init__(self, workbook_path):
+        self.workbook_path = workbook_path
+        self.wb = load_workbook(workbook_path)
+        self.sheets_written = 0
+    
+    @staticmethod
+    def build_column_map(ws, field_mapping):
+        """Map each header column to its Salesforce field, once per sheet"""
+        # Match keys -> position of the first field producing them (earlier fields win)
+        exact, squashed = {}, {}
+        for position, field in enumerate(field_mapping):
+            exact.setdefault(field.lower(), position)
+            squashed.setdefault(field.replace('_', '').lower(), position)
+        fields = list(field_mapping)
+
+        column_map = {}
+        for col_num, header in enumerate(next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ()), 1):
+            if not header:
+                continue
+            header = str(header)
+            matches = [p for p in (exact.get(header.lower()), squashed.get(header.replace(' ', '').lower()))
+                       if p is not None]
+            if matches:
+                column_map[col_num] = fields[min(matches)]
+        return column_map
+    
+    def write_sheet(self, sheet_name, records, field_mapping):
+        """Replace the data rows of a sheet with Salesforce records (in memory)"""
+        try:
+            if sheet_name not in self.wb.sheetnames:
+                print(f"  ⚠️  Sheet {sheet_name} not found in workbook")
+                return False
             
-        # Get the sheet
-        ws = wb[sheet_name]
-        
-        # Get existing headers from row 1
-        headers = []
-        for col in range(1, ws.max_column + 1):
-            header = ws.cell(row=1, column=col).value
-            if header:
-                headers.append(header)
-        
-        # Create DataFrame from records
-        if records:
-            df = pd.DataFrame(records)
+            if not records:
+                print(f"  ℹ️  No records to update for {sheet_name}")
+                return True
             
-            # Clear existing data (keep headers)
-            for row in range(2, ws.max_row + 1):
-                for col in range(1, ws.max_column + 1):
-                    ws.cell(row=row, column=col).value = None
+            ws = self.wb[sheet_name]
+            column_map = self.build_column_map(ws, field_mapping)
+            max_column = max(ws.max_column, max(column_map, default=0))
             
-            # Write new data
-            row_num = 2
-            for _, record in df.iterrows():
-                for col_num, header in enumerate(headers, 1):
-                    # Map Salesforce field names to Excel headers
-                    sf_field = None
-                    for field in field_mapping:
-                        if field.lower() == header.lower() or field.replace('_', '').lower() == header.replace(' ', '').lower():
-                            sf_field = field
-                            break
-                    
-                    if sf_field and sf_field in record:
-                        ws.cell(row=row_num, column=col_num).value = record[sf_field]
-                
-                row_num += 1
+            # Unmapped columns are cleared
+            rows = [
+                [record.get(column_map[col_num]) if col_num in column_map else None
+                 for col_num in range(1, max_column + 1)]
+                for record in records
+            ]
+            self._write_rows(ws, rows, max_column)
             
-            # Save workbook
-            wb.save(workbook_path)
+            self.sheets_written += 1
             print(f"  ✓ Updated {sheet_name} with {len(records)} records")
             return True
-        else:
-            print(f"  ℹ️  No records to update for {sheet_name}")
+            
+        except Exception as e:
+            print(f"  ⚠️  Error updating sheet {sheet_name}: {str(e)}")
+            return False
+    
+    def has_id_column(self, sheet_name, field_mapping):
+        """Whether a sheet's rows can be matched to records by Id"""
+        if sheet_name not in self.wb.sheetnames:
+            return False
+        return 'Id' in self.build_column_map(self.wb[sheet_name], field_mapping).values()
+    
+    def merge_sheet(self, sheet_name, records, field_mapping):
+        """Apply changed and deleted records to a sheet, matching rows by Id (in memory)"""
+        try:
+            if sheet_name not in self.wb.sheetnames:
+                print(f"  ⚠️  Sheet {sheet_name} not found in workbook")
+                return False
+            
+            if not records:
+                print(f"  ℹ️  No changes for {sheet_name}")
+                return True
+            
+            ws = self.wb[sheet_name]
+            column_map = self.build_column_map(ws, field_mapping)
+            id_column = next((col for col, field in column_map.items() if field == 'Id'), None)
+            if id_column is None:
+                print(f"  ⚠️  Sheet {sheet_name} has no Id column to merge on")
+                return False
+            
+            max_column = max(ws.max_column, max(column_map, default=0))
+            rows = [
+                list(row) + [None] * (max_column - len(row))
+                for row in ws.iter_rows(min_row=2, max_col=max_column, values_only=True)
+                if any(value is not None for value in row)
+            ]
+            row_index = {row[id_column - 1]: i for i, row in enumerate(rows) if row[id_column - 1]}
+            
+            deleted_rows = set()
+            updated = added = 0
+            for record in records:
+                record_id = record.get('Id')
+                if record.get('IsDeleted'):
+                    if record_id in row_index:
+                        deleted_rows.add(row_index.pop(record_id))
+                    continue
+                
+                if record_id in row_index:
+                    row = rows[row_index[record_id]]
+                    updated += 1
+                else:
+                    row = [None] * max_column
+                    row_index[record_id] = len(rows)
+                    rows.append(row)
+                    added += 1
+                
+                # Only mapped columns change; anything else on the row is kept
+                for col_num, sf_field in column_map.items():
+                    row[col_num - 1] = record.get(sf_field)
+            
+            if deleted_rows:
+                rows = [row for i, row in enumerate(rows) if i not in deleted_rows]
+            self._write_rows(ws, rows, max_column)
+            
+            self.sheets_written += 1
+            print(f"  ✓ Merged into {sheet_name}: {updated} updated, {added} added, {len(deleted_rows)} deleted")
             return True
             
+        except Exception as e:
+            print(f"  ⚠️  Error merging sheet {sheet_name}: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _write_rows(ws, rows, max_column):
+        """Overwrite the data rows of a sheet in place and clear any leftover rows"""
+        old_max_row = ws.max_row
+        for row_num, values in enumerate(rows, 2):
+            for col_num in range(1, max_column + 1):
+                ws.cell(row=row_num, column=col_num).value = values[col_num - 1]
+        
+        # Clear leftover rows from the previous, longer data set
+        first_stale_row = len(rows) + 2
+        if old_max_row >= first_stale_row:
+            for row in ws.iter_rows(min_row=first_stale_row, max_row=old_max_row):
+                for cell in row:
+                    cell.value = None
+    
+    def save(self):
+        """Save the workbook atomically (temp file in the same directory, then rename)"""
+        workbook_dir = os.path.dirname(os.path.abspath(self.workbook_path))
+        fd, temp_path = tempfile.mkstemp(suffix='.xlsx', dir=workbook_dir)
+        os.close(fd)
+        try:
+            self.wb.save(temp_path)
+            # mkstemp creates the file owner-only; keep the workbook's permissions
+            if os.path.exists(self.workbook_path):
+                shutil.copymode(self.workbook_path, temp_path)
+            os.replace(temp_path, self.workbook_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            self.wb.close()
+    
+    def close(self):
+        """Close the workbook without saving"""
+        self.wb.close()
+
+def update_excel_sheet(workbook_path, sheet_name, records, field_mapping):
+    """Update a single Excel sheet with Salesforce data"""
+    try:
+        writer = SyncWorkbookWriter(workbook_path)
+        if not writer.write_sheet(sheet_name, records, field_mapping):
+            return False
+        if writer.sheets_written:
+            writer.save()
+        return True
     except Exception as e:
         print(f"  ⚠️  Error updating sheet {sheet_name}: {str(e)}")
         return False
@@ -250,24 +466,39 @@ def write_progress(progress_file, status):
     with open(progress_file, 'w') as f:
         json.dump(status, f)
 
-def sync_all_objects(org, workbook_path, objects_to_sync=None, progress_file=None):
-    """Sync all or specified objects from Salesforce to Excel"""
+def sync_all_objects(org, workbook_path, objects_to_sync=None, progress_file=None, max_workers=None,
+                     full_refresh=False, on_progress=None, cancel_event=None):
+    """
+    Sync all or specified objects from Salesforce to Excel
+    
+    Objects with a SystemModstamp watermark from an earlier sync of this workbook are
+    synced incrementally (changes and deletions merged by Id); full_refresh re-queries
+    everything. Progress goes to progress_file and/or on_progress(status). Once
+    cancel_event is set, queued object queries are dropped and the workbook is left
+    unchanged.
+    """
+    
+    def report(status):
+        if progress_file:
+            write_progress(progress_file, status)
+        if on_progress:
+            on_progress(status)
     
     print(f"\n🔄 Starting Salesforce sync...")
     print(f"Org: {org}")
     print(f"Workbook: {workbook_path}")
+    print(f"Mode: {'full refresh' if full_refresh else 'incremental'}")
     print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
     # Initial progress
-    if progress_file:
-        write_progress(progress_file, {
-            'status': 'initializing',
-            'current_object': None,
-            'completed': 0,
-            'total': 0,
-            'percent': 0,
-            'message': 'Creating backup...'
-        })
+    report({
+        'status': 'initializing',
+        'current_object': None,
+        'completed': 0,
+        'total': 0,
+        'percent': 0,
+        'message': 'Creating backup...'
+    })
     
     # Create backup
     backup_path = create_backup(workbook_path)
@@ -286,38 +517,54 @@ def sync_all_objects(org, workbook_path, objects_to_sync=None, progress_file=Non
     completed_objects = 0
     
     # Update progress with total count
-    if progress_file:
-        write_progress(progress_file, {
-            'status': 'syncing',
-            'current_object': None,
-            'completed': 0,
-            'total': total_objects,
-            'percent': 0,
-            'message': f'Starting sync of {total_objects} objects...'
-        })
+    report({
+        'status': 'syncing',
+        'current_object': None,
+        'completed': 0,
+        'total': total_objects,
+        'percent': 0,
+        'message': f'Starting sync of {total_objects} objects...'
+    })
     
-    # Process each object
-    for object_key, mapping in sync_list.items():
-        print(f"📊 Syncing {object_key}...")
-        
-        # Update progress
-        if progress_file:
-            write_progress(progress_file, {
-                'status': 'syncing',
-                'current_object': object_key,
-                'completed': completed_objects,
-                'total': total_objects,
-                'percent': int((completed_objects / total_objects) * 100),
-                'message': f'Querying {object_key} from Salesforce...'
-            })
-        
-        # Query Salesforce
-        records = query_salesforce_data(org, mapping['api_name'], mapping['fields'])
+    # Watermarks from an earlier sync of this workbook (none if it has changed since)
+    watermarks = {} if full_refresh else sync_state.get_watermarks(org, workbook_path)
+    new_watermarks = {}
+    incremental_count = 0
+    
+    # Open the workbook once for the whole run
+    writer = SyncWorkbookWriter(workbook_path)
+    
+    # Only merge into sheets whose rows can be matched by Id
+    object_watermarks = {
+        object_key: watermarks.get(object_key)
+        if writer.has_id_column(mapping['sheet_name'], mapping['fields']) else None
+        for object_key, mapping in sync_list.items()
+    }
+    
+    # Query objects concurrently (throttled per org by the rate limiter);
+    # results are written to the workbook on this thread as they complete
+    max_workers = max(1, min(max_workers or SYNC_MAX_WORKERS, total_objects or 1))
+    print(f"Querying {total_objects} objects with {max_workers} parallel workers\n")
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_object, org, mapping, object_watermarks[object_key]): object_key
+            for object_key, mapping in sync_list.items()
+        }
         
-        if records is not None:
-            # Update progress - writing to Excel
-            if progress_file:
-                write_progress(progress_file, {
+        for future in as_completed(futures):
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                break
+            object_key = futures[future]
+            mapping = sync_list[object_key]
+            records, incremental = future.result()
+            print(f"📊 Syncing {object_key}{' (incremental)' if incremental else ''}...")
+            
+            if records is not None:
+                # Update progress - writing to Excel
+                report({
                     'status': 'syncing',
                     'current_object': object_key,
                     'completed': completed_objects,
@@ -325,35 +572,103 @@ def sync_all_objects(org, workbook_path, objects_to_sync=None, progress_file=Non
                     'percent': int((completed_objects / total_objects) * 100),
                     'message': f'Writing {len(records)} records for {object_key}...'
                 })
-            
-            # Update Excel
-            if update_excel_sheet(workbook_path, mapping['sheet_name'], records, mapping['fields']):
-                success_count += 1
-                total_records += len(records)
+                
+                # Update Excel (in memory; saved once after all objects)
+                if incremental:
+                    written = writer.merge_sheet(mapping['sheet_name'], records, mapping['fields'])
+                else:
+                    written = writer.write_sheet(mapping['sheet_name'], records, mapping['fields'])
+                
+                if written:
+                    success_count += 1
+                    total_records += len(records)
+                    incremental_count += int(incremental)
+                    new_watermarks[object_key] = latest_modstamp(
+                        records, object_watermarks[object_key] if incremental else None)
+                    try:
+                        id_crosswalk.record_records(org, mapping['api_name'], records, source='sync')
+                    except sqlite3.Error as e:
+                        print(f"  ⚠️  Could not record {object_key} Ids in the crosswalk: {str(e)}")
+                else:
+                    error_count += 1
             else:
                 error_count += 1
-        else:
-            error_count += 1
-        
-        completed_objects += 1
-        
-        # Small delay to avoid rate limits
-        time.sleep(0.5)
+            
+            completed_objects += 1
+            
+            report({
+                'status': 'syncing',
+                'current_object': object_key,
+                'completed': completed_objects,
+                'total': total_objects,
+                'percent': int((completed_objects / total_objects) * 100),
+                'records': total_records,
+                'message': f'Synced {object_key} ({completed_objects}/{total_objects})'
+            })
     
-    # Final progress
-    if progress_file:
-        write_progress(progress_file, {
-            'status': 'completed',
+    if cancel_event is not None and cancel_event.is_set():
+        writer.close()
+        print(f"\n⚠️  Sync cancelled after {completed_objects} of {total_objects} objects; workbook not changed")
+        report({
+            'status': 'cancelled',
             'current_object': None,
-            'completed': total_objects,
+            'completed': completed_objects,
+            'total': total_objects,
+            'percent': int((completed_objects / total_objects) * 100) if total_objects else 0,
+            'message': 'Sync cancelled'
+        })
+        return {
+            'success': False,
+            'cancelled': True,
+            'success_count': 0,
+            'error_count': 0,
+            'total_records': 0,
+            'incremental_count': 0,
+            'backup_path': str(backup_path)
+        }
+    
+    # Save all sheets in a single write
+    saved = True
+    if writer.sheets_written:
+        report({
+            'status': 'syncing',
+            'current_object': None,
+            'completed': completed_objects,
             'total': total_objects,
             'percent': 100,
-            'message': f'Sync completed! {success_count} objects synced, {total_records} total records.'
+            'message': 'Saving workbook...'
         })
+        try:
+            writer.save()
+        except Exception as e:
+            print(f"  ⚠️  Error saving workbook: {str(e)}")
+            saved = False
+            error_count += writer.sheets_written
+            success_count = 0
+            total_records = 0
+    else:
+        writer.close()
+    
+    # Watermarks only advance once the rows they describe are on disk
+    if saved and new_watermarks:
+        try:
+            sync_state.update(org, workbook_path, new_watermarks)
+        except Exception as e:
+            print(f"  ⚠️  Error saving sync watermarks: {str(e)}")
+    
+    # Final progress
+    report({
+        'status': 'completed',
+        'current_object': None,
+        'completed': total_objects,
+        'total': total_objects,
+        'percent': 100,
+        'message': f'Sync completed! {success_count} objects synced, {total_records} total records.'
+    })
     
     # Summary
     print(f"\n📈 Sync Summary:")
-    print(f"  ✓ Successfully synced: {success_count} objects")
+    print(f"  ✓ Successfully synced: {success_count} objects ({incremental_count} incremental)")
     print(f"  ⚠️  Errors: {error_count} objects")
     print(f"  📊 Total records: {total_records}")
     print(f"  🕒 Completed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -363,9 +678,27 @@ def sync_all_objects(org, workbook_path, objects_to_sync=None, progress_file=Non
         'success_count': success_count,
         'error_count': error_count,
         'total_records': total_records,
+        'incremental_count': incremental_count,
         'backup_path': str(backup_path)
     }
 
+def start_sync(org, workbook_path, objects_to_sync=None, full_refresh=False):
+    """
+    Run sync_all_objects as a background job; returns (job, created)
+    
+    A sync of the same org and workbook that is still queued or running is returned
+    instead of starting a second one writing the same file.
+    """
+    key = ('sync', org, str(Path(workbook_path).resolve()))
+    
+    def run(job):
+        def on_progress(status):
+            job.add_event({'type': 'progress', 'time': time.time(), **status})
+        return sync_all_objects(org, workbook_path, objects_to_sync, full_refresh=full_refresh,
+                                on_progress=on_progress, cancel_event=job.cancel_event)
+    
+    return job_runner.submit('sync', run, key=key, label=f"Sync {org}")
+
 def create_backup(workbook_path):
     """Create a timestamped backup of the workbook"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -388,6 +721,8 @@ def main():
     parser.add_argument('--objects', nargs='+', help='Specific objects to sync (default: all)')
     parser.add_argument('--output-json', help='Output results as JSON to file')
     parser.add_argument('--progress-file', help='Write progress updates to this file')
+    parser.add_argument('--max-workers', type=int, help=f'Parallel object queries (default: {SYNC_MAX_WORKERS})')
+    parser.add_argument('--full', action='store_true', help='Re-query every row instead of syncing changes since the last run')
     
     args = parser.parse_args()
     
@@ -397,7 +732,8 @@ def main():
         sys.exit(1)
     
     # Execute sync
-    result = sync_all_objects(args.org, args.workbook, args.objects, args.progress_file)
+    result = sync_all_objects(args.org, args.workbook, args.objects, args.progress_file, args.max_workers,
+                              full_refresh=args.full)
     
     # Output JSON if requested
     if args.output_json:
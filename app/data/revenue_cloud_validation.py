@@ -4,17 +4,158 @@ Revenue Cloud Data Validation Module
 Provides comprehensive validation for migration data.
 """
 
+import os
+import sys
+import numpy as np
 import pandas as pd
 import re
 from datetime import datetime
+from functools import partial
 from pathlib import Path
+from typing import Callable, NamedTuple
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.integrity_index import IntegrityIndex, WORKBOOK_OBJECT_SHEETS
+from app.services.workbook_reader import WorkbookReader
+
+# Describe types whose 'length' is a character limit
+TEXT_FIELD_TYPES = {'string', 'textarea', 'url', 'email', 'phone', 'picklist', 'multipicklist', 'encryptedstring'}
+
+SALESFORCE_ID_PATTERN = re.compile(r'^[a-zA-Z0-9]{15,18}$')
+
+
+class ColumnMasks:
+    """Per-column masks and conversions for one sheet, computed once and shared by every rule"""
+    
+    def __init__(self, df):
+        self.df = df
+        self._present = {}
+        self._text = {}
+        self._numeric = {}
+    
+    def __contains__(self, field):
+        return field in self.df.columns
+    
+    def __len__(self):
+        return len(self.df)
+    
+    def present(self, field):
+        """Boolean array: the cell has a value (not null, not '')"""
+        if field not in self._present:
+            column = self.df[field]
+            self._present[field] = (column.notna() & (column != '')).to_numpy(dtype=bool, na_value=False)
+        return self._present[field]
+    
+    def text(self, field):
+        """String values of the present cells (aligned with present(field).nonzero())"""
+        if field not in self._text:
+            self._text[field] = [str(v) for v in self.df[field].to_numpy(dtype=object)[self.present(field)]]
+        return self._text[field]
+    
+    def numeric(self, field):
+        """Column coerced to numbers (NaN where not numeric)"""
+        if field not in self._numeric:
+            self._numeric[field] = pd.to_numeric(self.df[field], errors='coerce')
+        return self._numeric[field]
+    
+    def scatter(self, field, present_mask):
+        """Expand a mask over the present cells to a mask over all rows"""
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[self.present(field).nonzero()[0][present_mask]] = True
+        return mask
+
+
+class CompiledRule(NamedTuple):
+    """A validation rule bound to its parameters; evaluate(columns) yields (severity, field, message, mask)"""
+    name: str
+    evaluate: Callable
+
+
+def check_required(field, columns):
+    if field not in columns:
+        yield 'error', field, f"Required column '{field}' not found", None
+        return
+    missing = ~columns.present(field)
+    if missing.any():
+        yield 'error', field, f"Missing required field '{field}' in {missing.sum()} records", missing
+
+
+def check_unique(field, columns):
+    if field not in columns:
+        return
+    present = columns.present(field)
+    values = columns.df[field][present]
+    duplicated = values.duplicated(keep=False).to_numpy()
+    if duplicated.any():
+        duplicate_values = values[duplicated].unique()
+        error = f"Duplicate values in unique field '{field}': {', '.join(map(str, duplicate_values[:5]))}"
+        if len(duplicate_values) > 5:
+            error += f" and {len(duplicate_values) - 5} more"
+        yield 'error', field, error, columns.scatter(field, duplicated)
+
+
+def check_format(field, pattern, columns):
+    if field not in columns:
+        return
+    invalid = np.fromiter((pattern.match(v) is None for v in columns.text(field)), dtype=bool,
+                          count=len(columns.text(field)))
+    if invalid.any():
+        yield 'warning', field, f"Invalid format in field '{field}' for {invalid.sum()} records", columns.scatter(field, invalid)
+
+
+def check_length(field, max_length, columns):
+    if field not in columns:
+        return
+    too_long = np.fromiter((len(v) > max_length for v in columns.text(field)), dtype=bool,
+                           count=len(columns.text(field)))
+    if too_long.any():
+        yield ('error', field, f"Field '{field}' exceeds maximum length ({max_length}) in {too_long.sum()} records",
+               columns.scatter(field, too_long))
+
+
+def check_numeric(field, constraints, columns):
+    if field not in columns:
+        return
+    numeric_values = columns.numeric(field)
+    
+    # Non-numeric values
+    non_numeric = (numeric_values.isna() & columns.df[field].notna()).to_numpy(dtype=bool, na_value=False)
+    if non_numeric.any():
+        yield 'error', field, f"Non-numeric values in numeric field '{field}' for {non_numeric.sum()} records", non_numeric
+    
+    # Min/max constraints
+    if 'min' in constraints:
+        below_min = (numeric_values < constraints['min']).to_numpy(dtype=bool, na_value=False)
+        if below_min.any():
+            yield 'error', field, f"Values below minimum ({constraints['min']}) in field '{field}'", below_min
+    if 'max' in constraints:
+        above_max = (numeric_values > constraints['max']).to_numpy(dtype=bool, na_value=False)
+        if above_max.any():
+            yield 'error', field, f"Values above maximum ({constraints['max']}) in field '{field}'", above_max
+
+
+def check_id_format(field, columns):
+    # This is a simplified check - in a real scenario, you'd check against actual org data
+    if field not in columns:
+        return
+    invalid = np.fromiter((SALESFORCE_ID_PATTERN.match(v) is None for v in columns.text(field)), dtype=bool,
+                          count=len(columns.text(field)))
+    if invalid.any():
+        yield ('warning', field, f"Invalid Salesforce ID format in field '{field}' for {invalid.sum()} records",
+               columns.scatter(field, invalid))
+
 
 class DataValidator:
-    def __init__(self, workbook_path):
+    def __init__(self, workbook_path, org=None):
         self.workbook_path = Path(workbook_path)
+        self.org = org  # when set, field lengths are also checked against the org's describe
         self.validation_results = {}
         self.errors = []
         self.warnings = []
+        self._compiled_rules = {}
+        self.integrity_index = None  # built by validate_all
         
         # Define validation rules for each object
         self.validation_rules = {
@@ -78,8 +219,6 @@ class DataValidator:
         """Run all validations on the workbook."""
         print("Starting comprehensive data validation...")
         
-        # Load all sheets
-        xl_file = pd.ExcelFile(self.workbook_path)
         sheet_object_mapping = {
             '13_Product2': 'Product2',
             '12_ProductCategory': 'ProductCategory',
@@ -89,170 +228,150 @@ class DataValidator:
             '25_ProductRelatedComponent': 'ProductRelatedComponent'
         }
         
-        for sheet_name, object_name in sheet_object_mapping.items():
-            if sheet_name in xl_file.sheet_names:
-                print(f"\nValidating {object_name}...")
-                df = pd.read_excel(self.workbook_path, sheet_name=sheet_name)
-                self.validate_object(object_name, df)
+        # Stream the mapped sheets in one read-only pass over the workbook
+        with WorkbookReader(self.workbook_path) as reader:
+            tables = {
+                object_name: reader.read_sheet(sheet_name)
+                for sheet_name, object_name in sheet_object_mapping.items()
+                if sheet_name in reader.sheet_names
+            }
+            self.integrity_index = self.build_integrity_index(reader, tables)
+        
+        for object_name, table in tables.items():
+            print(f"\nValidating {object_name}...")
+            self.validate_object(object_name, table.to_dataframe(), table.row_numbers)
         
         return self.get_validation_summary()
     
-    def validate_object(self, object_name, df):
-        """Validate a specific object's data."""
+    def build_integrity_index(self, reader, tables):
+        """Index the Ids and external ids of every object referenced by a relationship rule."""
+        index = IntegrityIndex()
+        referenced = {
+            related_object
+            for rules in self.validation_rules.values()
+            for related_object in rules.get('relationships', {}).values()
+        }
+        for object_name in sorted(referenced):
+            if object_name in tables:
+                index.add_table(object_name, tables[object_name])
+            else:
+                index.add_sheet(reader, object_name, WORKBOOK_OBJECT_SHEETS.get(object_name))
+        if self.org:
+            index.add_org(self.org, sorted(referenced))
+        return index
+    
+    def validate_object(self, object_name, df, row_numbers=None):
+        """
+        Validate a specific object's data.
+        
+        Every rule for the object is evaluated against shared per-column masks; each
+        failure is recorded with the sheet rows it applies to (row_numbers maps
+        DataFrame positions to sheet rows, defaulting to header + position).
+        """
         if object_name not in self.validation_rules:
             return
         
-        rules = self.validation_rules[object_name]
         results = {
             'total_records': len(df),
             'errors': [],
-            'warnings': []
+            'warnings': [],
+            'failures': []
         }
         
         # Clean column names
         df.columns = df.columns.str.replace('*', '', regex=False).str.strip()
+        columns = ColumnMasks(df)
+        if row_numbers is None:
+            row_numbers = np.arange(2, len(df) + 2)
+        row_numbers = np.asarray(row_numbers)
         
-        # 1. Check required fields
-        if 'required_fields' in rules:
-            self.validate_required_fields(df, rules['required_fields'], object_name, results)
+        for rule in self.compile_rules(object_name):
+            for severity, field, message, mask in rule.evaluate(columns):
+                rows = row_numbers[mask] if mask is not None else row_numbers[:0]
+                self.record_failure(object_name, results, rule.name, field, severity, message, rows)
         
-        # 2. Check unique fields
-        if 'unique_fields' in rules:
-            self.validate_unique_fields(df, rules['unique_fields'], object_name, results)
-        
-        # 3. Check field formats
-        if 'field_formats' in rules:
-            self.validate_field_formats(df, rules['field_formats'], object_name, results)
+        self.validation_results[object_name] = results
+    
+    def record_failure(self, object_name, results, rule, field, severity, message, rows):
+        """Add a failure to an object's results and to the workbook-wide error/warning lists."""
+        results['errors' if severity == 'error' else 'warnings'].append(message)
+        (self.errors if severity == 'error' else self.warnings).append(f"{object_name}: {message}")
+        results['failures'].append({
+            'rule': rule,
+            'field': field,
+            'severity': severity,
+            'message': message,
+            'rows': rows.tolist()
+        })
+    
+    def compile_rules(self, object_name):
+        """Turn an object's validation_rules into CompiledRules (cached per object)."""
+        if object_name in self._compiled_rules:
+            return self._compiled_rules[object_name]
         
-        # 4. Check field lengths
-        if 'field_lengths' in rules:
-            self.validate_field_lengths(df, rules['field_lengths'], object_name, results)
+        rules = self.validation_rules[object_name]
+        if self.org:
+            rules = self.add_describe_rules(object_name, rules)
         
-        # 5. Check numeric fields
-        if 'numeric_fields' in rules:
-            self.validate_numeric_fields(df, rules['numeric_fields'], object_name, results)
+        compiled = []
+        for field in rules.get('required_fields', []):
+            compiled.append(CompiledRule('required', partial(check_required, field)))
+        for field in rules.get('unique_fields', []):
+            compiled.append(CompiledRule('unique', partial(check_unique, field)))
+        for field, pattern in rules.get('field_formats', {}).items():
+            compiled.append(CompiledRule('format', partial(check_format, field, re.compile(pattern))))
+        for field, max_length in rules.get('field_lengths', {}).items():
+            compiled.append(CompiledRule('length', partial(check_length, field, max_length)))
+        for field, constraints in rules.get('numeric_fields', {}).items():
+            compiled.append(CompiledRule('numeric', partial(check_numeric, field, constraints)))
+        for field, related_object in rules.get('relationships', {}).items():
+            compiled.append(CompiledRule('relationship', partial(check_id_format, field)))
+            compiled.append(CompiledRule('reference', partial(self.check_references, field, related_object)))
+        for validation_func in rules.get('custom_validations', []):
+            if hasattr(self, validation_func):
+                compiled.append(CompiledRule(validation_func, getattr(self, validation_func)))
         
-        # 6. Check relationships
-        if 'relationships' in rules:
-            self.validate_relationships(df, rules['relationships'], object_name, results)
+        self._compiled_rules[object_name] = compiled
+        return compiled
+    
+    def add_describe_rules(self, object_name, rules):
+        """Add field length limits from the (cached) org describe to an object's rules."""
+        from app.services.describe_cache import describe_cache
         
-        # 7. Run custom validations
-        if 'custom_validations' in rules:
-            for validation_func in rules['custom_validations']:
-                if hasattr(self, validation_func):
-                    getattr(self, validation_func)(df, object_name, results)
+        describe_lengths = {
+            name: field['length']
+            for name, field in describe_cache.fields(self.org, object_name).items()
+            if field.get('type') in TEXT_FIELD_TYPES and field.get('length')
+        }
+        if not describe_lengths:
+            return rules
         
-        self.validation_results[object_name] = results
-    
-    def validate_required_fields(self, df, required_fields, object_name, results):
-        """Check for missing required fields."""
-        for field in required_fields:
-            if field in df.columns:
-                missing = df[df[field].isna() | (df[field] == '')]
-                if len(missing) > 0:
-                    error = f"Missing required field '{field}' in {len(missing)} records"
-                    results['errors'].append(error)
-                    self.errors.append(f"{object_name}: {error}")
-            else:
-                error = f"Required column '{field}' not found"
-                results['errors'].append(error)
-                self.errors.append(f"{object_name}: {error}")
-    
-    def validate_unique_fields(self, df, unique_fields, object_name, results):
-        """Check for duplicate values in unique fields."""
-        for field in unique_fields:
-            if field in df.columns:
-                # Check for duplicates (excluding empty values)
-                non_empty = df[df[field].notna() & (df[field] != '')]
-                duplicates = non_empty[non_empty.duplicated(subset=[field], keep=False)]
-                
-                if len(duplicates) > 0:
-                    duplicate_values = duplicates[field].unique()
-                    error = f"Duplicate values in unique field '{field}': {', '.join(map(str, duplicate_values[:5]))}"
-                    if len(duplicate_values) > 5:
-                        error += f" and {len(duplicate_values) - 5} more"
-                    results['errors'].append(error)
-                    self.errors.append(f"{object_name}: {error}")
+        # Explicit rules win over the describe
+        return dict(rules, field_lengths={**describe_lengths, **rules.get('field_lengths', {})})
     
-    def validate_field_formats(self, df, field_formats, object_name, results):
-        """Validate field format using regex patterns."""
-        for field, pattern in field_formats.items():
-            if field in df.columns:
-                # Check non-empty values against pattern
-                non_empty = df[df[field].notna() & (df[field] != '')]
-                if len(non_empty) > 0:
-                    invalid = non_empty[~non_empty[field].astype(str).str.match(pattern)]
-                    if len(invalid) > 0:
-                        warning = f"Invalid format in field '{field}' for {len(invalid)} records"
-                        results['warnings'].append(warning)
-                        self.warnings.append(f"{object_name}: {warning}")
-    
-    def validate_field_lengths(self, df, field_lengths, object_name, results):
-        """Check field length constraints."""
-        for field, max_length in field_lengths.items():
-            if field in df.columns:
-                # Check string length
-                non_empty = df[df[field].notna() & (df[field] != '')]
-                if len(non_empty) > 0:
-                    too_long = non_empty[non_empty[field].astype(str).str.len() > max_length]
-                    if len(too_long) > 0:
-                        error = f"Field '{field}' exceeds maximum length ({max_length}) in {len(too_long)} records"
-                        results['errors'].append(error)
-                        self.errors.append(f"{object_name}: {error}")
-    
-    def validate_numeric_fields(self, df, numeric_fields, object_name, results):
-        """Validate numeric field ranges."""
-        for field, constraints in numeric_fields.items():
-            if field in df.columns:
-                numeric_values = pd.to_numeric(df[field], errors='coerce')
-                
-                # Check for non-numeric values
-                non_numeric = df[numeric_values.isna() & df[field].notna()]
-                if len(non_numeric) > 0:
-                    error = f"Non-numeric values in numeric field '{field}' for {len(non_numeric)} records"
-                    results['errors'].append(error)
-                    self.errors.append(f"{object_name}: {error}")
-                
-                # Check min/max constraints
-                if 'min' in constraints:
-                    below_min = numeric_values < constraints['min']
-                    if below_min.any():
-                        error = f"Values below minimum ({constraints['min']}) in field '{field}'"
-                        results['errors'].append(error)
-                        self.errors.append(f"{object_name}: {error}")
-                
-                if 'max' in constraints:
-                    above_max = numeric_values > constraints['max']
-                    if above_max.any():
-                        error = f"Values above maximum ({constraints['max']}) in field '{field}'"
-                        results['errors'].append(error)
-                        self.errors.append(f"{object_name}: {error}")
-    
-    def validate_relationships(self, df, relationships, object_name, results):
-        """Validate foreign key relationships."""
-        # This is a simplified check - in a real scenario, you'd check against actual org data
-        for field, related_object in relationships.items():
-            if field in df.columns:
-                non_empty = df[df[field].notna() & (df[field] != '')]
-                if len(non_empty) > 0:
-                    # Check if IDs follow Salesforce format
-                    invalid_ids = non_empty[~non_empty[field].astype(str).str.match(r'^[a-zA-Z0-9]{15,18}$')]
-                    if len(invalid_ids) > 0:
-                        warning = f"Invalid Salesforce ID format in field '{field}' for {len(invalid_ids)} records"
-                        results['warnings'].append(warning)
-                        self.warnings.append(f"{object_name}: {warning}")
+    def check_references(self, field, related_object, columns):
+        """Find references to records that are neither in the workbook nor (with an org) in the org."""
+        index = self.integrity_index
+        if index is None or field not in columns or related_object not in index:
+            return
+        orphans = index.missing(related_object, columns.df[field].to_numpy(dtype=object))
+        if orphans.any():
+            sources = index.objects[related_object].sources
+            # Only the org is authoritative; a record missing from the workbook may already exist there
+            severity = 'error' if any(source.startswith('org') for source in sources) else 'warning'
+            message = (f"Field '{field}' references {related_object} records not found in "
+                       f"{' or '.join(sources)} for {orphans.sum()} records")
+            yield severity, field, message, orphans
     
-    def validate_quantity_range(self, df, object_name, results):
+    def validate_quantity_range(self, columns):
         """Custom validation for quantity ranges."""
-        if 'MinQuantity' in df.columns and 'MaxQuantity' in df.columns:
+        if 'MinQuantity' in columns and 'MaxQuantity' in columns:
             # Check that MinQuantity <= MaxQuantity
-            both_present = df[(df['MinQuantity'].notna()) & (df['MaxQuantity'].notna())]
-            if len(both_present) > 0:
-                invalid_range = both_present[both_present['MinQuantity'] > both_present['MaxQuantity']]
-                if len(invalid_range) > 0:
-                    error = f"MinQuantity > MaxQuantity in {len(invalid_range)} records"
-                    results['errors'].append(error)
-                    self.errors.append(f"{object_name}: {error}")
+            min_quantity = columns.numeric('MinQuantity')
+            max_quantity = columns.numeric('MaxQuantity')
+            invalid_range = (min_quantity > max_quantity).to_numpy(dtype=bool, na_value=False)
+            if invalid_range.any():
+                yield 'error', 'MinQuantity', f"MinQuantity > MaxQuantity in {invalid_range.sum()} records", invalid_range
     
     def get_validation_summary(self):
         """Get a summary of all validation results."""
@@ -303,12 +422,17 @@ class DataValidator:
                 f.write(f"  Total Records: {results['total_records']}\n")
                 f.write(f"  Errors: {len(results['errors'])}\n")
                 f.write(f"  Warnings: {len(results['warnings'])}\n")
+                for failure in results.get('failures', []):
+                    rows = failure['rows']
+                    if rows:
+                        shown = ', '.join(map(str, rows[:10])) + (f" (+{len(rows) - 10} more)" if len(rows) > 10 else '')
+                        f.write(f"    {failure['message']} - rows {shown}\n")
         
         return output_file
 
-def validate_workbook(workbook_path):
+def validate_workbook(workbook_path, org=None):
     """Convenience function to validate a workbook."""
-    validator = DataValidator(workbook_path)
+    validator = DataValidator(workbook_path, org=org)
     summary = validator.validate_all()
     
     print("\nValidation Summary:")
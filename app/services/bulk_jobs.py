@@ -0,0 +1,402 @@
+"""
+Bulk Jobs
+Bulk API 2.0 loads split into chunks that run as concurrent ingest jobs, with a SQLite journal
+so interrupted loads resume without resubmitting, and per-record results kept for querying
+"""
+import csv
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config.settings.app_config import (
+    BULK_JOURNAL_DB,
+    BULK_CHUNK_ROWS,
+    BULK_CHUNK_MB,
+    BULK_MAX_CONCURRENT_JOBS
+)
+from app.services.id_crosswalk import id_crosswalk
+from app.services.integrity_index import EXTERNAL_ID_FIELDS
+from app.services.salesforce_client import get_client, SalesforceApiError
+
+# Chunk states: Pending -> Open (job created, data not yet closed) -> Submitted -> Done,
+# or Failed/Aborted when the whole job failed (retried on the next run)
+DONE_STATE = 'Done'
+
+# run_chunk outcome for chunks left Pending because the load was cancelled
+CANCELLED = 'cancelled'
+
+
+def encode_csv_row(values: Sequence[Any]) -> bytes:
+    """One CSV line (LF line ending, as declared to the Bulk API)"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(['' if v is None else v for v in values])
+    return buffer.getvalue().encode('utf-8')
+
+
+class BulkJournal:
+    """SQLite record of loads, their chunks (with job ids) and per-record results"""
+
+    def __init__(self, db_path: Path = BULK_JOURNAL_DB):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS loads ("
+                "load_id TEXT PRIMARY KEY, org TEXT NOT NULL, sobject TEXT NOT NULL, operation TEXT NOT NULL, "
+                "external_id_field TEXT, total_rows INTEGER NOT NULL, chunk_count INTEGER NOT NULL, "
+                "state TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "load_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, row_start INTEGER NOT NULL, "
+                "row_count INTEGER NOT NULL, job_id TEXT, state TEXT NOT NULL, processed INTEGER DEFAULT 0, "
+                "failed INTEGER DEFAULT 0, error TEXT, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (load_id, chunk_index))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "load_id TEXT NOT NULL, chunk_index INTEGER NOT NULL, row_number INTEGER, "
+                "outcome TEXT NOT NULL, sf_id TEXT, error TEXT, record TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_load ON results (load_id, outcome)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def start_load(self, load_id: str, org: str, sobject: str, operation: str, external_id_field: Optional[str],
+                   chunks: List[Tuple[int, int]]) -> Dict[int, Dict]:
+        """
+        Register a load and return its chunks' journal rows by index
+
+        An unfinished load with the same id is resumed; a Complete one is started over,
+        so re-running an identical load sends every row again (its failures included).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            previous = conn.execute("SELECT state FROM loads WHERE load_id = ?", (load_id,)).fetchone()
+            if previous is not None and previous['state'] == 'Complete':
+                conn.execute("DELETE FROM results WHERE load_id = ?", (load_id,))
+                conn.execute("DELETE FROM chunks WHERE load_id = ?", (load_id,))
+                conn.execute("DELETE FROM loads WHERE load_id = ?", (load_id,))
+            conn.execute(
+                "INSERT OR IGNORE INTO loads VALUES (?, ?, ?, ?, ?, ?, ?, 'Running', ?, ?)",
+                (load_id, org, sobject, operation, external_id_field, sum(c[1] for c in chunks), len(chunks), now, now)
+            )
+            conn.execute("UPDATE loads SET state = 'Running', updated_at = ? WHERE load_id = ?", (now, load_id))
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunks (load_id, chunk_index, row_start, row_count, state, updated_at) "
+                "VALUES (?, ?, ?, ?, 'Pending', ?)",
+                [(load_id, index, start, count, now) for index, (start, count) in enumerate(chunks)]
+            )
+        rows = self._connect().execute("SELECT * FROM chunks WHERE load_id = ?", (load_id,)).fetchall()
+        return {row['chunk_index']: dict(row) for row in rows}
+
+    def update_chunk(self, load_id: str, chunk_index: int, **values) -> None:
+        values['updated_at'] = time.time()
+        assignments = ', '.join(f"{key} = ?" for key in values)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE chunks SET {assignments} WHERE load_id = ? AND chunk_index = ?",
+                         (*values.values(), load_id, chunk_index))
+
+    def complete_chunk(self, load_id: str, chunk_index: int, processed: int, failed: int,
+                       results: List[Tuple]) -> None:
+        """Store a finished chunk's results and mark it done, atomically"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE load_id = ? AND chunk_index = ?", (load_id, chunk_index))
+            conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(load_id, chunk_index, *result) for result in results])
+            conn.execute(
+                "UPDATE chunks SET state = ?, processed = ?, failed = ?, error = NULL, updated_at = ? "
+                "WHERE load_id = ? AND chunk_index = ?",
+                (DONE_STATE, processed, failed, time.time(), load_id, chunk_index)
+            )
+
+    def finish_load(self, load_id: str, state: str) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE loads SET state = ?, updated_at = ? WHERE load_id = ?", (state, time.time(), load_id))
+
+    def load_summary(self, load_id: str) -> Optional[Dict]:
+        """A load with its chunk states and record totals"""
+        conn = self._connect()
+        load = conn.execute("SELECT * FROM loads WHERE load_id = ?", (load_id,)).fetchone()
+        if not load:
+            return None
+        chunks = [dict(row) for row in conn.execute(
+            "SELECT * FROM chunks WHERE load_id = ? ORDER BY chunk_index", (load_id,))]
+        summary = dict(load)
+        summary['chunks'] = chunks
+        summary['processed'] = sum(c['processed'] or 0 for c in chunks)
+        summary['failed'] = sum(c['failed'] or 0 for c in chunks)
+        return summary
+
+    def list_loads(self, org: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        query, params = "SELECT * FROM loads", []
+        if org:
+            query += " WHERE org = ?"
+            params.append(org)
+        query += " ORDER BY updated_at DESC LIMIT ?"
+        params.append(limit)
+        return [dict(row) for row in self._connect().execute(query, params)]
+
+    def outcome_counts(self, load_id: str) -> Dict[str, int]:
+        """Number of stored results per outcome (failed, created, updated) for a load"""
+        rows = self._connect().execute(
+            "SELECT outcome, COUNT(*) FROM results WHERE load_id = ? GROUP BY outcome", (load_id,)
+        ).fetchall()
+        return {outcome: count for outcome, count in rows}
+
+    def loaded_row_numbers(self, load_id: str) -> List[int]:
+        """Row numbers of a load's records that were created or updated"""
+        rows = self._connect().execute(
+            "SELECT row_number FROM results WHERE load_id = ? AND outcome IN ('created', 'updated')", (load_id,)
+        ).fetchall()
+        return [row[0] for row in rows if row[0] is not None]
+
+    def loaded_record_ids(self, load_id: str) -> Dict[int, str]:
+        """Salesforce Ids of a load's created or updated records, by row number"""
+        rows = self._connect().execute(
+            "SELECT row_number, sf_id FROM results WHERE load_id = ? AND outcome IN ('created', 'updated')",
+            (load_id,)
+        ).fetchall()
+        return {row[0]: row[1] for row in rows if row[0] is not None and row[1]}
+
+    def results(self, load_id: Optional[str] = None, sobject: Optional[str] = None,
+                outcome: Optional[str] = 'failed', error_contains: Optional[str] = None,
+                limit: int = 100, offset: int = 0) -> List[Dict]:
+        """Per-record results (failures by default), filtered by load, object, outcome or error text"""
+        query = ("SELECT r.*, l.org, l.sobject FROM results r JOIN loads l ON l.load_id = r.load_id WHERE 1 = 1")
+        params: List[Any] = []
+        for clause, value in (("r.load_id = ?", load_id), ("l.sobject = ?", sobject), ("r.outcome = ?", outcome)):
+            if value is not None:
+                query += f" AND {clause}"
+                params.append(value)
+        if error_contains:
+            query += " AND r.error LIKE ?"
+            params.append(f"%{error_contains}%")
+        query += " ORDER BY r.chunk_index, r.row_number LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        rows = []
+        for row in self._connect().execute(query, params):
+            item = dict(row)
+            item['record'] = json.loads(item['record']) if item['record'] else None
+            rows.append(item)
+        return rows
+
+
+class BulkJobManager:
+    """
+    Runs Bulk API 2.0 loads in chunks
+
+    Rows are split into chunks of at most `chunk_rows` rows / `chunk_mb` of CSV; up to
+    `max_concurrent` chunks run as separate ingest jobs at once. A load's id is derived
+    from its org, object, operation and content, so re-running an interrupted (or
+    failed / cancelled) load picks up its journal: finished chunks are skipped and
+    submitted jobs are polled again rather than resubmitted. Re-running a load that
+    completed sends it again.
+    """
+
+    def __init__(self, journal: Optional[BulkJournal] = None, chunk_rows: int = BULK_CHUNK_ROWS,
+                 chunk_mb: float = BULK_CHUNK_MB, max_concurrent: int = BULK_MAX_CONCURRENT_JOBS):
+        self._journal = journal
+        self.chunk_rows = chunk_rows
+        self.chunk_bytes = int(chunk_mb * 1024 * 1024)
+        self.max_concurrent = max_concurrent
+        self._journal_lock = threading.Lock()
+
+    @property
+    def journal(self) -> BulkJournal:
+        """Opened on first use so importing the module doesn't create the database"""
+        with self._journal_lock:
+            if self._journal is None:
+                self._journal = BulkJournal()
+            return self._journal
+
+    def split(self, fields: Sequence[str], rows: Iterable[Sequence[Any]]) -> Tuple[List[bytes], List[Tuple[int, int]], str]:
+        """Encode rows into CSV chunks; returns (chunk bodies, (row start, row count) per chunk, content hash)"""
+        header = encode_csv_row(fields)
+        digest = hashlib.sha256(header)
+        bodies, bounds = [], []
+        parts, size, start, count = [header], len(header), 0, 0
+        for row in rows:
+            line = encode_csv_row(row)
+            digest.update(line)
+            if count and (count >= self.chunk_rows or size + len(line) > self.chunk_bytes):
+                bodies.append(b''.join(parts))
+                bounds.append((start, count))
+                parts, size, start, count = [header], len(header), start + count, 0
+            parts.append(line)
+            size += len(line)
+            count += 1
+        if count:
+            bodies.append(b''.join(parts))
+            bounds.append((start, count))
+        return bodies, bounds, digest.hexdigest()
+
+    def load(self, org: str, sobject: str, operation: str, fields: Sequence[str], rows: Iterable[Sequence[Any]],
+             external_id_field: Optional[str] = None, row_numbers: Optional[Sequence[int]] = None,
+             collect_successes: bool = True,
+             on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+             cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Load rows (value sequences in `fields` order) into an sObject
+
+        row_numbers maps row positions to the numbers stored with each result (e.g.
+        sheet rows); by default positions are numbered from 1. Returns a summary with
+        success, load_id, processed/failed counts and any job-level errors. Once
+        cancel_event is set no further chunks are submitted (submitted ones finish);
+        re-running the load resumes with the rest.
+        """
+        client = get_client(org)
+        if not client:
+            return {'success': False, 'error': f"No API access token available for org {org}"}
+
+        fields = list(fields)
+        bodies, bounds, content_hash = self.split(fields, rows)
+        if not bodies:
+            return {'success': True, 'load_id': None, 'processed': 0, 'failed': 0, 'total': 0}
+
+        load_key = json.dumps([org, sobject, operation, external_id_field, content_hash])
+        load_id = hashlib.sha256(load_key.encode('utf-8')).hexdigest()[:32]
+        journal = self.journal
+        chunks = journal.start_load(load_id, org, sobject, operation, external_id_field, bounds)
+        total = sum(count for _, count in bounds)
+
+        progress = {'load_id': load_id, 'sobject': sobject, 'total': total, 'chunks': len(bodies),
+                    'chunks_done': 0, 'processed': 0, 'failed': 0}
+        progress_lock = threading.Lock()
+
+        def chunk_finished(processed, failed):
+            with progress_lock:
+                progress['chunks_done'] += 1
+                progress['processed'] += processed
+                progress['failed'] += failed
+                snapshot = dict(progress)
+            if on_progress:
+                on_progress(snapshot)
+
+        def number(position):
+            return row_numbers[position] if row_numbers is not None else position + 1
+
+        def run_chunk(index):
+            chunk = chunks[index]
+            if chunk['state'] == DONE_STATE:
+                chunk_finished(chunk['processed'] or 0, chunk['failed'] or 0)
+                return None
+            if cancel_event is not None and cancel_event.is_set() and chunk['state'] != 'Submitted':
+                return CANCELLED
+            try:
+                processed, failed = self._run_chunk(client, load_id, sobject, operation, external_id_field,
+                                                    fields, chunk, bodies[index], number, collect_successes)
+                chunk_finished(processed, failed)
+                return None
+            except Exception as e:
+                journal.update_chunk(load_id, index, state='Failed', error=str(e))
+                chunk_finished(0, 0)
+                return f"Chunk {index + 1}: {e}"
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='bulk-chunk') as executor:
+            outcomes = list(executor.map(run_chunk, range(len(bodies))))
+        errors = [error for error in outcomes if error and error is not CANCELLED]
+        cancelled = CANCELLED in outcomes
+
+        journal.finish_load(load_id, 'Cancelled' if cancelled else 'Failed' if errors else 'Complete')
+        summary = journal.load_summary(load_id)
+        return {
+            'success': not errors and not cancelled,
+            'cancelled': cancelled,
+            'load_id': load_id,
+            'total': total,
+            'processed': summary['processed'],
+            'failed': summary['failed'],
+            'errors': errors
+        }
+
+    def _run_chunk(self, client, load_id, sobject, operation, external_id_field, fields, chunk, body,
+                   number, collect_successes) -> Tuple[int, int]:
+        """Submit (or resume) one chunk's job, wait for it and store its results"""
+        journal = self.journal
+        index, job_id = chunk['chunk_index'], chunk['job_id']
+
+        if job_id and chunk['state'] == 'Open':
+            # Interrupted between create and close: the upload may be partial, start over
+            try:
+                client.abort_job(job_id)
+            except SalesforceApiError:
+                pass
+            job_id = None
+        if job_id and chunk['state'] in ('Failed', 'Aborted'):
+            job_id = None
+
+        if not job_id:
+            job = client.create_ingest_job(sobject, operation, external_id_field)
+            job_id = job['id']
+            journal.update_chunk(load_id, index, job_id=job_id, state='Open', error=None)
+            try:
+                client.upload_job_data(job_id, body)
+                client.close_job(job_id)
+            except SalesforceApiError:
+                client.abort_job(job_id)
+                raise
+            journal.update_chunk(load_id, index, state='Submitted')
+
+        job = client.wait_for_job(job_id)
+        state = job.get('state')
+        if state != 'JobComplete':
+            journal.update_chunk(load_id, index, state=state or 'Failed', error=job.get('errorMessage'))
+            raise SalesforceApiError(f"Job {job_id} ended in state {state}: {job.get('errorMessage', '')}")
+
+        # Map result rows back to input rows by their values (results echo the submitted columns)
+        positions = defaultdict(deque)
+        reader = csv.reader(io.StringIO(body.decode('utf-8')))
+        next(reader, None)
+        for offset, values in enumerate(reader):
+            positions[tuple(values)].append(chunk['row_start'] + offset)
+
+        def row_number(result):
+            matches = positions.get(tuple(result.get(f, '') for f in fields))
+            return number(matches.popleft()) if matches else None
+
+        results = []
+        for result in client.get_job_results(job_id, 'failedResults'):
+            record = {f: result.get(f) for f in fields}
+            results.append((row_number(result), 'failed', result.get('sf__Id') or None, result.get('sf__Error'),
+                            json.dumps(record)))
+        # External-id columns feed the Id crosswalk used to resolve later references
+        key_fields = [f for f in fields if f != 'Id' and (f == external_id_field or f in EXTERNAL_ID_FIELDS)]
+        if collect_successes or key_fields:
+            loaded = []
+            for result in client.get_job_results(job_id, 'successfulResults'):
+                if collect_successes:
+                    outcome = 'created' if str(result.get('sf__Created')).lower() == 'true' else 'updated'
+                    results.append((row_number(result), outcome, result.get('sf__Id'), None, None))
+                if key_fields:
+                    loaded.append(dict(result, Id=result.get('sf__Id')))
+            if loaded:
+                try:
+                    id_crosswalk.record_records(client.org, sobject, loaded, key_fields, source=f"bulk {load_id}")
+                except sqlite3.Error as e:
+                    print(f"  ⚠️  Could not record Ids in the crosswalk: {e}")
+
+        failed = int(job.get('numberRecordsFailed') or 0)
+        processed = int(job.get('numberRecordsProcessed') or 0)
+        journal.complete_chunk(load_id, index, processed, failed, results)
+        return processed, failed
+
+
+# Singleton instance
+bulk_job_manager = BulkJobManager()
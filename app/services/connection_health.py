@@ -0,0 +1,109 @@
+"""
+Connection Health
+TTL'd connection status cache with a background refresher
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from config.settings.app_config import (
+    CONNECTION_HEALTH_TTL,
+    CONNECTION_HEALTH_INTERVAL,
+    CONNECTION_HEALTH_WORKERS
+)
+
+
+class ConnectionHealth:
+    """
+    Tracks when each connection was last checked and re-checks stale ones in the background
+
+    check(connection_id) does the actual (slow) verification; on_checked(connection_id,
+    result, checked_at) is called with whatever it returned.
+    """
+
+    def __init__(self, check: Callable[[str], Any], on_checked: Callable[[str, Any, float], None],
+                 ttl: float = CONNECTION_HEALTH_TTL, interval: float = CONNECTION_HEALTH_INTERVAL,
+                 max_workers: int = CONNECTION_HEALTH_WORKERS):
+        self.check = check
+        self.on_checked = on_checked
+        self.ttl = ttl
+        self.interval = interval
+        self._checked_at: Dict[str, float] = {}  # connection_id -> time.time()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='conn-health')
+        self._ids_provider: Optional[Callable[[], Iterable[str]]] = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def seed(self, connection_id: str, checked_at: Optional[float]) -> None:
+        """Record a check time restored from saved connections"""
+        if checked_at:
+            with self._lock:
+                self._checked_at[connection_id] = checked_at
+
+    def age(self, connection_id: str) -> Optional[float]:
+        """Seconds since the connection was last checked, or None if never"""
+        checked_at = self._checked_at.get(connection_id)
+        return None if checked_at is None else max(0.0, time.time() - checked_at)
+
+    def is_stale(self, connection_id: str) -> bool:
+        age = self.age(connection_id)
+        return age is None or age > self.ttl
+
+    def record(self, connection_id: str) -> float:
+        """Note that a connection was just checked; returns the check time"""
+        checked_at = time.time()
+        with self._lock:
+            self._checked_at[connection_id] = checked_at
+        return checked_at
+
+    def forget(self, connection_id: str) -> None:
+        with self._lock:
+            self._checked_at.pop(connection_id, None)
+
+    def refresh(self, connection_ids: Iterable[str], force: bool = False) -> None:
+        """Queue checks for stale (or, with force, all) connections; returns immediately"""
+        for connection_id in connection_ids:
+            with self._lock:
+                if connection_id in self._in_flight:
+                    continue
+                if not force and not self.is_stale(connection_id):
+                    continue
+                self._in_flight.add(connection_id)
+            try:
+                self._executor.submit(self._run_check, connection_id)
+            except RuntimeError:
+                # Executor shut down
+                with self._lock:
+                    self._in_flight.discard(connection_id)
+
+    def _run_check(self, connection_id: str) -> None:
+        try:
+            result = self.check(connection_id)
+            self.on_checked(connection_id, result, self.record(connection_id))
+        except Exception as e:
+            print(f"Error checking connection {connection_id}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(connection_id)
+
+    def start(self, ids_provider: Callable[[], Iterable[str]]) -> None:
+        """Start the periodic background refresher"""
+        self._ids_provider = ids_provider
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='conn-health-timer', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh(list(self._ids_provider()))
+            except Exception as e:
+                print(f"Error refreshing connection health: {e}")
+            self._stop.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
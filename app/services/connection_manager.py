@@ -2,15 +2,22 @@
 Salesforce Connection Manager
 Manages saved Salesforce CLI connections for the Revenue Cloud Migration Tool
 """
+import atexit
 import json
+import os
 import subprocess
+import threading
 import time
 import uuid
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
-from config.settings.app_config import CONNECTION_FILE, MAX_SAVED_CONNECTIONS, CLI_COMMAND, DEFAULT_CLI_TIMEOUT
+from config.settings.app_config import (
+    CONNECTION_FILE, MAX_SAVED_CONNECTIONS, CLI_COMMAND, DEFAULT_CLI_TIMEOUT, CONNECTION_SAVE_DELAY
+)
+from app.services.salesforce_client import get_client, invalidate_client, SalesforceApiError
+from app.services.connection_health import ConnectionHealth
 
 
 class ConnectionManager:
@@ -19,7 +26,14 @@ class ConnectionManager:
     def __init__(self):
         self.connections_file = CONNECTION_FILE
         self.connections = []
+        self._lock = threading.RLock()
+        self._save_timer = None
+        self.health = ConnectionHealth(self._check_by_id, self._apply_check)
         self.load_connections()
+        for conn in self.connections:
+            if conn.get('status_checked_at'):
+                self.health.seed(conn['id'], datetime.fromisoformat(conn['status_checked_at']).timestamp())
+        atexit.register(self.flush_pending_save)
     
     def load_connections(self) -> None:
         """Load saved connections from file"""
@@ -36,16 +50,47 @@ class ConnectionManager:
     
     def save_connections(self) -> None:
         """Save connections to file"""
-        self.connections_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.connections_file, 'w') as f:
-            json.dump({'connections': self.connections}, f, indent=2)
+        with self._lock:
+            self.connections_file.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename so concurrent readers never see a partial file
+            temp_file = self.connections_file.with_suffix('.json.tmp')
+            with open(temp_file, 'w') as f:
+                json.dump({'connections': self.connections}, f, indent=2)
+            os.replace(temp_file, self.connections_file)
+    
+    def schedule_save(self) -> None:
+        """Save connections once after CONNECTION_SAVE_DELAY, coalescing bursts of updates"""
+        with self._lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(CONNECTION_SAVE_DELAY, self.flush_pending_save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def flush_pending_save(self) -> None:
+        """Write a scheduled save now, if one is pending"""
+        with self._lock:
+            if self._save_timer is None:
+                return
+            self._save_timer.cancel()
+            self._save_timer = None
+            self.save_connections()
     
     def get_all_connections(self) -> List[Dict]:
-        """Get all saved connections"""
-        # Update status for each connection
-        for conn in self.connections:
-            self.verify_connection(conn['id'])
-        return self.connections
+        """
+        Get all saved connections with their last known status
+        
+        Never blocks on the org: stale statuses are re-checked in the background and
+        each connection carries 'status_age' (seconds since last check, None if never).
+        """
+        self.health.start(lambda: [c['id'] for c in self.connections])
+        self.health.refresh([c['id'] for c in self.connections])
+        
+        with self._lock:
+            connections = []
+            for conn in self.connections:
+                age = self.health.age(conn['id'])
+                connections.append(dict(conn, status_age=None if age is None else int(age)))
+            return connections
     
     def get_connection(self, connection_id: str) -> Optional[Dict]:
         """Get a specific connection by ID"""
@@ -108,11 +153,13 @@ class ConnectionManager:
                 'created_at': datetime.now().isoformat(),
                 'last_used': datetime.now().isoformat(),
                 'status': 'active',
+                'status_checked_at': datetime.fromtimestamp(self.health.record(f"conn_{timestamp}")).isoformat(),
                 'metadata': org_info
             }
             
-            self.connections.append(connection)
-            self.save_connections()
+            with self._lock:
+                self.connections.append(connection)
+                self.save_connections()
             
             return True, connection
             
@@ -122,11 +169,38 @@ class ConnectionManager:
             return False, {'error': f'Unexpected error: {str(e)}'}
     
     def verify_connection(self, connection_id: str) -> bool:
-        """Verify if a connection is still valid"""
+        """Verify now if a connection is still valid"""
         connection = self.get_connection(connection_id)
         if not connection:
             return False
         
+        result = self._check_connection(connection)
+        self._apply_check(connection_id, result, self.health.record(connection_id))
+        return result[0] == 'active'
+    
+    def _check_by_id(self, connection_id: str) -> Tuple[str, Optional[Dict]]:
+        connection = self.get_connection(connection_id)
+        if not connection:
+            return 'error', None
+        return self._check_connection(connection)
+    
+    def _check_connection(self, connection: Dict) -> Tuple[str, Optional[Dict]]:
+        """Check a connection against its org; returns (status, fresh metadata or None)"""
+        # Fast path: a cheap REST call with the cached access token
+        client = get_client(connection['cli_alias'])
+        if client:
+            try:
+                client.limits()
+                return 'active', {
+                    'org_id': client.org_info.get('org_id'),
+                    'instance_url': client.org_info.get('instance_url'),
+                    'username': client.org_info.get('username'),
+                    'api_version': client.org_info.get('api_version')
+                }
+            except SalesforceApiError:
+                # Token no longer usable; let the CLI decide the status
+                invalidate_client(connection['cli_alias'])
+        
         try:
             # Use org display to check connection
             result = subprocess.run(
@@ -139,27 +213,31 @@ class ConnectionManager:
             if result.returncode == 0:
                 data = json.loads(result.stdout)
                 if data.get('status') == 0:
-                    # Update metadata
                     org_info = data.get('result', {})
-                    connection['metadata'] = {
+                    return 'active', {
                         'org_id': org_info.get('id'),
                         'instance_url': org_info.get('instanceUrl'),
                         'username': org_info.get('username'),
                         'api_version': org_info.get('apiVersion')
                     }
-                    connection['status'] = 'active'
-                else:
-                    connection['status'] = 'error'
-            else:
-                connection['status'] = 'expired'
-            
-            self.save_connections()
-            return connection['status'] == 'active'
+                return 'error', None
+            return 'expired', None
             
         except Exception:
-            connection['status'] = 'error'
-            self.save_connections()
-            return False
+            return 'error', None
+    
+    def _apply_check(self, connection_id: str, result: Tuple[str, Optional[Dict]], checked_at: float) -> None:
+        """Store a check result on the connection and schedule a save"""
+        status, metadata = result
+        with self._lock:
+            connection = self.get_connection(connection_id)
+            if not connection:
+                return
+            if metadata:
+                connection['metadata'] = metadata
+            connection['status'] = status
+            connection['status_checked_at'] = datetime.fromtimestamp(checked_at).isoformat()
+        self.schedule_save()
     
     def refresh_connection(self, connection_id: str) -> Tuple[bool, str]:
         """Refresh an expired connection"""
@@ -182,15 +260,19 @@ class ConnectionManager:
         
         try:
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=DEFAULT_CLI_TIMEOUT)
+            invalidate_client(connection['cli_alias'])
             
             if result.returncode == 0:
                 # Update connection info
                 org_info = self._get_org_info(connection['cli_alias'])
                 if org_info:
-                    connection['metadata'] = org_info
-                    connection['status'] = 'active'
-                    connection['last_used'] = datetime.now().isoformat()
-                    self.save_connections()
+                    with self._lock:
+                        connection['metadata'] = org_info
+                        connection['status'] = 'active'
+                        connection['status_checked_at'] = datetime.fromtimestamp(
+                            self.health.record(connection_id)).isoformat()
+                        connection['last_used'] = datetime.now().isoformat()
+                        self.save_connections()
                     return True, "Connection refreshed successfully"
                 
             return False, "Failed to refresh connection"
@@ -213,10 +295,13 @@ class ConnectionManager:
             )
         except:
             pass  # Continue even if logout fails
+        invalidate_client(connection['cli_alias'])
+        self.health.forget(connection_id)
         
         # Remove from saved connections
-        self.connections = [c for c in self.connections if c['id'] != connection_id]
-        self.save_connections()
+        with self._lock:
+            self.connections = [c for c in self.connections if c['id'] != connection_id]
+            self.save_connections()
         return True
     
     def set_active_connection(self, session: Dict, connection_id: str) -> bool:
@@ -226,7 +311,7 @@ class ConnectionManager:
             connection['last_used'] = datetime.now().isoformat()
             session['active_connection_id'] = connection_id
             session['active_connection_alias'] = connection['cli_alias']
-            self.save_connections()
+            self.schedule_save()
             return True
         return False
     
@@ -269,6 +354,19 @@ class ConnectionManager:
         if not connection:
             return False, {'error': 'Connection not found'}
         
+        client = get_client(connection['cli_alias'])
+        if client:
+            try:
+                client.query('SELECT COUNT() FROM User LIMIT 1')
+                return True, {
+                    'success': True,
+                    'message': 'Connection test successful',
+                    'org_id': connection['metadata'].get('org_id'),
+                    'username': connection['metadata'].get('username')
+                }
+            except SalesforceApiError:
+                invalidate_client(connection['cli_alias'])
+        
         try:
             # Run a simple query to test the connection
             result = subprocess.run(
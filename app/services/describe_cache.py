@@ -0,0 +1,226 @@
+"""
+Describe Cache
+sObject describe results cached in memory and on disk, keyed by org id, sObject and API version
+"""
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings.app_config import CLI_COMMAND, DESCRIBE_CACHE_DIR, DESCRIBE_CACHE_TTL, SALESFORCE_API_VERSION
+from app.services.salesforce_client import get_client, SalesforceApiError
+
+# Parts of a describe worth keeping; the rest (urls, child relationships, layouts) is dropped
+OBJECT_KEYS = ('name', 'label', 'labelPlural', 'keyPrefix', 'custom', 'createable', 'updateable',
+               'deletable', 'queryable')
+FIELD_KEYS = ('name', 'label', 'type', 'length', 'precision', 'scale', 'nillable', 'createable',
+              'updateable', 'defaultedOnCreate', 'calculated', 'unique', 'externalId', 'idLookup',
+              'custom', 'referenceTo', 'relationshipName')
+
+# Error fragments meaning the sObject doesn't exist (or isn't visible) in the org
+NOT_FOUND_MARKERS = ('NOT_FOUND', 'INVALID_TYPE', 'does not exist')
+
+
+def compact_describe(describe: Dict) -> Dict:
+    """Keep only the object and field attributes the tools use"""
+    compact = {key: describe.get(key) for key in OBJECT_KEYS}
+    fields = []
+    for field in describe.get('fields', []):
+        item = {key: field.get(key) for key in FIELD_KEYS}
+        if field.get('picklistValues'):
+            item['picklistValues'] = [v.get('value') for v in field['picklistValues'] if v.get('active', True)]
+        fields.append(item)
+    compact['fields'] = fields
+    return compact
+
+
+class DescribeCache:
+    """
+    Shared describe cache for exporters, the sync tool and the validator
+
+    Entries younger than `ttl` are served without any API call. Older ones are
+    revalidated with If-Modified-Since: first once per org against the global
+    describe, then per object if the org's metadata has changed. Without an API
+    client (CLI-only orgs) stale entries are simply re-described.
+    """
+
+    def __init__(self, cache_dir: Path = DESCRIBE_CACHE_DIR, ttl: float = DESCRIBE_CACHE_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self._memory: Dict[Tuple[str, str, str], Dict] = {}
+        self._missing: Dict[Tuple[str, str, str], float] = {}
+        self._org_keys: Dict[str, Tuple[str, str]] = {}
+        self._global_checks: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._lock = threading.RLock()
+
+    def _org_key(self, org: str) -> Tuple[str, str]:
+        """(org id, API version) for a CLI alias"""
+        with self._lock:
+            if org in self._org_keys:
+                return self._org_keys[org]
+
+        client = get_client(org)
+        if client:
+            key = (client.org_info.get('org_id') or org, client.api_version)
+        else:
+            # Imported here to avoid a circular import
+            from app.services.connection_manager import connection_manager
+            org_info = connection_manager._get_org_info(org) or {}
+            key = (org_info.get('org_id') or org, str(org_info.get('api_version') or SALESFORCE_API_VERSION))
+
+        with self._lock:
+            self._org_keys[org] = key
+        return key
+
+    def _path(self, key: Tuple[str, str, str]) -> Path:
+        org_id, sobject, api_version = key
+        return self.cache_dir / org_id / f"v{api_version}" / f"{sobject}.json.gz"
+
+    def _load(self, key: Tuple[str, str, str]) -> Optional[Dict]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading describe cache {path}: {e}")
+            return None
+
+    def _store(self, key: Tuple[str, str, str], describe: Dict) -> Dict:
+        now = time.time()
+        entry = {'describe': compact_describe(describe), 'fetched_at': now, 'checked_at': now}
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix('.tmp')
+            with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Error writing describe cache {path}: {e}")
+        with self._lock:
+            self._memory[key] = entry
+            self._missing.pop(key, None)
+        return entry
+
+    def _org_unchanged_since(self, client, org_key: Tuple[str, str], since: float) -> bool:
+        """Whether no sObject metadata in the org changed after `since` (one global describe per TTL)"""
+        with self._lock:
+            check = self._global_checks.get(org_key)
+        if check and time.time() - check[0] < self.ttl and check[1] <= since:
+            return True
+        result = client.describe_global(headers={'If-Modified-Since': formatdate(since, usegmt=True)})
+        if result is None:
+            with self._lock:
+                self._global_checks[org_key] = (time.time(), since)
+            return True
+        return False
+
+    def _describe_cli(self, org: str, sobject: str) -> Tuple[Optional[Dict], bool]:
+        """Describe via the sf CLI; returns (describe, not_found)"""
+        try:
+            result = subprocess.run(
+                [CLI_COMMAND, 'sobject', 'describe', '--sobject', sobject, '--target-org', org, '--json'],
+                capture_output=True, text=True, timeout=120
+            )
+            data = json.loads(result.stdout) if result.stdout else {}
+        except Exception:
+            return None, False
+        if result.returncode == 0 and data.get('status') == 0 and 'fields' in data.get('result', {}):
+            return data['result'], False
+        message = f"{data.get('name', '')} {data.get('message', '')} {result.stderr}"
+        return None, any(marker in message for marker in NOT_FOUND_MARKERS)
+
+    def describe(self, org: str, sobject: str) -> Optional[Dict]:
+        """Get a (compact) describe for an sObject, or None if it doesn't exist or can't be described"""
+        org_id, api_version = self._org_key(org)
+        key = (org_id, sobject, api_version)
+        now = time.time()
+
+        with self._lock:
+            if now - self._missing.get(key, 0) < self.ttl:
+                return None
+            entry = self._memory.get(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry:
+                with self._lock:
+                    self._memory[key] = entry
+
+        if entry and now - entry['checked_at'] < self.ttl:
+            return entry['describe']
+
+        client = get_client(org)
+        if client:
+            try:
+                if entry:
+                    # Revalidate: cheap org-wide check first, then this object only
+                    if self._org_unchanged_since(client, (org_id, api_version), entry['fetched_at']):
+                        entry['checked_at'] = now
+                        return entry['describe']
+                    headers = {'If-Modified-Since': formatdate(entry['fetched_at'], usegmt=True)}
+                    describe = client.describe(sobject, headers=headers)
+                    if describe is None:
+                        entry['checked_at'] = now
+                        return entry['describe']
+                else:
+                    describe = client.describe(sobject)
+                return self._store(key, describe)['describe']
+            except SalesforceApiError as e:
+                if e.status_code == 404 or any(marker in str(e) for marker in NOT_FOUND_MARKERS):
+                    with self._lock:
+                        self._missing[key] = now
+                    return None
+                print(f"  ⚠️  Describe failed for {sobject} ({str(e)}), retrying with sf CLI")
+
+        describe, not_found = self._describe_cli(org, sobject)
+        if describe:
+            return self._store(key, describe)['describe']
+        if not_found:
+            with self._lock:
+                self._missing[key] = now
+            return None
+        # Transient failure: a stale describe beats none
+        return entry['describe'] if entry else None
+
+    def fields(self, org: str, sobject: str) -> Dict[str, Dict]:
+        """Field describes by API name ({} if the object can't be described)"""
+        describe = self.describe(org, sobject)
+        return {f['name']: f for f in describe['fields']} if describe else {}
+
+    def field_names(self, org: str, sobject: str) -> List[str]:
+        """Field API names in describe order ([] if the object can't be described)"""
+        describe = self.describe(org, sobject)
+        return [f['name'] for f in describe['fields'] if f.get('name')] if describe else []
+
+    def invalidate(self, org: Optional[str] = None, sobject: Optional[str] = None) -> None:
+        """Drop cached describes (all, one org, or one object) from memory and disk"""
+        org_id = self._org_key(org)[0] if org else None
+        with self._lock:
+            for cache in (self._memory, self._missing):
+                for key in [k for k in cache
+                            if (org_id is None or k[0] == org_id) and (sobject is None or k[1] == sobject)]:
+                    del cache[key]
+            self._global_checks.clear()
+
+        if org_id is None:
+            target = self.cache_dir
+        elif sobject is None:
+            target = self.cache_dir / org_id
+        else:
+            for path in (self.cache_dir / org_id).glob(f"v*/{sobject}.json.gz"):
+                path.unlink(missing_ok=True)
+            return
+        if target.exists():
+            shutil.rmtree(target)
+
+
+# Singleton instance
+describe_cache = DescribeCache()
@@ -0,0 +1,273 @@
+"""
+Diff Engine
+Row-level comparison of a workbook sheet with an org snapshot (a dry run of an upsert):
+rows that would be inserted, rows that would update fields, unchanged rows and org
+records no row covers
+"""
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import pandas as pd
+
+from config.settings.app_config import DIFF_RESULT_LIMIT, ORG_RECORD_SNAPSHOT_TTL
+from app.services.describe_cache import describe_cache
+from app.services.integrity_index import EXTERNAL_ID_FIELDS, WORKBOOK_OBJECT_SHEETS, id_key, query_records
+from app.services.upload_pipeline import format_value, map_fields
+from app.services.workbook_cache import workbook_cache
+from app.services.workbook_reader import SheetTable
+
+NUMBER_TYPES = ('double', 'currency', 'percent', 'int', 'long')
+
+
+def _text(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else format_value(value)
+
+
+def _boolean(value: Any) -> str:
+    text = _text(value).lower()
+    if text == '':
+        return ''
+    return 'true' if text in ('true', 'yes', '1') else 'false'
+
+
+def _number(value: Any) -> str:
+    text = _text(value)
+    try:
+        return str(Decimal(text).normalize()) if text else ''
+    except InvalidOperation:
+        return text
+
+
+def _reference(value: Any) -> str:
+    text = _text(value)
+    return id_key(text) or text
+
+
+def _date(value: Any) -> str:
+    return format_value(value, 'date')[:10]
+
+
+def _datetime(value: Any) -> str:
+    # Seconds precision; sheet values are UTC like the org's
+    return format_value(value, 'datetime')[:19]
+
+
+def comparator(field_type: Optional[str]) -> Callable[[Any], str]:
+    """Function giving comparable text for a field type's sheet and org values ('' when empty)"""
+    if field_type == 'boolean':
+        return _boolean
+    if field_type in NUMBER_TYPES:
+        return _number
+    if field_type in ('reference', 'id'):
+        return _reference
+    if field_type == 'date':
+        return _date
+    if field_type == 'datetime':
+        return _datetime
+    return _text
+
+
+class SheetDiff:
+    """
+    Outcome of diffing one sheet against the org
+
+    inserts: rows matching no org record; updates: rows whose non-empty cells differ
+    from the matched record ({field: {'old', 'new'}}); unchanged: count of rows
+    with nothing to change; orphaned: org records no row matched; duplicates: rows
+    matching a record an earlier row already matched.
+    """
+
+    def __init__(self, object_name: str, key_field: Optional[str], fields: List[str]):
+        self.object_name = object_name
+        self.key_field = key_field
+        self.fields = fields
+        self.inserts: List[Dict[str, Any]] = []
+        self.updates: List[Dict[str, Any]] = []
+        self.unchanged = 0
+        self.orphaned: List[Dict[str, Any]] = []
+        self.duplicates: List[Dict[str, Any]] = []
+
+    @property
+    def delta_rows(self) -> Set[int]:
+        """Row numbers an upsert needs to send"""
+        return {row['row'] for row in self.inserts} | {row['row'] for row in self.updates}
+
+    def counts(self) -> Dict[str, int]:
+        return {'insert': len(self.inserts), 'update': len(self.updates), 'unchanged': self.unchanged,
+                'orphaned': len(self.orphaned), 'duplicate': len(self.duplicates)}
+
+    def to_dict(self, limit: Optional[int] = DIFF_RESULT_LIMIT) -> Dict[str, Any]:
+        return {
+            'object': self.object_name,
+            'key_field': self.key_field,
+            'fields': self.fields,
+            'counts': self.counts(),
+            'inserts': self.inserts[:limit],
+            'updates': self.updates[:limit],
+            'orphaned': self.orphaned[:limit],
+            'duplicates': self.duplicates[:limit]
+        }
+
+
+def default_key_field(table: SheetTable, field_describes: Dict[str, Dict]) -> Optional[str]:
+    """The sheet's first external-id column that exists on the object"""
+    for field in EXTERNAL_ID_FIELDS:
+        if field in table and field in field_describes:
+            return field
+    for header in table.clean_headers:
+        if field_describes.get(header, {}).get('externalId'):
+            return header
+    return None
+
+
+def diff_table(object_name: str, table: SheetTable, records: Sequence[Dict[str, Any]],
+               field_describes: Dict[str, Dict], key_field: Optional[str] = None) -> SheetDiff:
+    """
+    Hash-join a sheet with org records and classify every row
+
+    Rows match a record on Id when they have one, else on key_field (an external id;
+    by default the first one in the sheet). Only writable fields present in the sheet
+    are compared, and empty cells never count as changes, the same as an upsert
+    leaves those fields alone.
+    """
+    key_field = key_field or default_key_field(table, field_describes)
+    mapping = map_fields(table, field_describes, 'upsert')
+    fields = [(position, field, comparator(field_type)) for position, field, field_type in mapping.columns
+              if field != 'Id']
+    result = SheetDiff(object_name, key_field, [field for _, field, _ in fields])
+
+    key_compare = comparator((field_describes.get(key_field) or {}).get('type')) if key_field else None
+    by_id: Dict[str, int] = {}
+    by_key: Dict[str, int] = {}
+    for index, record in enumerate(records):
+        record_id = id_key(record.get('Id'))
+        if record_id:
+            by_id[record_id] = index
+        if key_field and record.get(key_field) not in (None, ''):
+            by_key.setdefault(key_compare(record[key_field]), index)
+
+    ids = table.get('Id') or [None] * len(table)
+    keys = table.get(key_field) if key_field else None
+    row_numbers = table.row_numbers or list(range(2, len(table) + 2))
+    matched: Dict[int, int] = {}
+
+    for row in range(len(table)):
+        row_id = id_key(ids[row])
+        row_key = key_compare(keys[row]) if keys is not None and keys[row] is not None else ''
+        index = by_id.get(row_id) if row_id else None
+        if index is None and row_key:
+            index = by_key.get(row_key)
+        entry = {'row': row_numbers[row], 'key': row_key or None}
+        if index is None:
+            if row_id:
+                entry['id'] = row_id
+            result.inserts.append(entry)
+            continue
+        record = records[index]
+        entry['id'] = record.get('Id')
+        if index in matched:
+            entry['first_row'] = matched[index]
+            result.duplicates.append(entry)
+            continue
+        matched[index] = row_numbers[row]
+
+        changes = {}
+        for position, field, compare in fields:
+            value = table.columns[position][row]
+            if value is None:
+                continue
+            old = record.get(field)
+            if value == old:
+                continue
+            new_text = compare(value)
+            if new_text != '' and new_text != compare(old):
+                changes[field] = {'old': old, 'new': format_value(value)}
+        if changes:
+            entry['changes'] = changes
+            result.updates.append(entry)
+        else:
+            result.unchanged += 1
+
+    for index, record in enumerate(records):
+        if index not in matched:
+            result.orphaned.append({'id': record.get('Id'),
+                                    'key': record.get(key_field) if key_field else None})
+    return result
+
+
+def table_from_frame(name: str, df: pd.DataFrame) -> SheetTable:
+    """A SheetTable from a (cached) sheet frame, NaN as None"""
+    values = df.astype(object).where(df.notna(), None)
+    return SheetTable(name, [str(c) for c in df.columns], [values[c].tolist() for c in df.columns])
+
+
+class OrgRecordSnapshots:
+    """Per-org, per-object record snapshots for diffs, re-queried after `ttl` seconds or for new fields"""
+
+    def __init__(self, ttl: float = ORG_RECORD_SNAPSHOT_TTL):
+        self.ttl = ttl
+        self._snapshots: Dict[Tuple[str, str], Tuple[float, Set[str], List[Dict]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, org: str, object_name: str, fields: Sequence[str],
+            refresh: bool = False) -> Optional[List[Dict]]:
+        """Records with Id and the given fields, or None if the org can't be queried"""
+        fields = list(dict.fromkeys(['Id', *fields]))
+        with self._lock:
+            cached = self._snapshots.get((org, object_name))
+        if cached and not refresh and time.time() - cached[0] < self.ttl and set(fields) <= cached[1]:
+            return cached[2]
+
+        records = query_records(org, f"SELECT {', '.join(fields)} FROM {object_name}")
+        if records is None:
+            return None
+        for record in records:
+            record.pop('attributes', None)
+        with self._lock:
+            self._snapshots[(org, object_name)] = (time.time(), set(fields), records)
+        return records
+
+    def invalidate(self, org: Optional[str] = None, object_name: Optional[str] = None) -> None:
+        with self._lock:
+            for key in [k for k in self._snapshots
+                        if (org is None or k[0] == org) and (object_name is None or k[1] == object_name)]:
+                del self._snapshots[key]
+
+
+# Singleton instance
+org_record_snapshots = OrgRecordSnapshots()
+
+
+def diff_object(org: str, object_name: str, table: SheetTable, key_field: Optional[str] = None,
+                refresh: bool = False) -> Dict[str, Any]:
+    """Diff a sheet table against the org's (cached) records of the object"""
+    field_describes = describe_cache.fields(org, object_name)
+    if not field_describes:
+        return {'success': False, 'error': f"Object {object_name} could not be described in org {org}"}
+    key_field = key_field or default_key_field(table, field_describes)
+    if key_field and key_field not in field_describes:
+        return {'success': False, 'error': f"Key field {key_field} is not a field of {object_name}"}
+    fields = [f for f in map_fields(table, field_describes, 'upsert').fields if f != 'Id']
+    records = org_record_snapshots.get(org, object_name, fields + ([key_field] if key_field else []), refresh)
+    if records is None:
+        return {'success': False, 'error': f"Could not query {object_name} in org {org}"}
+    return {'success': True, 'diff': diff_table(object_name, table, records, field_describes, key_field)}
+
+
+def diff_workbook_sheet(org: str, object_name: str, workbook_path: Union[str, Path],
+                        sheet_name: Optional[str] = None, key_field: Optional[str] = None,
+                        refresh: bool = False, limit: Optional[int] = DIFF_RESULT_LIMIT) -> Dict[str, Any]:
+    """Diff an object's workbook sheet (via the workbook cache) against the org"""
+    sheet_name = sheet_name or WORKBOOK_OBJECT_SHEETS.get(object_name, object_name)
+    frames = workbook_cache.get_sheets(str(workbook_path), [sheet_name])
+    if sheet_name not in frames:
+        return {'success': False, 'error': f"Sheet {sheet_name} not found in workbook"}
+    started = time.monotonic()
+    result = diff_object(org, object_name, table_from_frame(sheet_name, frames[sheet_name]), key_field, refresh)
+    if not result['success']:
+        return result
+    return {'success': True, 'org': org, 'sheet': sheet_name, **result['diff'].to_dict(limit),
+            'seconds': round(time.monotonic() - started, 3)}
@@ -5,6 +5,7 @@ Handles file uploads for Revenue Cloud data
 import os
 import json
 import csv
+import hashlib
 import tempfile
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
@@ -12,6 +13,44 @@ import pandas as pd
 from datetime import datetime
 
 from config.settings.app_config import UPLOADS_DIR, MAX_UPLOAD_SIZE_MB, ALLOWED_EXTENSIONS
+from app.services.workbook_cache import workbook_cache
+from app.services.workbook_reader import WorkbookReader
+
+PREVIEW_ROWS = 5
+
+
+class UploadWriter:
+    """Streams one uploaded file to a temporary file, hashing and size-checking as it goes"""
+    
+    def __init__(self, directory: Path, filename: str, max_size: int):
+        self.filename = filename
+        self.max_size = max_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+        fd, path = tempfile.mkstemp(dir=directory, suffix='.part')
+        self.path = Path(path)
+        self._file = os.fdopen(fd, 'wb')
+    
+    def write(self, data: bytes) -> None:
+        """Append a chunk of the file"""
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise ValueError(f"File too large. Maximum size: {MAX_UPLOAD_SIZE_MB}MB")
+        self._hash.update(data)
+        self._file.write(data)
+    
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+    
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+    
+    def discard(self) -> None:
+        """Close and delete the partial file"""
+        self.close()
+        self.path.unlink(missing_ok=True)
 
 
 class FileUploadService:
@@ -35,13 +74,23 @@ class FileUploadService:
         
         return True, None
     
-    def save_upload(self, file_data: bytes, filename: str, object_name: str, 
-                    session_id: str) -> Tuple[bool, Dict]:
-        """Save uploaded file and return metadata"""
+    def open_upload(self, filename: str, session_id: str) -> UploadWriter:
+        """Start streaming an upload to disk; raises ValueError for a disallowed file type"""
+        valid, error = self.validate_file(filename, 0)
+        if not valid:
+            raise ValueError(error)
+        
+        # Create session upload directory
+        session_dir = self.uploads_dir / session_id
+        session_dir.mkdir(exist_ok=True)
+        return UploadWriter(session_dir, filename, self.max_size)
+    
+    def finish_upload(self, writer: UploadWriter, object_name: str,
+                      session_id: str) -> Tuple[bool, Dict]:
+        """Move a fully streamed upload into place and return metadata"""
         try:
-            # Create session upload directory
-            session_dir = self.uploads_dir / session_id
-            session_dir.mkdir(exist_ok=True)
+            writer.close()
+            filename = writer.filename
             
             # Generate unique filename
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -50,15 +99,12 @@ class FileUploadService:
             saved_filename = f"{object_name}_{safe_name}_{timestamp}{file_ext}"
             
             # Save file
-            file_path = session_dir / saved_filename
-            with open(file_path, 'wb') as f:
-                f.write(file_data)
+            file_path = writer.path.parent / saved_filename
+            os.replace(writer.path, file_path)
+            workbook_cache.invalidate(str(file_path))
             
-            # Process file based on type
-            if file_ext.lower() in ['.xlsx', '.xls']:
-                data, headers = self.process_excel(file_path)
-            else:
-                data, headers = self.process_csv(file_path)
+            # Preview and count without loading the whole file
+            preview, record_count, headers = self.scan_file(file_path)
             
             # Create metadata
             metadata = {
@@ -66,8 +112,9 @@ class FileUploadService:
                 'saved_as': str(file_path),
                 'object': object_name,
                 'uploaded_at': datetime.now().isoformat(),
-                'size': len(file_data),
-                'record_count': len(data),
+                'size': writer.size,
+                'sha256': writer.sha256,
+                'record_count': record_count,
                 'headers': headers,
                 'session_id': session_id
             }
@@ -80,11 +127,76 @@ class FileUploadService:
             return True, {
                 'file_path': str(file_path),
                 'metadata': metadata,
-                'preview': data[:5] if data else []  # First 5 records
+                'preview': preview
             }
             
         except Exception as e:
+            writer.discard()
+            return False, {'error': str(e)}
+    
+    def save_upload(self, file_data: bytes, filename: str, object_name: str, 
+                    session_id: str) -> Tuple[bool, Dict]:
+        """Save uploaded file and return metadata"""
+        try:
+            writer = self.open_upload(filename, session_id)
+        except Exception as e:
+            return False, {'error': str(e)}
+        
+        try:
+            writer.write(file_data)
+        except Exception as e:
+            writer.discard()
             return False, {'error': str(e)}
+        
+        return self.finish_upload(writer, object_name, session_id)
+    
+    def scan_file(self, file_path: Path, preview_rows: int = PREVIEW_ROWS) -> Tuple[List[Dict], int, List[str]]:
+        """Return (preview records, record count, headers) from a streaming read"""
+        suffix = Path(file_path).suffix.lower()
+        if suffix == '.xlsx':
+            return self.scan_excel(file_path, preview_rows)
+        if suffix == '.xls':
+            # Legacy format has no streaming reader
+            data, headers = self.process_excel(file_path)
+            return data[:preview_rows], len(data), headers
+        return self.scan_csv(file_path, preview_rows)
+    
+    def scan_excel(self, file_path: Path, preview_rows: int = PREVIEW_ROWS) -> Tuple[List[Dict], int, List[str]]:
+        """Stream the first sheet of an .xlsx file"""
+        try:
+            with WorkbookReader(file_path) as reader:
+                sheet_name = reader.sheet_names[0]
+                headers = reader.read_sheet(sheet_name, max_rows=0).headers
+                
+                preview, count = [], 0
+                for row in reader.iter_rows(sheet_name):
+                    count += 1
+                    if len(preview) < preview_rows:
+                        preview.append(dict(zip(headers, row)))
+                return preview, count, headers
+            
+        except Exception as e:
+            print(f"Error processing Excel file: {e}")
+            return [], 0, []
+    
+    def scan_csv(self, file_path: Path, preview_rows: int = PREVIEW_ROWS) -> Tuple[List[Dict], int, List[str]]:
+        """Stream a CSV file"""
+        try:
+            with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+                reader = csv.DictReader(f)
+                headers = reader.fieldnames or []
+                
+                preview, count = [], 0
+                for row in reader:
+                    count += 1
+                    if len(preview) < preview_rows:
+                        # Convert empty strings to None
+                        preview.append({k: v if v else None for k, v in row.items()})
+                return preview, count, headers
+            
+        except Exception as e:
+            print(f"Error processing CSV file: {e}")
+            return [], 0, []
     
     def process_excel(self, file_path: Path) -> Tuple[List[Dict], List[str]]:
         """Process Excel file and return data"""
@@ -154,6 +266,25 @@ class FileUploadService:
         except Exception as e:
             return False, {'error': str(e)}
     
+    def saved_upload_path(self, file_path: Optional[str]) -> Optional[Path]:
+        """
+        The resolved path of a file saved by finish_upload, or None
+
+        Anything outside the uploads directory, or without the metadata written when
+        the upload was saved, is refused.
+        """
+        if not file_path:
+            return None
+        try:
+            path = Path(file_path).resolve()
+            path.relative_to(self.uploads_dir.resolve())
+        except (OSError, ValueError):
+            return None
+        if (path.suffix.lower() not in ALLOWED_EXTENSIONS or not path.is_file()
+                or not path.with_suffix('.meta.json').is_file()):
+            return None
+        return path
+
     def get_upload_history(self, session_id: str) -> List[Dict]:
         """Get upload history for a session"""
         history = []
@@ -0,0 +1,197 @@
+"""
+Id Crosswalk
+Persistent external id -> Salesforce Id mapping per org and object, filled from Bulk
+load results, tree import results and sync queries
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from config.settings.app_config import ID_CROSSWALK_DB
+from app.services.integrity_index import EXTERNAL_ID_FIELDS
+
+# Values per IN (...) lookup, below SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+
+
+class IdCrosswalk:
+    """
+    SQLite table of (org, sObject, key field, external id) -> Salesforce Id
+
+    The key is the table's primary key, so single lookups are index seeks and
+    resolve()/mapping() return plain dicts for O(1) lookups while generating files.
+    Values of different key fields (ProductCode, External_ID__c, ...) are kept apart;
+    lookups take the field, or match any field when it is left out. The database is
+    created on first use.
+    """
+
+    def __init__(self, db_path: Path = ID_CROSSWALK_DB):
+        self.db_path = str(db_path)
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.db_path, timeout=30)
+                if not self._schema_ready:
+                    with conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        self._create_table(conn)
+                        conn.execute("CREATE INDEX IF NOT EXISTS idx_crosswalk_id ON crosswalk (org, sf_id)")
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _create_table(conn: sqlite3.Connection) -> None:
+        """Create the table, moving entries over from the earlier layout keyed without the field"""
+        columns = {row[1]: row[5] for row in conn.execute("PRAGMA table_info(crosswalk)")}
+        if columns and not columns.get('field'):
+            conn.execute("ALTER TABLE crosswalk RENAME TO crosswalk_old")
+            conn.execute("DROP INDEX IF EXISTS idx_crosswalk_id")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS crosswalk ("
+            "org TEXT NOT NULL, sobject TEXT NOT NULL, field TEXT NOT NULL, external_id TEXT NOT NULL, "
+            "sf_id TEXT NOT NULL, source TEXT, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (org, sobject, field, external_id)) WITHOUT ROWID"
+        )
+        if columns and not columns.get('field'):
+            conn.execute(
+                "INSERT OR REPLACE INTO crosswalk SELECT org, sobject, COALESCE(field, ''), external_id, "
+                "sf_id, source, updated_at FROM crosswalk_old"
+            )
+            conn.execute("DROP TABLE crosswalk_old")
+
+    def record(self, org: str, sobject: str, pairs: Iterable[Tuple[str, str, Optional[str]]],
+               source: Optional[str] = None) -> int:
+        """Store (external id, Salesforce Id, field) entries, replacing earlier Ids; returns the count"""
+        now = time.time()
+        rows = [(org, sobject, field or '', str(external_id).strip(), sf_id, source, now)
+                for external_id, sf_id, field in pairs
+                if sf_id and external_id is not None and str(external_id).strip()]
+        if rows:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO crosswalk VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (org, sobject, field, external_id) DO UPDATE SET "
+                    "sf_id = excluded.sf_id, source = excluded.source, "
+                    "updated_at = excluded.updated_at",
+                    rows
+                )
+        return len(rows)
+
+    def record_records(self, org: str, sobject: str, records: Iterable[Dict[str, Any]],
+                       key_fields: Optional[Sequence[str]] = None, source: Optional[str] = None) -> int:
+        """Store the external-id values of records carrying an 'Id' (key fields default to EXTERNAL_ID_FIELDS)"""
+        key_fields = [f for f in (key_fields or EXTERNAL_ID_FIELDS) if f != 'Id']
+        return self.record(org, sobject, (
+            (record.get(field), record.get('Id'), field)
+            for record in records for field in key_fields if record.get(field) not in (None, '')
+        ), source)
+
+    def record_tree_import(self, org: str, results: Iterable[Dict[str, Any]],
+                           tree_records: Iterable[Dict[str, Any]], source: str = 'tree import') -> int:
+        """
+        Store Ids from `sf data import tree --json` results ({'refId', 'type', 'id'} entries)
+
+        tree_records are the imported JSON tree records; their external-id fields are
+        matched to the results by referenceId.
+        """
+        by_reference = {r.get('attributes', {}).get('referenceId'): r for r in tree_records}
+        by_object: Dict[str, List[Dict[str, Any]]] = {}
+        for result in results:
+            record = by_reference.get(result.get('refId'))
+            if record is not None and result.get('id'):
+                sobject = result.get('type') or record['attributes'].get('type')
+                by_object.setdefault(sobject, []).append(dict(record, Id=result['id']))
+        return sum(self.record_records(org, sobject, records, source=source)
+                   for sobject, records in by_object.items())
+
+    def record_tree_import_files(self, org: str, result_path: Union[str, Path], plan_path: Union[str, Path]) -> int:
+        """record_tree_import() from a saved `--json` result and the import plan that produced it"""
+        with open(result_path, 'r', encoding='utf-8') as f:
+            output = json.load(f)
+        results = output.get('result', output) if isinstance(output, dict) else output
+        if isinstance(results, dict):
+            results = results.get('records', [])
+
+        plan_path = Path(plan_path)
+        with open(plan_path, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+        tree_records = []
+        for entry in plan:
+            for file_name in entry.get('files', []):
+                # Plan file paths are relative to the plan, or to the directory it was run from
+                path = plan_path.parent / file_name
+                if not path.exists():
+                    path = Path(file_name)
+                with open(path, 'r', encoding='utf-8') as f:
+                    tree_records.extend(json.load(f).get('records', []))
+        return self.record_tree_import(org, results, tree_records)
+
+    @staticmethod
+    def _field_filter(field: Optional[str]) -> Tuple[str, List[str]]:
+        return (" AND field = ?", [field]) if field else ("", [])
+
+    def lookup(self, org: str, sobject: str, external_id: str, field: Optional[str] = None) -> Optional[str]:
+        """The Id for an external id of a key field (any field if not given)"""
+        clause, params = self._field_filter(field)
+        row = self._connect().execute(
+            f"SELECT sf_id FROM crosswalk WHERE org = ? AND sobject = ? AND external_id = ?{clause} "
+            f"ORDER BY updated_at DESC",
+            (org, sobject, str(external_id).strip(), *params)
+        ).fetchone()
+        return row[0] if row else None
+
+    def resolve(self, org: str, sobject: str, external_ids: Iterable[str],
+                field: Optional[str] = None) -> Dict[str, str]:
+        """Ids for the given external ids of a key field (any field if not given); missing ones are left out"""
+        keys = list(dict.fromkeys(str(v).strip() for v in external_ids if v is not None))
+        clause, params = self._field_filter(field)
+        conn = self._connect()
+        resolved = {}
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            resolved.update(conn.execute(
+                f"SELECT external_id, sf_id FROM crosswalk WHERE org = ? AND sobject = ? "
+                f"AND external_id IN ({', '.join('?' * len(batch))}){clause} ORDER BY updated_at",
+                [org, sobject, *batch, *params]
+            ).fetchall())
+        return resolved
+
+    def mapping(self, org: str, sobject: str, field: Optional[str] = None) -> Dict[str, str]:
+        """Every external id -> Id entry for an object (of one key field if given)"""
+        clause, params = self._field_filter(field)
+        return dict(self._connect().execute(
+            f"SELECT external_id, sf_id FROM crosswalk WHERE org = ? AND sobject = ?{clause} ORDER BY updated_at",
+            (org, sobject, *params)
+        ).fetchall())
+
+    def external_ids(self, org: str, sf_id: str, field: Optional[str] = None) -> List[str]:
+        """External ids recorded for a Salesforce Id (15- or 18-character), of one key field if given"""
+        clause, params = self._field_filter(field)
+        # Range on the 15-character prefix so the (org, sf_id) index is used
+        rows = self._connect().execute(
+            f"SELECT external_id FROM crosswalk WHERE org = ? AND sf_id >= ? AND sf_id < ?{clause}",
+            (org, sf_id[:15], sf_id[:15] + '~', *params)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self, org: str) -> Dict[str, int]:
+        """Entries per object for an org"""
+        return dict(self._connect().execute(
+            "SELECT sobject, COUNT(*) FROM crosswalk WHERE org = ? GROUP BY sobject", (org,)
+        ).fetchall())
+
+
+# Singleton instance
+id_crosswalk = IdCrosswalk()
@@ -0,0 +1,218 @@
+"""
+Integrity Index
+Id and external-id key sets per object, from workbook sheets and (optionally) org snapshots,
+for finding references to records that don't exist
+"""
+import json
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from config.settings.app_config import CLI_COMMAND, ORG_ID_SNAPSHOT_TTL
+from app.services.salesforce_client import get_client, SalesforceApiError
+from app.services.workbook_reader import SheetTable, WorkbookReader, clean_header
+
+# Workbook sheet holding each object's records
+WORKBOOK_OBJECT_SHEETS = {
+    'CostBook': '01_CostBook',
+    'LegalEntity': '02_LegalEntity',
+    'TaxEngine': '03_TaxEngine',
+    'TaxPolicy': '04_TaxPolicy',
+    'TaxTreatment': '05_TaxTreatment',
+    'BillingPolicy': '06_BillingPolicy',
+    'BillingTreatment': '07_BillingTreatment',
+    'ProductClassification': '08_ProductClassification',
+    'AttributeDefinition': '09_AttributeDefinition',
+    'AttributeCategory': '10_AttributeCategory',
+    'ProductCatalog': '11_ProductCatalog',
+    'ProductCategory': '12_ProductCategory',
+    'Product2': '13_Product2',
+    'AttributePicklist': '14_AttributePicklist',
+    'ProductComponentGroup': '14_ProductComponentGroup',
+    'ProductSellingModel': '15_ProductSellingModel',
+    'CostBookEntry': '15_CostBookEntry',
+    'ProductAttributeDefinition': '17_ProductAttributeDef',
+    'AttributePicklistValue': '18_AttributePicklistValue',
+    'Pricebook2': '19_Pricebook2',
+    'PricebookEntry': '20_PricebookEntry',
+    'PriceAdjustmentSchedule': '21_PriceAdjustmentSchedule',
+    'PriceAdjustmentTier': '22_PriceAdjustmentTier',
+    'AttributeBasedAdjRule': '23_AttributeBasedAdjRule',
+    'AttributeBasedAdjustment': '24_AttributeBasedAdj',
+    'ProductRelatedComponent': '25_ProductRelatedComponent',
+    'ProductCategoryProduct': '26_ProductCategoryProduct'
+}
+
+# Columns whose values can stand in for a record Id in references (upsert keys)
+EXTERNAL_ID_FIELDS = ('External_ID__c', 'ExternalId__c', 'ProductCode', 'Code', 'CatalogCode__c',
+                      'CategoryCode__c', 'ModelCode__c')
+
+SALESFORCE_ID_PATTERN = re.compile(r'^[a-zA-Z0-9]{15}(?:[a-zA-Z0-9]{3})?$')
+
+
+def id_key(value) -> Optional[str]:
+    """The 15-character form of a Salesforce Id (18-character Ids only add a checksum), or None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value[:15] if SALESFORCE_ID_PATTERN.match(value) else None
+
+
+class ObjectKeys:
+    """The Ids (15-character form) and external-id values known for one object"""
+
+    def __init__(self):
+        self.ids: Set[str] = set()
+        self.external_ids: Set[str] = set()
+        self.sources: List[str] = []
+
+    def add(self, ids: Iterable = (), external_ids: Iterable = (), source: Optional[str] = None) -> None:
+        self.ids.update(k for k in map(id_key, ids) if k)
+        self.external_ids.update(str(v).strip() for v in external_ids if v is not None and str(v).strip())
+        if source and source not in self.sources:
+            self.sources.append(source)
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.external_ids)
+
+
+class IntegrityIndex:
+    """
+    Key sets per object, filled from workbook sheets and org snapshots
+
+    missing() checks a whole column of references against an object's keys with
+    set-based anti-joins, so each relationship costs one pass over its column.
+    """
+
+    def __init__(self, external_id_fields: Sequence[str] = EXTERNAL_ID_FIELDS):
+        self.external_id_fields = tuple(external_id_fields)
+        self.objects: Dict[str, ObjectKeys] = {}
+
+    def __contains__(self, object_name: str) -> bool:
+        return object_name in self.objects
+
+    def keys(self, object_name: str) -> ObjectKeys:
+        return self.objects.setdefault(object_name, ObjectKeys())
+
+    def key_columns(self, headers: Iterable[str]) -> List[str]:
+        """Headers (as given) holding Ids or external ids"""
+        return [h for h in headers if clean_header(h) == 'Id' or clean_header(h) in self.external_id_fields]
+
+    def add_table(self, object_name: str, table: SheetTable, source: str = 'workbook') -> None:
+        """Index the key columns of a sheet (sheets without any are skipped)"""
+        columns = self.key_columns(table.headers)
+        if not columns:
+            return
+        keys = self.keys(object_name)
+        keys.add(source=source)
+        for header in columns:
+            if clean_header(header) == 'Id':
+                keys.add(ids=table.column(header))
+            else:
+                keys.add(external_ids=table.column(header))
+
+    def add_workbook(self, workbook_path: Union[str, Path], objects: Optional[Iterable[str]] = None,
+                     sheet_objects: Dict[str, str] = WORKBOOK_OBJECT_SHEETS) -> None:
+        """Index objects' sheets in a workbook, reading only their key columns"""
+        objects = list(sheet_objects) if objects is None else list(objects)
+        with WorkbookReader(workbook_path) as reader:
+            for object_name in objects:
+                self.add_sheet(reader, object_name, sheet_objects.get(object_name))
+
+    def add_sheet(self, reader: WorkbookReader, object_name: str, sheet_name: Optional[str]) -> None:
+        """Index one sheet of an open workbook, reading only its key columns"""
+        if sheet_name not in reader.sheet_names:
+            return
+        columns = self.key_columns(str(h) for h in reader.headers(sheet_name) if h is not None)
+        if columns:
+            self.add_table(object_name, reader.read_sheet(sheet_name, columns=columns))
+
+    def add_org(self, org: str, objects: Iterable[str]) -> None:
+        """Add the Ids and external ids of objects' records in an org (cached snapshots)"""
+        for object_name in objects:
+            snapshot = org_id_snapshots.get(org, object_name, self.external_id_fields)
+            if snapshot is not None:
+                ids, external_ids = snapshot
+                self.keys(object_name).add(ids, external_ids, source=f"org {org}")
+
+    def missing(self, object_name: str, values) -> np.ndarray:
+        """Boolean mask over values: set, but neither a known Id nor a known external id of object_name"""
+        values = pd.Series(values, dtype=object)
+        keys = self.objects.get(object_name) or ObjectKeys()
+        text = values.map(lambda v: str(v).strip() if v is not None and not pd.isna(v) else '')
+        present = (text != '').to_numpy()
+        by_id = text.map(lambda v: v[:15] if SALESFORCE_ID_PATTERN.match(v) else None).isin(keys.ids).to_numpy()
+        by_external_id = text.isin(keys.external_ids).to_numpy()
+        return present & ~by_id & ~by_external_id
+
+
+def query_records(org: str, soql: str) -> Optional[List[Dict]]:
+    """All records of a query, over the REST API or else the sf CLI; None if the org can't be queried"""
+    client = get_client(org)
+    if client:
+        try:
+            return client.query(soql)
+        except SalesforceApiError as e:
+            print(f"  ⚠️  Snapshot query failed ({str(e)}), retrying with sf CLI")
+    try:
+        result = subprocess.run(
+            [CLI_COMMAND, 'data', 'query', '--query', soql, '--target-org', org, '--json'],
+            capture_output=True, text=True, timeout=300
+        )
+        data = json.loads(result.stdout) if result.stdout else {}
+    except Exception as e:
+        print(f"  ⚠️  Snapshot query failed: {e}")
+        return None
+    if result.returncode != 0 or data.get('status') != 0:
+        print(f"  ⚠️  Snapshot query failed: {data.get('message', result.stderr[:200])}")
+        return None
+    return data.get('result', {}).get('records', [])
+
+
+class OrgIdSnapshots:
+    """Per-org, per-object snapshots of record Ids and external ids, re-queried after `ttl` seconds"""
+
+    def __init__(self, ttl: float = ORG_ID_SNAPSHOT_TTL):
+        self.ttl = ttl
+        self._snapshots: Dict[Tuple[str, str], Tuple[float, List[str], List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, org: str, object_name: str,
+            external_id_fields: Sequence[str] = EXTERNAL_ID_FIELDS) -> Optional[Tuple[List[str], List[str]]]:
+        """(ids, external ids) for an object's records, or None if the org can't be queried"""
+        with self._lock:
+            cached = self._snapshots.get((org, object_name))
+        if cached and time.time() - cached[0] < self.ttl:
+            return cached[1], cached[2]
+
+        # Imported here so workbook-only checks never touch the describe cache
+        from app.services.describe_cache import describe_cache
+        field_describes = describe_cache.fields(org, object_name)
+        if not field_describes:
+            return None
+        fields = [name for name, field in field_describes.items()
+                  if name in external_id_fields or field.get('externalId')]
+        records = query_records(org, f"SELECT {', '.join(['Id'] + fields)} FROM {object_name}")
+        if records is None:
+            return None
+
+        ids = [r.get('Id') for r in records]
+        external_ids = [r.get(f) for r in records for f in fields if r.get(f) is not None]
+        with self._lock:
+            self._snapshots[(org, object_name)] = (time.time(), ids, external_ids)
+        return ids, external_ids
+
+    def invalidate(self, org: Optional[str] = None) -> None:
+        with self._lock:
+            for key in [k for k in self._snapshots if org is None or k[0] == org]:
+                del self._snapshots[key]
+
+
+# Singleton instance
+org_id_snapshots = OrgIdSnapshots()
@@ -0,0 +1,247 @@
+"""
+Job Runner
+Runs long operations (sync, upload) on a bounded background pool with in-memory progress,
+cancellation, de-duplication of identical running jobs and retention of finished results
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from config.settings.app_config import JOB_MAX_EVENTS, JOB_MAX_RETAINED, JOB_MAX_WORKERS, JOB_RESULT_TTL
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+def progress_rate(done: float, total: Optional[float], elapsed: float) -> Tuple[float, Optional[float]]:
+    """(items per second so far, estimated seconds remaining or None)"""
+    rate = done / elapsed if elapsed > 0 else 0.0
+    if not total or not rate:
+        return round(rate, 1), None
+    return round(rate, 1), round(max(total - done, 0) / rate, 1)
+
+
+class Job:
+    """
+    One background job
+
+    The job function receives the Job and reports through add_event(); it should check
+    `cancelled` (or pass `cancel_event` on) between steps and return a result dict.
+    Progress events get records/sec and an ETA filled in (see add_event); stream()
+    follows the events as they arrive.
+    """
+
+    def __init__(self, kind: str, key: Optional[Hashable] = None, label: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.key = key
+        self.label = label or kind
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress: Optional[Dict[str, Any]] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+        self._events: List[Dict[str, Any]] = []
+        self._event_offset = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def add_event(self, event: Dict[str, Any]) -> None:
+        """
+        Record an event ({'type': ..., ...}); 'progress' events also become the current progress
+
+        Progress with processed/total records gets records_per_second and eta_seconds
+        from the record rate; progress with completed/total objects gets its ETA from
+        the average time per object.
+        """
+        if event.get('type') == 'progress' and self.started_at:
+            elapsed = time.time() - self.started_at
+            event = dict(event, elapsed=round(elapsed, 1))
+            if 'processed' in event:
+                rate, eta = progress_rate(event['processed'], event.get('total'), elapsed)
+                event.setdefault('records_per_second', rate)
+                event.setdefault('eta_seconds', eta)
+            elif 'completed' in event:
+                event.setdefault('records_per_second', progress_rate(event.get('records', 0), None, elapsed)[0])
+                event.setdefault('eta_seconds', progress_rate(event['completed'], event.get('total'), elapsed)[1])
+        with self._changed:
+            self._events.append(event)
+            if len(self._events) > JOB_MAX_EVENTS:
+                del self._events[0]
+                self._event_offset += 1
+            if event.get('type') == 'progress':
+                self.progress = event
+            self._changed.notify_all()
+
+    def stream(self, since: int = 0, keepalive: float = 15,
+               stop: Optional[threading.Event] = None) -> Iterator[Optional[Tuple[int, Dict[str, Any]]]]:
+        """
+        Yield (event number, event) from `since` on as they are added, until the job finishes
+
+        Yields None after `keepalive` seconds without events, so callers can check the
+        connection is still open. Also ends once `stop` is set (checked on every wake-up;
+        see wake()).
+        """
+        while True:
+            with self._changed:
+                if (self._event_offset + len(self._events) <= since and self.active
+                        and not (stop is not None and stop.is_set())):
+                    self._changed.wait(keepalive)
+                start = max(since, self._event_offset)
+                events = self._events[start - self._event_offset:]
+                finished = not self.active
+            stopped = stop is not None and stop.is_set()
+            if not events and not finished and not stopped:
+                yield None
+            for number, event in enumerate(events, start):
+                yield number, event
+            since = start + len(events)
+            if finished or stopped:
+                return
+
+    def wake(self) -> None:
+        """Wake streams waiting for events (so they re-check their stop event)"""
+        with self._changed:
+            self._changed.notify_all()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        """Set the final status and add the closing 'finished' event (together, for streams)"""
+        with self._changed:
+            self.error = self.error or error
+            self.finished_at = time.time()
+            self.status = status
+            self._events.append({'type': 'finished', 'status': status, 'time': self.finished_at})
+            self._changed.notify_all()
+
+    def snapshot(self, since: int = 0) -> Dict[str, Any]:
+        """Job state with the events numbered `since` and later (see 'next_event')"""
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'kind': self.kind,
+                'label': self.label,
+                'status': self.status,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'progress': self.progress,
+                'result': self.result,
+                'error': self.error,
+                'events': self._events[max(since - self._event_offset, 0):],
+                'next_event': self._event_offset + len(self._events)
+            }
+
+
+class JobRunner:
+    """
+    Bounded thread pool plus an in-memory job registry
+
+    Jobs beyond `max_workers` wait as 'queued'. Submitting a job whose key matches a
+    queued or running job returns that job instead of starting another. Finished jobs
+    are kept for `retention` seconds (at most `max_retained` of them).
+    """
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, retention: float = JOB_RESULT_TTL,
+                 max_retained: int = JOB_MAX_RETAINED):
+        self.retention = retention
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, target: Callable[[Job], Dict[str, Any]], key: Optional[Hashable] = None,
+               label: Optional[str] = None) -> Tuple[Job, bool]:
+        """Queue target(job); returns (job, created) - created is False for a de-duplicated job"""
+        with self._lock:
+            self._prune()
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and job.active:
+                        return job, False
+            job = Job(kind, key, label)
+            self._jobs[job.id] = job
+            job.future = self._executor.submit(self._run, job, target)
+        return job, True
+
+    def _run(self, job: Job, target: Callable[[Job], Dict[str, Any]]) -> None:
+        if job.cancelled:
+            job.finish('cancelled')
+            return
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            result = target(job)
+        except Exception as e:
+            job.error = str(e)
+            job.add_event({'type': 'error', 'message': str(e), 'time': time.time()})
+            job.finish('cancelled' if job.cancelled else 'failed')
+            return
+        job.result = result
+        if job.cancelled:
+            status = 'cancelled'
+        else:
+            status = 'completed' if result is None or result.get('success', True) else 'failed'
+        job.finish(status, (result or {}).get('error'))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str, since: int = 0) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        return job.snapshot(since) if job else None
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask a job to stop; queued jobs never start. Returns False for unknown or finished jobs"""
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.finish('cancelled')
+        return True
+
+    def shutdown(self) -> None:
+        """Cancel every queued or running job and wake their streams (on server shutdown)"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.active]
+        for job in jobs:
+            self.cancel(job.id)
+            job.wake()
+        self._executor.shutdown(wait=False)
+
+    def list_jobs(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Summaries of retained jobs, newest first"""
+        with self._lock:
+            self._prune()
+            jobs = [job for job in self._jobs.values() if kind is None or job.kind == kind]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return [{key: value for key, value in job.snapshot().items() if key not in ('events', 'result')}
+                for job in jobs]
+
+    def _prune(self) -> None:
+        """Drop finished jobs past retention (caller holds the lock)"""
+        cutoff = time.time() - self.retention
+        finished = sorted((job for job in self._jobs.values() if not job.active),
+                          key=lambda job: job.finished_at or 0)
+        excess = len(finished) - self.max_retained
+        for index, job in enumerate(finished):
+            if index < excess or (job.finished_at or 0) < cutoff:
+                del self._jobs[job.id]
+
+
+# Singleton instance
+job_runner = JobRunner()
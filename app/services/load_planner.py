@@ -0,0 +1,251 @@
+"""
+Load Planner
+Orders object loads into dependency waves derived from reference fields, and runs each wave concurrently
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from config.settings.app_config import LOAD_PLAN_WORKERS
+
+# Known lookups between Revenue Cloud objects: object -> {reference field: referenced object}
+OBJECT_REFERENCES: Dict[str, Dict[str, str]] = {
+    'TaxTreatment': {'TaxPolicyId': 'TaxPolicy', 'TaxEngineId': 'TaxEngine', 'LegalEntityId': 'LegalEntity'},
+    'TaxPolicy': {'DefaultTaxTreatmentId': 'TaxTreatment'},
+    'BillingTreatment': {'BillingPolicyId': 'BillingPolicy', 'LegalEntityId': 'LegalEntity'},
+    'BillingPolicy': {'DefaultBillingTreatmentId': 'BillingTreatment'},
+    'CostBookEntry': {'CostBookId': 'CostBook', 'ProductId': 'Product2'},
+    'ProductCategory': {'CatalogId': 'ProductCatalog', 'ParentCategoryId': 'ProductCategory'},
+    'AttributeDefinition': {'PicklistId': 'AttributePicklist'},
+    'AttributePicklistValue': {'PicklistId': 'AttributePicklist'},
+    'Product2': {'BasedOnId': 'ProductClassification'},
+    'ProductAttributeDefinition': {
+        'ProductId': 'Product2',
+        'ProductClassificationId': 'ProductClassification',
+        'AttributeDefinitionId': 'AttributeDefinition',
+        'AttributeCategoryId': 'AttributeCategory'
+    },
+    'ProductCategoryProduct': {'ProductCategoryId': 'ProductCategory', 'ProductId': 'Product2'},
+    'PricebookEntry': {
+        'Product2Id': 'Product2',
+        'Pricebook2Id': 'Pricebook2',
+        'ProductSellingModelId': 'ProductSellingModel'
+    },
+    'ProductComponentGroup': {'ParentProductId': 'Product2', 'ParentGroupId': 'ProductComponentGroup'},
+    'ProductRelatedComponent': {
+        'ParentProductId': 'Product2',
+        'ChildProductId': 'Product2',
+        'ProductComponentGroupId': 'ProductComponentGroup'
+    },
+    'PriceAdjustmentTier': {'PriceAdjustmentScheduleId': 'PriceAdjustmentSchedule', 'Product2Id': 'Product2'},
+    'AttributeBasedAdjRule': {'ProductId': 'Product2'},
+    'AttributeBasedAdjustment': {
+        'AttributeBasedAdjRuleId': 'AttributeBasedAdjRule',
+        'PriceAdjustmentScheduleId': 'PriceAdjustmentSchedule',
+        'ProductId': 'Product2'
+    }
+}
+
+
+def references_from_field_configs(field_mappings: Dict[str, Dict]) -> Dict[str, Dict[str, str]]:
+    """From JSON tree generator configs: 'reference_fields': {field: 'Object.ExternalIdField'}"""
+    return {
+        config.get('sobject', name): {field: target.split('.')[0] for field, target in config['reference_fields'].items()}
+        for name, config in field_mappings.items() if config.get('reference_fields')
+    }
+
+
+def references_from_validation_rules(validation_rules: Dict[str, Dict]) -> Dict[str, Dict[str, str]]:
+    """From DataValidator rules: 'relationships': {field: 'Object'}"""
+    return {name: dict(rules['relationships']) for name, rules in validation_rules.items() if rules.get('relationships')}
+
+
+def references_from_describe(org: str, objects: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """Writable lookup fields between the given objects, from the (cached) org describe"""
+    from app.services.describe_cache import describe_cache
+
+    objects = set(objects)
+    references = {}
+    for object_name in sorted(objects):
+        for name, field in describe_cache.fields(org, object_name).items():
+            if not (field.get('createable') or field.get('updateable')):
+                continue
+            for target in field.get('referenceTo') or []:
+                if target in objects:
+                    references.setdefault(object_name, {})[name] = target
+                    break
+    return references
+
+
+def merge_references(*sources: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    """Combine reference maps; later sources win for the same field"""
+    merged: Dict[str, Dict[str, str]] = {}
+    for source in sources:
+        for object_name, fields in source.items():
+            merged.setdefault(object_name, {}).update(fields)
+    return merged
+
+
+class LoadPlan:
+    """
+    Objects grouped into waves that only reference objects in earlier waves
+
+    deferred holds reference fields that can't be set on the first load (self-references
+    and fields that close a cycle); they are filled in by a second pass once every wave
+    has loaded.
+    """
+
+    def __init__(self, waves: List[List[str]], deferred: Dict[str, Dict[str, str]],
+                 references: Dict[str, Dict[str, str]]):
+        self.waves = waves
+        self.deferred = deferred
+        self.references = references
+
+    @property
+    def order(self) -> List[str]:
+        """Objects in a valid sequential load order"""
+        return [object_name for wave in self.waves for object_name in wave]
+
+    def depends_on(self, object_name: str) -> Set[str]:
+        """Objects that must load before this one (deferred references excluded)"""
+        deferred = self.deferred.get(object_name, {})
+        return {target for field, target in self.references.get(object_name, {}).items()
+                if field not in deferred and target != object_name}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'waves': self.waves, 'deferred': self.deferred}
+
+
+def _cycles(graph: Dict[str, Set[str]]) -> List[Set[str]]:
+    """Groups of objects that all (transitively) reference each other"""
+    def reachable(start):
+        seen, stack = set(), [start]
+        while stack:
+            for target in graph.get(stack.pop(), ()):
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return seen
+
+    reach = {node: reachable(node) for node in graph}
+    cycles: List[Set[str]] = []
+    for node in graph:
+        if node in reach[node] and not any(node in cycle for cycle in cycles):
+            cycles.append({other for other in reach[node] if node in reach[other]})
+    return cycles
+
+
+def plan_loads(objects: Iterable[str], references: Optional[Dict[str, Dict[str, str]]] = None) -> LoadPlan:
+    """
+    Topologically sort objects into waves
+
+    Only references between the objects being loaded count. Cycles are broken before
+    layering, each at the object whose references into the cycle are fewest (then
+    whose other dependencies are fewest); those fields are deferred to the second
+    pass, so the object lands in the earliest wave its remaining references allow.
+    """
+    objects = list(dict.fromkeys(objects))
+    planned_set = set(objects)
+    references = OBJECT_REFERENCES if references is None else references
+    references = {
+        object_name: {field: target for field, target in references.get(object_name, {}).items() if target in planned_set}
+        for object_name in objects
+    }
+
+    # Self-references always need a second pass
+    deferred: Dict[str, Dict[str, str]] = {}
+    for object_name, fields in references.items():
+        for field, target in fields.items():
+            if target == object_name:
+                deferred.setdefault(object_name, {})[field] = target
+
+    def dependencies(object_name):
+        return {field: target for field, target in references[object_name].items()
+                if target != object_name and field not in deferred.get(object_name, {})}
+
+    # Break cycles until the remaining references form a DAG
+    while True:
+        cycles = _cycles({o: set(dependencies(o).values()) for o in objects})
+        if not cycles:
+            break
+        for cycle in cycles:
+            def cost(object_name):
+                targets = list(dependencies(object_name).values())
+                into_cycle = sum(target in cycle for target in targets)
+                return into_cycle, len(targets) - into_cycle, objects.index(object_name)
+
+            breaker = min(cycle, key=cost)
+            deferred.setdefault(breaker, {}).update(
+                {field: target for field, target in dependencies(breaker).items() if target in cycle})
+
+    waves: List[List[str]] = []
+    placed: Set[str] = set()
+    remaining = list(objects)
+    while remaining:
+        wave = [object_name for object_name in remaining
+                if all(target in placed for target in dependencies(object_name).values())]
+        waves.append(wave)
+        placed.update(wave)
+        remaining = [object_name for object_name in remaining if object_name not in placed]
+
+    return LoadPlan(waves, deferred, references)
+
+
+def _as_result(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    return {'success': bool(value)}
+
+
+def run_plan(plan: LoadPlan, load: Callable[[str, List[str]], Any],
+             second_pass: Optional[Callable[[str, Dict[str, str]], Any]] = None,
+             max_workers: int = LOAD_PLAN_WORKERS,
+             on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Run a load plan: the objects of each wave concurrently, waves in order
+
+    load(object_name, deferred_fields) loads one object leaving the deferred fields
+    unset and returns a result dict with 'success' (or a bool). Objects depending
+    on a failed object are skipped. second_pass(object_name, deferred_fields) then
+    sets the deferred references of objects that loaded.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    failed: Set[str] = set()
+
+    def finish(object_name, result):
+        results[object_name] = result
+        if not result.get('success'):
+            failed.add(object_name)
+        if on_result:
+            on_result(object_name, result)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='load-wave') as executor:
+        for wave in plan.waves:
+            runnable = []
+            for object_name in wave:
+                blocked = sorted(plan.depends_on(object_name) & failed)
+                if blocked:
+                    finish(object_name, {'success': False, 'skipped': True,
+                                         'error': f"Skipped: depends on failed {', '.join(blocked)}"})
+                else:
+                    runnable.append(object_name)
+
+            futures = {
+                object_name: executor.submit(load, object_name, sorted(plan.deferred.get(object_name, {})))
+                for object_name in runnable
+            }
+            for object_name, future in futures.items():
+                try:
+                    result = _as_result(future.result())
+                except Exception as e:
+                    result = {'success': False, 'error': str(e)}
+                finish(object_name, result)
+
+    if second_pass:
+        for object_name, fields in plan.deferred.items():
+            if object_name in results and results[object_name].get('success'):
+                try:
+                    results[object_name]['second_pass'] = _as_result(second_pass(object_name, dict(fields)))
+                except Exception as e:
+                    results[object_name]['second_pass'] = {'success': False, 'error': str(e)}
+
+    return results
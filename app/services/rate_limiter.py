@@ -0,0 +1,76 @@
+"""
+Rate Limiter
+Token-bucket limiting of Salesforce API calls, shared per org
+"""
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from config.settings.app_config import ORG_RATE_LIMITS
+
+# Error fragments Salesforce returns when an org is over its API limits
+API_LIMIT_MARKERS = (
+    'REQUEST_LIMIT_EXCEEDED',
+    'TotalRequests Limit exceeded',
+    'ConcurrentPerOrgLongTxn',
+    'CONCURRENT_REQUEST_LIMIT_EXCEEDED',
+    'TooManyRequests'
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a token is available; returns False if timeout expires first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(org: str) -> TokenBucket:
+    """Get the shared token bucket for an org (configured in ORG_RATE_LIMITS)"""
+    with _buckets_lock:
+        if org not in _buckets:
+            limits = ORG_RATE_LIMITS.get(org, ORG_RATE_LIMITS['default'])
+            _buckets[org] = TokenBucket(limits['rate'], limits['burst'])
+        return _buckets[org]
+
+
+def is_api_limit_error(message: str) -> bool:
+    """Check whether an error message indicates an API limit was hit"""
+    return bool(message) and any(marker in message for marker in API_LIMIT_MARKERS)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,138 @@
+"""
+Reference Resolver
+Fills denormalized lookup columns (Product2.Name, Pricebook2.Name, ...) in workbook sheets
+from hash indexes built once per sheet
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.services.workbook_reader import clean_header
+
+
+class Reference(NamedTuple):
+    """
+    One lookup to resolve: rows of `sheet` whose `id_field` holds an Id from
+    `target_sheet` get `columns` ({sheet column: target column}) filled in
+    """
+    sheet: str
+    id_field: str
+    target_sheet: str
+    columns: Dict[str, str]
+
+
+# Lookups the upload template denormalizes for readability
+TEMPLATE_REFERENCES: List[Reference] = [
+    Reference('20_PricebookEntry', 'Product2Id', '13_Product2',
+              {'Product2.Name': 'Name', 'Product2.ProductCode': 'ProductCode'}),
+    Reference('20_PricebookEntry', 'Pricebook2Id', '19_Pricebook2', {'Pricebook2.Name': 'Name'}),
+    Reference('20_PricebookEntry', 'ProductSellingModelId', '15_ProductSellingModel',
+              {'ProductSellingModel.Name': 'Name'}),
+    Reference('17_ProductAttributeDef', 'ProductId', '13_Product2',
+              {'Product2.Name': 'Name', 'Product2.ProductCode': 'ProductCode'}),
+    Reference('17_ProductAttributeDef', 'AttributeDefinitionId', '09_AttributeDefinition',
+              {'AttributeDefinition.Name': 'Name'}),
+]
+
+
+class ReferenceResolver:
+    """
+    Resolves lookups across the sheets of an open (writable) openpyxl workbook
+
+    Each sheet's header row is read once into a column index, and each target
+    sheet is read once into an Id -> values hash index; every sheet to update is
+    then filled in a single pass over its rows, whatever the number of lookups.
+    """
+
+    def __init__(self, wb):
+        self.wb = wb
+        self._columns: Dict[str, Dict[str, int]] = {}
+        self._indexes: Dict[Tuple[str, Tuple[str, ...]], Dict[Any, Tuple[Any, ...]]] = {}
+
+    def column_index(self, sheet_name: str) -> Dict[str, int]:
+        """Clean header -> 1-based column number (first occurrence wins)"""
+        if sheet_name not in self._columns:
+            index = {}
+            header_row = next(self.wb[sheet_name].iter_rows(min_row=1, max_row=1, values_only=True), ())
+            for col_num, header in enumerate(header_row, 1):
+                if header is not None:
+                    index.setdefault(clean_header(header), col_num)
+            self._columns[sheet_name] = index
+        return self._columns[sheet_name]
+
+    def id_index(self, sheet_name: str, fields: Iterable[str]) -> Dict[Any, Tuple[Any, ...]]:
+        """Id -> values of `fields` (None where the sheet lacks the column), for every row with an Id"""
+        fields = tuple(fields)
+        key = (sheet_name, fields)
+        if key not in self._indexes:
+            columns = self.column_index(sheet_name)
+            index = {}
+            if 'Id' in columns:
+                positions = [columns[f] - 1 if f in columns else None for f in fields]
+                id_position = columns['Id'] - 1
+                max_col = max([id_position] + [p for p in positions if p is not None]) + 1
+                for row in self.wb[sheet_name].iter_rows(min_row=2, max_col=max_col, values_only=True):
+                    record_id = row[id_position] if id_position < len(row) else None
+                    if record_id:
+                        index[record_id] = tuple(
+                            row[p] if p is not None and p < len(row) else None for p in positions
+                        )
+            self._indexes[key] = index
+        return self._indexes[key]
+
+    def invalidate(self, sheet_name: Optional[str] = None) -> None:
+        """Forget cached indexes after a sheet's contents changed"""
+        if sheet_name is None:
+            self._columns.clear()
+            self._indexes.clear()
+            return
+        self._columns.pop(sheet_name, None)
+        for key in [k for k in self._indexes if k[0] == sheet_name]:
+            del self._indexes[key]
+
+    def resolve_sheet(self, sheet_name: str, references: Iterable[Reference]) -> int:
+        """Apply every lookup for one sheet in a single pass; returns the number of cells filled"""
+        if sheet_name not in self.wb.sheetnames:
+            return 0
+        columns = self.column_index(sheet_name)
+
+        # (id column, target index, [(column to fill, position in the indexed values)])
+        plans = []
+        for ref in references:
+            if ref.id_field not in columns or ref.target_sheet not in self.wb.sheetnames:
+                continue
+            fills = [(columns[col], i) for i, col in enumerate(ref.columns) if col in columns]
+            if not fills:
+                continue
+            index = self.id_index(ref.target_sheet, ref.columns.values())
+            if index:
+                plans.append((columns[ref.id_field], index, fills))
+        if not plans:
+            return 0
+
+        max_col = max(max([id_col] + [c for c, _ in fills]) for id_col, _, fills in plans)
+        filled = 0
+        for row in self.wb[sheet_name].iter_rows(min_row=2, max_col=max_col):
+            for id_col, index, fills in plans:
+                values = index.get(row[id_col - 1].value)
+                if values is None:
+                    continue
+                for col, position in fills:
+                    value = values[position]
+                    if value is not None:
+                        row[col - 1].value = value
+                        filled += 1
+        if filled:
+            self.invalidate(sheet_name)
+        return filled
+
+    def resolve(self, references: Iterable[Reference] = TEMPLATE_REFERENCES) -> Dict[str, int]:
+        """Resolve lookups for every sheet they cover; returns cells filled per sheet"""
+        by_sheet: Dict[str, List[Reference]] = {}
+        for ref in references:
+            by_sheet.setdefault(ref.sheet, []).append(ref)
+        return {sheet: self.resolve_sheet(sheet, refs) for sheet, refs in by_sheet.items()
+                if sheet in self.wb.sheetnames}
+
+
+def resolve_references(wb, references: Iterable[Reference] = TEMPLATE_REFERENCES) -> Dict[str, int]:
+    """Fill denormalized lookup columns in an open workbook"""
+    return ReferenceResolver(wb).resolve(references)
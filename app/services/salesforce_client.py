@@ -0,0 +1,400 @@
+"""
+Salesforce API Client
+In-process REST and Bulk API 2.0 client that reuses the access token of a
+Salesforce CLI connection, so calls don't pay the CLI startup cost
+"""
+import csv
+import io
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.exceptions import NewConnectionError
+except ImportError:
+    requests = None
+
+from config.settings.app_config import (
+    SALESFORCE_API_VERSION,
+    API_TIMEOUT,
+    API_MAX_RETRIES,
+    API_POOL_SIZE,
+    API_CLIENT_RETRY_INTERVAL,
+    BULK_POLL_INTERVAL,
+    BULK_JOB_TIMEOUT
+)
+from app.services.rate_limiter import get_rate_limiter, is_api_limit_error, backoff_delay
+
+# Bulk API 2.0 job states that end polling
+BULK_FINAL_STATES = {'JobComplete', 'Failed', 'Aborted'}
+
+# Methods safe to resend after a connection error (a POST may already have created a job)
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PATCH', 'DELETE'}
+
+
+def never_sent(error: Exception) -> bool:
+    """Whether a failed request provably never reached the server (it could not connect)"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+class SalesforceApiError(Exception):
+    """Error returned by the Salesforce REST or Bulk API"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, error_code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error_code = error_code
+
+    @property
+    def is_auth_error(self) -> bool:
+        return self.status_code == 401 or self.error_code == 'INVALID_SESSION_ID'
+
+    @property
+    def is_limit_error(self) -> bool:
+        return self.status_code == 429 or is_api_limit_error(f"{self.error_code} {self}")
+
+
+class SalesforceClient:
+    """REST / Bulk API 2.0 client with a pooled keep-alive HTTP session"""
+
+    def __init__(self, instance_url: str, access_token: str, api_version: str = SALESFORCE_API_VERSION,
+                 org: Optional[str] = None, token_provider: Optional[Callable[[], Optional[str]]] = None):
+        """
+        Args:
+            instance_url: Org instance URL (any base URL works, e.g. a local stub server)
+            access_token: OAuth access token / session id
+            api_version: API version such as '64.0'
+            org: Org alias used to pick the shared rate limiter
+            token_provider: Called to get a fresh token when the current one expires
+        """
+        if requests is None:
+            raise RuntimeError('requests is not installed. Run: pip install requests')
+
+        self.instance_url = instance_url.rstrip('/')
+        self.access_token = access_token
+        self.api_version = str(api_version or SALESFORCE_API_VERSION).lstrip('v')
+        self.org = org or self.instance_url
+        self.token_provider = token_provider
+        self.limiter = get_rate_limiter(self.org)
+        self.org_info = {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=API_POOL_SIZE, pool_maxsize=API_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._token_lock = threading.Lock()
+
+    @property
+    def base_path(self) -> str:
+        return f"/services/data/v{self.api_version}"
+
+    def _url(self, path: str) -> str:
+        """Resolve a path relative to the versioned REST root"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        if not path.startswith('/services/'):
+            path = f"{self.base_path}/{path.lstrip('/')}"
+        return self.instance_url + path
+
+    def _refresh_token(self, stale_token: str) -> bool:
+        """Fetch a new access token unless another thread already did"""
+        with self._token_lock:
+            if self.access_token != stale_token:
+                return True
+            token = self.token_provider() if self.token_provider else None
+            if not token:
+                return False
+            self.access_token = token
+            return True
+
+    @staticmethod
+    def _error_from_response(response) -> SalesforceApiError:
+        """Build an error from a REST error body ([{message, errorCode}] or similar)"""
+        message = response.text[:500] or response.reason
+        error_code = None
+        try:
+            body = response.json()
+            if isinstance(body, list) and body:
+                body = body[0]
+            if isinstance(body, dict):
+                message = body.get('message', message)
+                error_code = body.get('errorCode') or body.get('error')
+        except ValueError:
+            pass
+        return SalesforceApiError(message, response.status_code, error_code)
+
+    def request(self, method: str, path: str, json_body=None, data=None, headers: Optional[Dict] = None,
+                params: Optional[Dict] = None, raw: bool = False, max_retries: int = API_MAX_RETRIES):
+        """
+        Send an API request, returning parsed JSON (or the response when raw=True)
+
+        A 304 Not Modified (conditional request) returns None, or the response when raw=True.
+
+        Requests are throttled by the org's rate limiter, retried with backoff on
+        API-limit and connection errors, and retried once with a fresh token on 401.
+        POST and PUT are only retried after connection errors when they could not
+        have reached the server, so a timeout can't create a second ingest job.
+        """
+        url = self._url(path)
+        attempt = 0
+        refreshed = False
+
+        while True:
+            token = self.access_token
+            request_headers = {'Authorization': f'Bearer {token}', 'Accept': 'application/json'}
+            if headers:
+                request_headers.update(headers)
+
+            self.limiter.acquire()
+            try:
+                response = self.session.request(method, url, json=json_body, data=data, params=params,
+                                                headers=request_headers, timeout=API_TIMEOUT)
+            except requests.RequestException as e:
+                if attempt < max_retries and (method.upper() in IDEMPOTENT_METHODS or never_sent(e)):
+                    time.sleep(backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                raise SalesforceApiError(f'Request failed: {str(e)}')
+
+            if response.status_code < 300 or response.status_code == 304:
+                if raw:
+                    return response
+                if response.status_code == 304 or not response.content:
+                    return None
+                return response.json()
+
+            error = self._error_from_response(response)
+            if error.is_auth_error and not refreshed and self._refresh_token(token):
+                refreshed = True
+                continue
+            if error.is_limit_error and attempt < max_retries:
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            raise error
+
+    # ---- REST ----
+
+    def iter_query(self, soql: str, include_deleted: bool = False) -> Iterator[Dict]:
+        """Yield query records, following nextRecordsUrl (queryMore) pagination"""
+        endpoint = 'queryAll' if include_deleted else 'query'
+        result = self.request('GET', endpoint, params={'q': soql})
+        while True:
+            for record in result.get('records', []):
+                yield record
+            next_url = result.get('nextRecordsUrl')
+            if result.get('done', True) or not next_url:
+                break
+            result = self.request('GET', next_url)
+
+    def query(self, soql: str, include_deleted: bool = False) -> List[Dict]:
+        """Run a SOQL query and return all records"""
+        return list(self.iter_query(soql, include_deleted))
+
+    def describe(self, sobject: str, headers: Optional[Dict] = None):
+        """Describe an sObject"""
+        return self.request('GET', f'sobjects/{sobject}/describe', headers=headers)
+
+    def describe_global(self, headers: Optional[Dict] = None):
+        """List all sObjects in the org"""
+        return self.request('GET', 'sobjects', headers=headers)
+
+    def limits(self) -> Dict:
+        """Get org API limits (also a cheap way to check the token is valid)"""
+        return self.request('GET', 'limits')
+
+    def composite(self, subrequests: List[Dict], all_or_none: bool = False) -> List[Dict]:
+        """
+        Run up to 25 subrequests in one round trip
+
+        Each subrequest is {'method', 'url', 'referenceId', 'body'?}; relative urls
+        are resolved against the versioned REST root.
+        """
+        composite_request = []
+        for sub in subrequests:
+            sub = dict(sub)
+            if not sub['url'].startswith('/services/'):
+                sub['url'] = f"{self.base_path}/{sub['url'].lstrip('/')}"
+            composite_request.append(sub)
+
+        result = self.request('POST', 'composite', json_body={
+            'allOrNone': all_or_none,
+            'compositeRequest': composite_request
+        })
+        return result.get('compositeResponse', [])
+
+    # ---- Bulk API 2.0 ----
+
+    def create_ingest_job(self, sobject: str, operation: str, external_id_field: Optional[str] = None) -> Dict:
+        """Create a Bulk API 2.0 ingest job (insert, update, upsert, delete)"""
+        body = {
+            'object': sobject,
+            'operation': operation,
+            'contentType': 'CSV',
+            'lineEnding': 'LF'
+        }
+        if external_id_field:
+            body['externalIdFieldName'] = external_id_field
+        return self.request('POST', 'jobs/ingest', json_body=body)
+
+    def upload_job_data(self, job_id: str, csv_data: Union[str, bytes]) -> None:
+        """Upload the CSV content of an ingest job"""
+        if isinstance(csv_data, str):
+            csv_data = csv_data.encode('utf-8')
+        self.request('PUT', f'jobs/ingest/{job_id}/batches', data=csv_data,
+                     headers={'Content-Type': 'text/csv'}, raw=True)
+
+    def close_job(self, job_id: str) -> Dict:
+        """Mark an ingest job's upload complete so Salesforce starts processing it"""
+        return self.request('PATCH', f'jobs/ingest/{job_id}', json_body={'state': 'UploadComplete'})
+
+    def abort_job(self, job_id: str, job_type: str = 'ingest') -> Dict:
+        """Abort an ingest or query job"""
+        return self.request('PATCH', f'jobs/{job_type}/{job_id}', json_body={'state': 'Aborted'})
+
+    def get_job(self, job_id: str, job_type: str = 'ingest') -> Dict:
+        """Get the current status of an ingest or query job"""
+        return self.request('GET', f'jobs/{job_type}/{job_id}')
+
+    def wait_for_job(self, job_id: str, job_type: str = 'ingest', timeout: int = BULK_JOB_TIMEOUT,
+                     poll_interval: float = BULK_POLL_INTERVAL,
+                     on_status: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Poll a job until it reaches a final state, backing off up to 30s between polls"""
+        deadline = time.monotonic() + timeout
+        interval = poll_interval
+        while True:
+            job = self.get_job(job_id, job_type)
+            if on_status:
+                on_status(job)
+            if job.get('state') in BULK_FINAL_STATES:
+                return job
+            if time.monotonic() + interval > deadline:
+                raise SalesforceApiError(f'Timed out waiting for job {job_id} (state {job.get("state")})')
+            time.sleep(interval)
+            interval = min(interval * 1.5, 30)
+
+    def get_job_results(self, job_id: str, result_type: str = 'failedResults') -> List[Dict]:
+        """Get successfulResults, failedResults or unprocessedrecords of an ingest job as dicts"""
+        response = self.request('GET', f'jobs/ingest/{job_id}/{result_type}/',
+                                headers={'Accept': 'text/csv'}, raw=True)
+        return list(csv.DictReader(io.StringIO(response.content.decode('utf-8'))))
+
+    def bulk_ingest(self, sobject: str, operation: str, csv_data: Union[str, bytes],
+                    external_id_field: Optional[str] = None, wait: bool = True) -> Dict:
+        """Create, upload and close an ingest job; optionally wait for it to finish"""
+        job = self.create_ingest_job(sobject, operation, external_id_field)
+        try:
+            self.upload_job_data(job['id'], csv_data)
+            job = self.close_job(job['id'])
+        except SalesforceApiError:
+            self.abort_job(job['id'])
+            raise
+        return self.wait_for_job(job['id']) if wait else job
+
+    def bulk_query(self, soql: str, include_deleted: bool = False, page_size: int = 50000) -> Iterator[Dict]:
+        """Run a Bulk API 2.0 query job and yield result rows as dicts"""
+        job = self.request('POST', 'jobs/query', json_body={
+            'operation': 'queryAll' if include_deleted else 'query',
+            'query': soql
+        })
+        job = self.wait_for_job(job['id'], job_type='query')
+        if job.get('state') != 'JobComplete':
+            raise SalesforceApiError(f"Query job {job['id']} ended in state {job.get('state')}")
+
+        locator = None
+        while True:
+            params = {'maxRecords': page_size}
+            if locator:
+                params['locator'] = locator
+            response = self.request('GET', f"jobs/query/{job['id']}/results", params=params,
+                                    headers={'Accept': 'text/csv'}, raw=True)
+            for row in csv.DictReader(io.StringIO(response.content.decode('utf-8'))):
+                yield row
+            locator = response.headers.get('Sforce-Locator')
+            if not locator or locator == 'null':
+                break
+
+
+_clients: Dict[str, SalesforceClient] = {}
+# Aliases whose client couldn't be built, with the time of the attempt
+_client_failures: Dict[str, float] = {}
+_clients_lock = threading.Lock()
+_alias_locks: Dict[str, threading.Lock] = {}
+
+
+def _fetch_token(cli_alias: str) -> Optional[str]:
+    """Get a fresh access token for a CLI alias via the connection manager"""
+    from app.services.connection_manager import connection_manager
+
+    org_info = connection_manager._get_org_info(cli_alias) or {}
+    token = org_info.get('access_token')
+    return token if token and token != 'CLI Managed' else None
+
+
+def get_client(cli_alias: str) -> Optional[SalesforceClient]:
+    """
+    Get the shared API client for a CLI org alias
+
+    Returns None when the API path isn't available (requests not installed or
+    the CLI can't provide a token) so callers can fall back to the sf CLI. A failed
+    attempt is remembered for API_CLIENT_RETRY_INTERVAL seconds, then retried.
+    """
+    if requests is None:
+        return None
+
+    def cached():
+        if cli_alias in _clients:
+            return _clients[cli_alias], True
+        failed_at = _client_failures.get(cli_alias)
+        return None, failed_at is not None and time.monotonic() - failed_at < API_CLIENT_RETRY_INTERVAL
+
+    with _clients_lock:
+        client, found = cached()
+        if found:
+            return client
+        alias_lock = _alias_locks.setdefault(cli_alias, threading.Lock())
+
+    # Per-alias lock: building a client shells out to the CLI, which must not
+    # hold up lookups for other orgs
+    with alias_lock:
+        with _clients_lock:
+            client, found = cached()
+            if found:
+                return client
+
+        # Imported here to avoid a circular import (the connection manager uses this client)
+        from app.services.connection_manager import connection_manager
+
+        client = None
+        org_info = connection_manager._get_org_info(cli_alias)
+        if org_info and org_info.get('instance_url'):
+            token = org_info.get('access_token')
+            if token and token != 'CLI Managed':
+                client = SalesforceClient(
+                    org_info['instance_url'],
+                    token,
+                    org_info.get('api_version') or SALESFORCE_API_VERSION,
+                    org=cli_alias,
+                    token_provider=lambda: _fetch_token(cli_alias)
+                )
+                client.org_info = {k: v for k, v in org_info.items() if k != 'access_token'}
+
+        with _clients_lock:
+            if client is None:
+                _client_failures[cli_alias] = time.monotonic()
+            else:
+                _clients[cli_alias] = client
+                _client_failures.pop(cli_alias, None)
+        return client
+
+
+def invalidate_client(cli_alias: str) -> None:
+    """Forget the cached client for an alias (after logout, re-login or auth failure)"""
+    with _clients_lock:
+        _clients.pop(cli_alias, None)
+        _client_failures.pop(cli_alias, None)
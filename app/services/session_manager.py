@@ -1,14 +1,11 @@
 """
 Session Manager for Revenue Cloud Migration Tool
-Handles user sessions with file-based storage
+Handles user sessions backed by an in-memory or SQLite session store
 """
-import json
 import uuid
-import os
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Optional
-import hashlib
 import secrets
 
 from config.settings.app_config import (
@@ -16,17 +13,30 @@ from config.settings.app_config import (
     SESSION_LIFETIME_HOURS,
     SESSION_COOKIE_NAME,
     SESSION_COOKIE_SECURE,
-    SESSION_COOKIE_HTTPONLY
+    SESSION_COOKIE_HTTPONLY,
+    SESSION_STORE,
+    SESSION_DB_PATH,
+    SESSION_FLUSH_INTERVAL,
+    SESSION_TOUCH_INTERVAL
 )
+from app.services.session_store import FileSessionStore, SQLiteSessionStore
+
+
+def create_session_store(backend: str = SESSION_STORE):
+    """Create the configured session store ('file' or 'sqlite')"""
+    if backend == 'sqlite':
+        return SQLiteSessionStore(SESSION_DB_PATH, SESSION_TOUCH_INTERVAL)
+    if backend == 'file':
+        return FileSessionStore(SESSIONS_DIR, SESSION_FLUSH_INTERVAL, SESSION_LIFETIME_HOURS)
+    raise ValueError(f"Unknown session store: {backend}")
 
 
 class SessionManager:
-    """Manages user sessions with file-based storage"""
+    """Manages user sessions"""
     
-    def __init__(self):
+    def __init__(self, store=None):
         self.sessions_dir = SESSIONS_DIR
-        self.sessions_dir.mkdir(parents=True, exist_ok=True)
-        self._cleanup_expired_sessions()
+        self.store = store or create_session_store()
     
     def create_session(self, username: str, connection_id: str = None) -> str:
         """Create a new session and return session ID"""
@@ -49,15 +59,11 @@ class SessionManager:
         """Get session data if valid"""
         if not session_id:
             return None
-            
-        session_file = self.sessions_dir / f"session_{session_id}.json"
-        
-        if not session_file.exists():
-            return None
         
         try:
-            with open(session_file, 'r') as f:
-                session_data = json.load(f)
+            session_data = self.store.get(session_id)
+            if not session_data:
+                return None
             
             # Check expiration
             expires_at = datetime.fromisoformat(session_data['expires_at'])
@@ -65,9 +71,9 @@ class SessionManager:
                 self.destroy_session(session_id)
                 return None
             
-            # Update last accessed time
+            # Update last accessed time (persisted lazily by the store)
             session_data['last_accessed'] = datetime.now().isoformat()
-            self._save_session(session_id, session_data)
+            self.store.touch(session_id, session_data['last_accessed'])
             
             return session_data
             
@@ -87,10 +93,8 @@ class SessionManager:
     
     def destroy_session(self, session_id: str) -> bool:
         """Destroy a session"""
-        session_file = self.sessions_dir / f"session_{session_id}.json"
         try:
-            if session_file.exists():
-                session_file.unlink()
+            self.store.delete(session_id)
             return True
         except Exception as e:
             print(f"Error destroying session {session_id}: {e}")
@@ -126,27 +130,12 @@ class SessionManager:
         )
     
     def _save_session(self, session_id: str, session_data: Dict) -> None:
-        """Save session data to file"""
-        session_file = self.sessions_dir / f"session_{session_id}.json"
-        with open(session_file, 'w') as f:
-            json.dump(session_data, f, indent=2)
+        """Save session data to the store"""
+        self.store.put(session_id, session_data)
     
-    def _cleanup_expired_sessions(self) -> None:
-        """Remove expired session files"""
-        try:
-            for session_file in self.sessions_dir.glob("session_*.json"):
-                try:
-                    with open(session_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    expires_at = datetime.fromisoformat(data.get('expires_at', ''))
-                    if datetime.now() > expires_at:
-                        session_file.unlink()
-                except Exception:
-                    # If we can't read it, it's probably corrupted
-                    session_file.unlink()
-        except Exception as e:
-            print(f"Error cleaning up sessions: {e}")
+    def flush(self) -> None:
+        """Persist any pending session writes"""
+        self.store.flush()
     
     @staticmethod
     def get_session_cookie(cookies: str) -> Optional[str]:
@@ -0,0 +1,254 @@
+"""
+Session Stores
+Storage backends for SessionManager: in-memory with write-behind JSON files, or SQLite
+"""
+import atexit
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def _expiry_timestamp(session_data: Dict) -> float:
+    """Session expiry as a Unix timestamp"""
+    return datetime.fromisoformat(session_data['expires_at']).timestamp()
+
+
+class FileSessionStore:
+    """
+    Live sessions in a locked dict, persisted to sessions/session_<id>.json
+
+    Writes are coalesced: changes mark a session dirty and a background thread
+    writes each dirty session once per flush interval. Expiry is driven by a heap
+    rather than scanning the directory.
+    """
+
+    def __init__(self, sessions_dir: Path, flush_interval: float, lifetime_hours: float):
+        self.sessions_dir = Path(sessions_dir)
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.lifetime_seconds = lifetime_hours * 3600
+
+        self._sessions: Dict[str, Dict] = {}
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name='session-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _path(self, session_id: str) -> Path:
+        return self.sessions_dir / f"session_{session_id}.json"
+
+    def _track(self, session_id: str, session_data: Dict) -> None:
+        """Cache a session and schedule its expiry (caller holds the lock)"""
+        self._sessions[session_id] = session_data
+        self._deleted.discard(session_id)
+        heapq.heappush(self._expiry_heap, (_expiry_timestamp(session_data), session_id))
+
+    def _load(self, session_id: str) -> Optional[Dict]:
+        """Load a session persisted by an earlier run (caller holds the lock)"""
+        session_file = self._path(session_id)
+        if session_id in self._deleted or not session_file.exists():
+            return None
+        with open(session_file, 'r') as f:
+            session_data = json.load(f)
+        self._track(session_id, session_data)
+        return session_data
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Get a copy of a session, or None if unknown"""
+        with self._lock:
+            session_data = self._sessions.get(session_id)
+            if session_data is None:
+                session_data = self._load(session_id)
+            return dict(session_data) if session_data is not None else None
+
+    def put(self, session_id: str, session_data: Dict) -> None:
+        """Store a session; persisted on the next flush"""
+        with self._lock:
+            previous = self._sessions.get(session_id)
+            self._sessions[session_id] = dict(session_data)
+            self._deleted.discard(session_id)
+            self._dirty.add(session_id)
+            if previous is None or previous.get('expires_at') != session_data.get('expires_at'):
+                heapq.heappush(self._expiry_heap, (_expiry_timestamp(session_data), session_id))
+
+    def touch(self, session_id: str, last_accessed: str) -> None:
+        """Record an access; coalesced with any other pending write"""
+        with self._lock:
+            session_data = self._sessions.get(session_id)
+            if session_data is not None:
+                session_data['last_accessed'] = last_accessed
+                self._dirty.add(session_id)
+
+    def delete(self, session_id: str) -> None:
+        """Remove a session from memory and disk"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._dirty.discard(session_id)
+            self._deleted.add(session_id)
+        self._wakeup.set()
+
+    def purge_expired(self) -> int:
+        """Drop sessions whose expiry has passed; returns how many"""
+        now = time.time()
+        purged = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, session_id = heapq.heappop(self._expiry_heap)
+                session_data = self._sessions.get(session_id)
+                # Heap entries go stale when a session is extended or deleted
+                if session_data is not None and _expiry_timestamp(session_data) <= now:
+                    self._sessions.pop(session_id)
+                    self._dirty.discard(session_id)
+                    self._deleted.add(session_id)
+                    purged += 1
+        return purged
+
+    def _sweep_stale_files(self) -> None:
+        """
+        Delete session files from earlier runs that must have expired
+
+        A file is written whenever its expiry is set, so one untouched for longer
+        than the session lifetime is past its expiry; only a stat is needed.
+        """
+        cutoff = time.time() - self.lifetime_seconds
+        for session_file in self.sessions_dir.glob("session_*.json"):
+            try:
+                session_id = session_file.stem[len('session_'):]
+                with self._lock:
+                    if session_id in self._sessions:
+                        continue
+                if session_file.stat().st_mtime < cutoff:
+                    session_file.unlink()
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """Write dirty sessions and remove deleted ones"""
+        with self._flush_lock:
+            with self._lock:
+                pending = {sid: dict(self._sessions[sid]) for sid in self._dirty if sid in self._sessions}
+                deleted = set(self._deleted)
+                self._dirty.clear()
+                self._deleted.clear()
+
+            for session_id, session_data in pending.items():
+                session_file = self._path(session_id)
+                temp_file = session_file.with_suffix('.json.tmp')
+                try:
+                    with open(temp_file, 'w') as f:
+                        json.dump(session_data, f, indent=2)
+                    os.replace(temp_file, session_file)
+                except Exception as e:
+                    print(f"Error saving session {session_id}: {e}")
+                    with self._lock:
+                        self._dirty.add(session_id)
+
+            for session_id in deleted:
+                try:
+                    self._path(session_id).unlink(missing_ok=True)
+                except Exception as e:
+                    print(f"Error destroying session {session_id}: {e}")
+
+    def _run(self) -> None:
+        """Background writer: flush and expire every interval"""
+        try:
+            self._sweep_stale_files()
+        except Exception as e:
+            print(f"Error cleaning up sessions: {e}")
+
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.purge_expired()
+                self.flush()
+            except Exception as e:
+                print(f"Error persisting sessions: {e}")
+
+    def close(self) -> None:
+        """Stop the writer and flush everything pending"""
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a SQLite database, shared by every process using the same file
+
+    Access-time updates are only written once they are more than `touch_interval`
+    seconds old, so reads don't turn into a write per request.
+    """
+
+    def __init__(self, db_path: Path, touch_interval: float):
+        self.db_path = str(db_path)
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+        self.purge_expired()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, session_id: str, session_data: Dict) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(session_data), _expiry_timestamp(session_data))
+            )
+
+    def touch(self, session_id: str, last_accessed: str) -> None:
+        session_data = self.get(session_id)
+        if session_data is None:
+            return
+        previous = datetime.fromisoformat(session_data.get('last_accessed', session_data['created_at']))
+        if (datetime.fromisoformat(last_accessed) - previous).total_seconds() >= self.touch_interval:
+            session_data['last_accessed'] = last_accessed
+            self.put(session_id, session_data)
+
+    def delete(self, session_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def flush(self) -> None:
+        """Writes are immediate; nothing to flush"""
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,248 @@
+"""
+Sheet Fingerprints
+Content fingerprints per sheet (normalized row hashes and a Merkle root), the inputs each
+pipeline stage consumed, and the row hashes last loaded into each org, per workbook
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, time as dt_time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from config.settings.app_config import FINGERPRINTS_DIR
+from app.services.workbook_reader import SheetTable, WorkbookReader, clean_header
+
+# Values per IN (...) lookup, below SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+
+
+def _hash(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def normalize_value(value: Any) -> str:
+    """A cell as text that is equal for equal content (2.0 == 2, ' x ' == 'x', True == 'true')"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def row_hash(headers: Sequence[str], row: Sequence[Any]) -> str:
+    """
+    Hash of a row's non-empty cells with their column names
+
+    Independent of column order, and adding an empty column leaves it unchanged.
+    """
+    cells = sorted((clean_header(h), normalize_value(v)) for h, v in zip(headers, row))
+    text = '\x1f'.join(f"{h}\x1e{v}" for h, v in cells if v != '')
+    return _hash(text.encode('utf-8')).hex()
+
+
+def merkle_root(leaf_hashes: Iterable[str]) -> str:
+    """Root of a binary hash tree over the given hex digests (an odd last node moves up as is)"""
+    level = [bytes.fromhex(h) for h in leaf_hashes]
+    if not level:
+        return _hash(b'').hex()
+    while len(level) > 1:
+        level = [_hash(level[i] + level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+def combine(*parts: Any) -> str:
+    """One digest for several inputs (digests, options, ...)"""
+    return _hash(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hex()
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """Digest of a file's bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SheetFingerprint:
+    """A sheet's root digest and row count; row_hashes is only set when computed from the rows"""
+
+    def __init__(self, sheet: str, root: str, rows: int, row_hashes: Optional[List[str]] = None):
+        self.sheet = sheet
+        self.root = root
+        self.rows = rows
+        self.row_hashes = row_hashes
+
+
+def fingerprint_table(table: SheetTable) -> SheetFingerprint:
+    """Row hashes and the sheet root (over the column names and the rows' Merkle root)"""
+    row_hashes = [row_hash(table.headers, row) for row in table.rows()]
+    header_digest = combine(sorted(h for h in table.clean_headers if h))
+    return SheetFingerprint(table.name, combine(header_digest, merkle_root(row_hashes)), len(row_hashes), row_hashes)
+
+
+class FingerprintStore:
+    """
+    SQLite store for a workbook or a directory of CSVs
+
+    Kept under FINGERPRINTS_DIR as <name>-<path digest>.db rather than next to the
+    (possibly tracked) source. It holds:
+
+    - sheet fingerprints, reused while the workbook's size and mtime are unchanged
+    - per stage and target (output directory, file, org): the input digest each sheet
+      had when the stage last processed it, so unchanged sheets can be skipped
+    - per org and object: the row hash last loaded for each row key, so upserts can
+      send only new or changed rows
+    """
+
+    def __init__(self, source_path: Union[str, Path], store_dir: Union[str, Path] = FINGERPRINTS_DIR):
+        self.source_path = Path(source_path)
+        path_digest = _hash(str(self.source_path.resolve()).encode('utf-8')).hex()[:12]
+        self.db_path = Path(store_dir) / f"{self.source_path.stem or 'root'}-{path_digest}.db"
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.db_path), timeout=30)
+                if not self._schema_ready:
+                    with conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS sheets ("
+                            "sheet TEXT PRIMARY KEY, root TEXT NOT NULL, rows INTEGER NOT NULL, "
+                            "source_size INTEGER, source_mtime_ns INTEGER, computed_at REAL NOT NULL)"
+                        )
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS stage_inputs ("
+                            "stage TEXT NOT NULL, target TEXT NOT NULL, sheet TEXT NOT NULL, "
+                            "digest TEXT NOT NULL, detail TEXT, recorded_at REAL NOT NULL, "
+                            "PRIMARY KEY (stage, target, sheet)) WITHOUT ROWID"
+                        )
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS loaded_rows ("
+                            "org TEXT NOT NULL, sobject TEXT NOT NULL, row_key TEXT NOT NULL, "
+                            "row_hash TEXT NOT NULL, loaded_at REAL NOT NULL, "
+                            "PRIMARY KEY (org, sobject, row_key)) WITHOUT ROWID"
+                        )
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _source_stat(self):
+        try:
+            stat = os.stat(self.source_path)
+        except OSError:
+            return None, None
+        return stat.st_size, stat.st_mtime_ns
+
+    # Sheet fingerprints
+
+    def cached(self, sheet: str) -> Optional[SheetFingerprint]:
+        """The stored fingerprint, if the workbook hasn't changed since it was computed"""
+        row = self._connect().execute(
+            "SELECT root, rows, source_size, source_mtime_ns FROM sheets WHERE sheet = ?", (sheet,)
+        ).fetchone()
+        if row is None or (row[2], row[3]) != self._source_stat():
+            return None
+        return SheetFingerprint(sheet, row[0], row[1])
+
+    def fingerprint(self, table: SheetTable) -> SheetFingerprint:
+        """Fingerprint a sheet read from the workbook and store it"""
+        fingerprint = fingerprint_table(table)
+        size, mtime_ns = self._source_stat()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sheets VALUES (?, ?, ?, ?, ?, ?)",
+                (table.name, fingerprint.root, fingerprint.rows, size, mtime_ns, time.time())
+            )
+        return fingerprint
+
+    def sheet_fingerprints(self, sheet_names: Optional[Iterable[str]] = None) -> Dict[str, SheetFingerprint]:
+        """Fingerprints of sheets (all by default); the workbook is only read for sheets not cached"""
+        with WorkbookReader(self.source_path) as reader:
+            names = reader.sheet_names if sheet_names is None else [
+                n for n in sheet_names if n in reader.sheet_names]
+            fingerprints = {}
+            for name in names:
+                fingerprints[name] = self.cached(name) or self.fingerprint(reader.read_sheet(name))
+        return fingerprints
+
+    # Stage inputs
+
+    def consumed(self, stage: str, target: str) -> Dict[str, Dict[str, Any]]:
+        """{sheet: {'digest', 'detail'}} recorded by a stage for a target"""
+        rows = self._connect().execute(
+            "SELECT sheet, digest, detail FROM stage_inputs WHERE stage = ? AND target = ?", (stage, str(target))
+        ).fetchall()
+        return {sheet: {'digest': digest, 'detail': json.loads(detail) if detail else None}
+                for sheet, digest, detail in rows}
+
+    def record_consumed(self, stage: str, target: str, sheet: str, digest: str, detail: Any = None) -> None:
+        """Record the input digest a stage processed a sheet with (and what it produced)"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO stage_inputs VALUES (?, ?, ?, ?, ?, ?)",
+                (stage, str(target), sheet, digest, json.dumps(detail) if detail is not None else None, time.time())
+            )
+
+    # Loaded rows
+
+    def changed_rows(self, org: str, sobject: str, keys: Sequence[str], hashes: Sequence[str]) -> List[int]:
+        """Positions of rows whose key was never loaded, or was loaded with a different hash"""
+        conn = self._connect()
+        loaded: Dict[str, str] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), LOOKUP_BATCH):
+            batch = unique_keys[start:start + LOOKUP_BATCH]
+            loaded.update(conn.execute(
+                f"SELECT row_key, row_hash FROM loaded_rows WHERE org = ? AND sobject = ? "
+                f"AND row_key IN ({', '.join('?' * len(batch))})",
+                [org, sobject, *batch]
+            ).fetchall())
+        return [i for i, (key, digest) in enumerate(zip(keys, hashes)) if loaded.get(key) != digest]
+
+    def record_loaded(self, org: str, sobject: str, keys: Iterable[str], hashes: Iterable[str]) -> int:
+        """Record rows as successfully loaded; returns the count"""
+        now = time.time()
+        rows = [(org, sobject, key, digest, now) for key, digest in zip(keys, hashes)]
+        if rows:
+            with self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO loaded_rows VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def forget_loaded(self, org: str, sobject: Optional[str] = None) -> None:
+        """Drop recorded loads (e.g. after the org was refreshed), so every row is sent again"""
+        with self._connect() as conn:
+            if sobject is None:
+                conn.execute("DELETE FROM loaded_rows WHERE org = ?", (org,))
+            else:
+                conn.execute("DELETE FROM loaded_rows WHERE org = ? AND sobject = ?", (org, sobject))
+
+
+_stores: Dict[str, FingerprintStore] = {}
+_stores_lock = threading.Lock()
+
+
+def fingerprint_store(source_path: Union[str, Path]) -> FingerprintStore:
+    """The store for a workbook or CSV directory (one instance per resolved path)"""
+    key = str(Path(source_path).resolve())
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = FingerprintStore(key)
+        return _stores[key]
@@ -0,0 +1,192 @@
+"""
+Sheet Query
+Server-side filtering, sorting, column projection and paging of parsed sheets
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config.settings.app_config import MAX_VIEW_PAGE_SIZE
+
+# One filter clause: <column><op><value>, e.g. "Name~widget", "UnitPrice>=10" or "Family@Software|Services"
+FILTER_CLAUSE = re.compile(r'^\s*(?P<column>[^!=<>~@]+?)\s*(?P<op>!=|>=|<=|=|>|<|~|@)\s*(?P<value>.*?)\s*$')
+
+
+class SheetQueryError(ValueError):
+    """Invalid paging, sort, column or filter parameter"""
+
+
+def parse_view_params(params: Dict[str, List[str]]) -> Dict:
+    """
+    Read view options from parsed query-string parameters
+
+    offset/limit  page window (limit capped at MAX_VIEW_PAGE_SIZE; no limit = all rows)
+    sort          comma-separated columns, prefix '-' for descending: "Name,-UnitPrice"
+    columns       comma-separated columns to return
+    filter        ';'-separated clauses ANDed together, ops = != > < >= <= ~ (contains)
+                  and @ (one of '|'-separated values, compared as display text)
+    distinct      a column whose distinct values to return instead of rows
+    """
+    def first(name):
+        values = params.get(name)
+        return values[0].strip() if values and values[0].strip() else None
+
+    def integer(name):
+        value = first(name)
+        if value is None:
+            return None
+        try:
+            number = int(value)
+        except ValueError:
+            raise SheetQueryError(f"'{name}' must be an integer")
+        if number < 0:
+            raise SheetQueryError(f"'{name}' must not be negative")
+        return number
+
+    limit = integer('limit')
+    if limit is not None:
+        limit = min(limit, MAX_VIEW_PAGE_SIZE)
+
+    return {
+        'offset': integer('offset') or 0,
+        'limit': limit,
+        'sort': [s.strip() for s in first('sort').split(',') if s.strip()] if first('sort') else [],
+        'columns': [c.strip() for c in first('columns').split(',') if c.strip()] if first('columns') else [],
+        'filter': first('filter'),
+        'distinct': first('distinct')
+    }
+
+
+def _resolve_column(df: pd.DataFrame, name: str) -> str:
+    """Match a requested column, ignoring the '*' required-field markers in headers"""
+    if name in df.columns:
+        return name
+    for column in df.columns:
+        if str(column).replace('*', '').strip() == name:
+            return column
+    raise SheetQueryError(f"Unknown column '{name}'")
+
+
+def display_text(series: pd.Series) -> pd.Series:
+    """Cells as the text the preview shows: true/false, 12 for 12.0; empty cells stay NaN"""
+    def text(value):
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    return series.map(text, na_action='ignore')
+
+
+def _clause_mask(series: pd.Series, op: str, value: str) -> pd.Series:
+    """Evaluate one filter clause against a column, vectorized"""
+    if op == '~':
+        return series.astype(str).str.contains(value, case=False, regex=False, na=False)
+    if op == '@':
+        return display_text(series).isin(value.split('|'))
+
+    if value.lower() in ('null', 'none', ''):
+        return series.isna() if op == '=' else series.notna() if op == '!=' else \
+            pd.Series(False, index=series.index)
+
+    numeric_value = pd.to_numeric(pd.Series([value]), errors='coerce').iloc[0]
+    if pd.notna(numeric_value) and op in ('>', '<', '>=', '<='):
+        left, right = pd.to_numeric(series, errors='coerce'), numeric_value
+    elif op in ('>', '<', '>=', '<='):
+        left, right = series.astype(str), value
+    elif value.lower() in ('true', 'false') and series.dropna().map(type).eq(bool).all():
+        left, right = series, value.lower() == 'true'
+    elif pd.notna(numeric_value) and pd.api.types.is_numeric_dtype(series):
+        left, right = series, numeric_value
+    else:
+        left, right = series.astype(str), value
+
+    if op == '=':
+        mask = left == right
+    elif op == '!=':
+        mask = left != right
+    elif op == '>':
+        mask = left > right
+    elif op == '<':
+        mask = left < right
+    elif op == '>=':
+        mask = left >= right
+    else:
+        mask = left <= right
+    mask = mask.fillna(False).astype(bool)
+    # Empty cells only ever match '!='
+    return mask if op == '!=' else mask & series.notna()
+
+
+def apply_filter(df: pd.DataFrame, expression: Optional[str]) -> pd.DataFrame:
+    """Keep rows matching every clause of a filter expression"""
+    if not expression:
+        return df
+
+    mask = pd.Series(True, index=df.index)
+    for clause in expression.split(';'):
+        if not clause.strip():
+            continue
+        match = FILTER_CLAUSE.match(clause)
+        if not match:
+            raise SheetQueryError(f"Invalid filter clause '{clause}'")
+        column = _resolve_column(df, match.group('column'))
+        mask &= _clause_mask(df[column], match.group('op'), match.group('value'))
+    return df[mask]
+
+
+def apply_sort(df: pd.DataFrame, sort: List[str]) -> pd.DataFrame:
+    """Sort by one or more columns ('-' prefix = descending), nulls last"""
+    if not sort:
+        return df
+
+    columns = [_resolve_column(df, s.lstrip('-')) for s in sort]
+    ascending = [not s.startswith('-') for s in sort]
+    try:
+        return df.sort_values(columns, ascending=ascending, na_position='last', kind='mergesort')
+    except TypeError:
+        # Mixed types in a column; fall back to comparing as text
+        return df.sort_values(columns, ascending=ascending, na_position='last', kind='mergesort',
+                              key=lambda s: s.astype(str).where(s.notna()))
+
+
+def distinct_values(df: pd.DataFrame, column: str, limit: int = MAX_VIEW_PAGE_SIZE) -> List[str]:
+    """Sorted distinct non-empty values of a column as display text (for filter pickers)"""
+    values = display_text(df[_resolve_column(df, column)]).dropna().unique()
+    return sorted(values)[:limit]
+
+
+def query_sheet(df: pd.DataFrame, options: Dict) -> Tuple[pd.DataFrame, int]:
+    """Apply filter, sort, projection and paging; returns (page, total matching rows)"""
+    df = apply_filter(df, options.get('filter'))
+    df = apply_sort(df, options.get('sort', []))
+
+    if options.get('columns'):
+        df = df[[_resolve_column(df, c) for c in options['columns']]]
+
+    total = len(df)
+    offset = options.get('offset') or 0
+    limit = options.get('limit')
+    end = total if limit is None else offset + limit
+    return df.iloc[offset:end], total
+
+
+def frame_to_records(df: pd.DataFrame, drop_nulls: bool = False) -> List[Dict]:
+    """
+    Convert a frame to JSON-ready records without walking cells in Python
+
+    NaN/NaT become None (or are omitted with drop_nulls). Timestamps are left as-is;
+    serialize with json.dumps(..., default=str).
+    """
+    if df.empty:
+        return []
+
+    df = df.astype(object).where(df.notna(), None)
+    records = df.to_dict('records')
+
+    if drop_nulls:
+        records = [{k: v for k, v in record.items() if v is not None} for record in records]
+        records = [record for record in records if record]
+    return records
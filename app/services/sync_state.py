@@ -0,0 +1,86 @@
+"""
+Sync State
+Per-org, per-workbook SystemModstamp high-water marks for incremental syncs
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.settings.app_config import SYNC_STATE_FILE
+
+
+class SyncStateStore:
+    """JSON-backed watermarks: {org: {workbook path: {'workbook_mtime_ns', 'objects': {name: watermark}}}}"""
+
+    def __init__(self, state_file: Path = SYNC_STATE_FILE):
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict:
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading sync state: {e}")
+            return {}
+
+    def _save(self, state: Dict) -> None:
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.state_file.with_suffix('.json.tmp')
+        with open(temp_file, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_file, self.state_file)
+
+    @staticmethod
+    def _workbook_key(workbook_path: str) -> str:
+        return os.path.abspath(workbook_path)
+
+    def get_watermarks(self, org: str, workbook_path: str) -> Dict[str, str]:
+        """
+        Watermarks usable for this workbook
+
+        Empty if the workbook has been modified since the sync that recorded them
+        (edited, replaced or restored), since its rows may no longer match.
+        """
+        with self._lock:
+            entry = self._load().get(org, {}).get(self._workbook_key(workbook_path))
+        if not entry:
+            return {}
+        try:
+            if os.stat(workbook_path).st_mtime_ns != entry.get('workbook_mtime_ns'):
+                return {}
+        except OSError:
+            return {}
+        return dict(entry.get('objects', {}))
+
+    def update(self, org: str, workbook_path: str, watermarks: Dict[str, Optional[str]]) -> None:
+        """Record new watermarks after the workbook has been saved (None clears one)"""
+        with self._lock:
+            state = self._load()
+            entry = state.setdefault(org, {}).setdefault(self._workbook_key(workbook_path), {})
+            objects = entry.setdefault('objects', {})
+            for object_name, watermark in watermarks.items():
+                if watermark:
+                    objects[object_name] = watermark
+                else:
+                    objects.pop(object_name, None)
+            entry['workbook_mtime_ns'] = os.stat(workbook_path).st_mtime_ns
+            self._save(state)
+
+    def clear(self, org: str, workbook_path: Optional[str] = None) -> None:
+        """Forget watermarks for an org (or one of its workbooks), forcing a full sync"""
+        with self._lock:
+            state = self._load()
+            if workbook_path is None:
+                state.pop(org, None)
+            else:
+                state.get(org, {}).pop(self._workbook_key(workbook_path), None)
+            self._save(state)
+
+
+# Singleton instance
+sync_state = SyncStateStore()
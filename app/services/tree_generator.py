@@ -0,0 +1,340 @@
+"""
+Tree Generator
+Streams CSV exports into Salesforce JSON tree import files, split at the tree API's
+per-file record limit, and writes the matching import plan
+"""
+import csv
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from config.settings.app_config import TREE_FILE_MAX_RECORDS, TREE_GENERATOR_WORKERS
+from app.services.load_planner import (OBJECT_REFERENCES, LoadPlan, merge_references, plan_loads,
+                                       references_from_field_configs)
+from app.services.sheet_fingerprints import combine, file_digest, fingerprint_store
+
+# Stage name for the CSVs' recorded inputs in the fingerprint store
+TREE_STAGE = 'tree'
+
+
+def clean_value(value: Optional[str]) -> Any:
+    """A CSV cell as a JSON value: booleans and numbers converted, empty cells None"""
+    if value is None or value == '':
+        return None
+    if value.lower() in ['true', 'false']:
+        return value.lower() == 'true'
+    try:
+        if '.' in value:
+            return float(value)
+        return int(value)
+    except ValueError:
+        return value.strip()
+
+
+def create_reference(ref_object: str, value: Optional[str]) -> Optional[str]:
+    """A lookup value: Salesforce Ids are kept as they are, anything else becomes an @referenceId"""
+    if not value or value.strip() == '':
+        return None
+    value = value.strip()
+    if len(value) in [15, 18] and (value.startswith('0') or value.startswith('a')):
+        return value
+    return f"@{ref_object}_{value}"
+
+
+def without_fields(objects: Dict[str, Dict], drop: Dict[str, Iterable[str]]) -> Dict[str, Dict]:
+    """Copies of object configs with the fields named per object left out"""
+    stripped = {}
+    for name, config in objects.items():
+        removed = set(drop.get(name, ()))
+        config = dict(config)
+        config['field_map'] = {f: column for f, column in config['field_map'].items() if f not in removed}
+        config['required_fields'] = [f for f in config['required_fields'] if f not in removed]
+        if config.get('reference_fields'):
+            config['reference_fields'] = {f: t for f, t in config['reference_fields'].items() if f not in removed}
+        if config.get('external_id_field') in removed:
+            del config['external_id_field']
+        stripped[name] = config
+    return stripped
+
+
+def without_custom_fields(objects: Dict[str, Dict], drop: Optional[Dict[str, Iterable[str]]] = None) -> Dict[str, Dict]:
+    """
+    Copies of object configs without custom (__c) fields
+
+    For orgs where the custom fields aren't deployed or not visible to the importing
+    user. drop names further fields to leave out per object.
+    """
+    drop = drop or {}
+    return without_fields(objects, {
+        name: {field for field in config['field_map'] if field.endswith('__c')} | set(drop.get(name, ()))
+        for name, config in objects.items()
+    })
+
+
+def tree_plan(objects: Dict[str, Dict]) -> LoadPlan:
+    """Load plan of object configs, from their reference_fields and the known lookups"""
+    return plan_loads(objects, merge_references(OBJECT_REFERENCES, references_from_field_configs(objects)))
+
+
+def deferred_updates(objects: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Update configs for the references a pass defers (see TreeGenerator defer_cycles)
+
+    One per object with deferred fields, reading the same CSV: Id plus those fields,
+    for a later pass to set once the referenced records exist.
+    """
+    updates = {}
+    for name, fields in tree_plan(objects).deferred.items():
+        config = objects[name]
+        field_map = {field: config['field_map'][field] for field in fields if field in config['field_map']}
+        if field_map:
+            updates[f"{name}_deferred"] = {
+                'sobject': config['sobject'],
+                'csv_file': config['csv_file'],
+                'field_map': {'Id': 'Id', **field_map}
+            }
+    return updates
+
+
+def read_rows(csv_path: Path) -> Iterator[Dict[str, Any]]:
+    """Non-empty CSV rows, one at a time"""
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            if any(v.strip() for v in row.values() if isinstance(v, str)):
+                yield row
+
+
+class TreeFileWriter:
+    """
+    Writes one object's records to {sobject}_{n}.json files of at most max_records each
+
+    Records are written as they arrive, so only the current record is held in memory.
+    """
+
+    def __init__(self, output_dir: Path, sobject: str, max_records: int = TREE_FILE_MAX_RECORDS):
+        self.output_dir = Path(output_dir)
+        self.sobject = sobject
+        self.max_records = max_records
+        self.files: List[Path] = []
+        self.records = 0
+        self._file = None
+        self._in_file = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._file is None or self._in_file >= self.max_records:
+            self._open_next()
+        text = json.dumps(record, indent=2).replace('\n', '\n    ')
+        self._file.write(('\n    ' if self._in_file == 0 else ',\n    ') + text)
+        self._in_file += 1
+        self.records += 1
+
+    def _open_next(self) -> None:
+        self._close_file()
+        path = self.output_dir / f"{self.sobject}_{len(self.files) + 1}.json"
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write('{\n  "records": [')
+        self._in_file = 0
+        self.files.append(path)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.write('\n  ]\n}\n')
+            self._file.close()
+            print(f"Generated {self.files[-1]} with {self._in_file} records")
+            self._file = None
+
+    def close(self) -> List[Path]:
+        self._close_file()
+        return self.files
+
+
+class TreeGenerator:
+    """
+    Generates tree import files for a set of object configs
+
+    Each config names the sobject, its csv_file, a field_map {JSON field: CSV column},
+    required_fields and optionally reference_fields {field: 'Object.ExternalIdField'}.
+    Objects are generated concurrently; the plan lists them in dependency order
+    (or `order`), with saveRefs/resolveRefs so references work across split files.
+    Records missing a required field get placeholder values when fill_missing_required
+    is set and are skipped otherwise. Objects whose CSV and config are unchanged since
+    their files were last generated are not regenerated (unless force is set).
+
+    With defer_cycles, references the load plan defers (self-references and fields that
+    close a cycle) are left out of the tree records; a later pass sets them through
+    `updates`, configs (see deferred_updates) written as {sobject}_update.csv files of
+    Id plus the fields, for a Bulk API update since tree imports only insert.
+    """
+
+    def __init__(self, objects: Dict[str, Dict], csv_dir: Union[str, Path], output_dir: Union[str, Path],
+                 plan_path: Union[str, Path], order: Optional[List[str]] = None,
+                 fill_missing_required: bool = True, max_records: int = TREE_FILE_MAX_RECORDS,
+                 max_workers: int = TREE_GENERATOR_WORKERS, force: bool = False, defer_cycles: bool = False,
+                 updates: Optional[Dict[str, Dict]] = None):
+        self.deferred = tree_plan(objects).deferred if defer_cycles else {}
+        self.objects = without_fields(objects, self.deferred) if self.deferred else objects
+        self.updates = updates or {}
+        self.csv_dir = Path(csv_dir)
+        self.output_dir = Path(output_dir)
+        self.plan_path = Path(plan_path)
+        self.order = order
+        self.fill_missing_required = fill_missing_required
+        self.max_records = max_records
+        self.max_workers = max_workers
+        self.force = force
+
+    def load_order(self) -> List[str]:
+        """Objects in import order: the given order, else from reference_fields and the known lookups"""
+        if self.order is not None:
+            return [name for name in self.order if name in self.objects]
+        return tree_plan(self.objects).order
+
+    def build_record(self, config: Dict, row: Dict[str, Any], number: int) -> Optional[Dict[str, Any]]:
+        """The tree record for a CSV row, or None if it is skipped for missing required fields"""
+        sobject = config['sobject']
+        record = {"attributes": {"type": sobject, "referenceId": f"{sobject}_Ref{number}"}}
+        reference_fields = config.get('reference_fields') or {}
+        for json_field, csv_field in config['field_map'].items():
+            value = row.get(csv_field) or ''
+            if json_field in reference_fields:
+                cleaned_value = create_reference(reference_fields[json_field].split('.')[0], value)
+            else:
+                cleaned_value = clean_value(value)
+            if cleaned_value is not None:
+                record[json_field] = cleaned_value
+
+        missing_required = [field for field in config['required_fields'] if record.get(field) is None]
+        if missing_required:
+            print(f"Warning: Record {number} in {sobject} missing required fields: {missing_required}")
+            if not self.fill_missing_required:
+                return None
+            for field in missing_required:
+                if field == 'Name':
+                    record[field] = f"Default {sobject} {number}"
+                elif field == 'Code':
+                    record[field] = f"CODE{number:03d}"
+        return record
+
+    def generate_object(self, name: str) -> Dict[str, Any]:
+        """Stream one object's CSV into its tree files"""
+        config = self.objects[name]
+        sobject = config['sobject']
+        result = {'sobject': sobject, 'files': [], 'records': 0, 'skipped': 0}
+        csv_path = self.csv_dir / config['csv_file']
+
+        fingerprints = fingerprint_store(self.csv_dir)
+        target = str(self.output_dir.resolve())
+        digest = None
+        if csv_path.exists():
+            digest = combine(file_digest(csv_path), config, self.fill_missing_required, self.max_records)
+            previous = fingerprints.consumed(TREE_STAGE, target).get(name) if not self.force else None
+            if (previous and previous['digest'] == digest
+                    and all(Path(f).exists() for f in previous['detail']['files'])):
+                print(f"Unchanged {sobject}: {len(previous['detail']['files'])} files")
+                return dict(previous['detail'], files=[Path(f) for f in previous['detail']['files']],
+                            unchanged=True)
+
+        # Files from an earlier run may have been split differently
+        pattern = re.compile(rf"{re.escape(sobject)}(_\d+)?\.json")
+        for path in self.output_dir.glob(f"{sobject}*.json"):
+            if pattern.fullmatch(path.name):
+                path.unlink()
+
+        if not csv_path.exists():
+            print(f"Warning: CSV file not found: {csv_path}")
+            return result
+
+        with TreeFileWriter(self.output_dir, sobject, self.max_records) as writer:
+            for number, row in enumerate(read_rows(csv_path), 1):
+                record = self.build_record(config, row, number)
+                if record is None:
+                    result['skipped'] += 1
+                else:
+                    writer.write(record)
+        if not writer.records:
+            print(f"Warning: No records generated from {csv_path}")
+        result['files'] = writer.files
+        result['records'] = writer.records
+        fingerprints.record_consumed(TREE_STAGE, target, name, digest,
+                                     dict(result, files=[str(path) for path in writer.files]))
+        return result
+
+    def generate_update(self, name: str) -> Dict[str, Any]:
+        """Write one update config's rows with an Id and a value to set as {sobject}_update.csv"""
+        config = self.updates[name]
+        sobject = config['sobject']
+        result = {'sobject': sobject, 'file': None, 'fields': [f for f in config['field_map'] if f != 'Id'],
+                  'records': 0}
+        csv_path = self.csv_dir / config['csv_file']
+        update_path = self.output_dir / f"{sobject}_update.csv"
+        if update_path.exists():
+            update_path.unlink()
+        if not csv_path.exists():
+            print(f"Warning: CSV file not found: {csv_path}")
+            return result
+
+        fields = list(config['field_map'])
+        columns = [config['field_map'][field] for field in fields]
+        with open(update_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(fields)
+            for row in read_rows(csv_path):
+                values = [(row.get(column) or '').strip() for column in columns]
+                if values[0] and any(values[1:]):
+                    writer.writerow(values)
+                    result['records'] += 1
+        print(f"Generated {update_path} with {result['records']} updates")
+        result['file'] = update_path
+        return result
+
+    def generate_all(self) -> Dict[str, Dict[str, Any]]:
+        """Generate every object's files, in parallel; returns the results per object in import order"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        order = self.load_order()
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix='tree') as executor:
+            results = list(executor.map(self.generate_object, order))
+        return dict(zip(order, results))
+
+    def write_plan(self, results: Dict[str, Dict[str, Any]]) -> Path:
+        """Write the import plan for generated files (paths relative to the plan, as sf expects)"""
+        plan = []
+        for result in results.values():
+            if result['files']:
+                plan.append({
+                    "sobject": result['sobject'],
+                    "saveRefs": True,
+                    "resolveRefs": True,
+                    "files": [Path(os.path.relpath(path, self.plan_path.parent)).as_posix()
+                              for path in result['files']]
+                })
+
+        self.plan_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.plan_path, 'w', encoding='utf-8') as f:
+            json.dump(plan, f, indent=2)
+        print(f"Generated import plan: {self.plan_path}")
+        return self.plan_path
+
+    def run(self) -> Dict[str, Any]:
+        """Generate all files, their import plan and the update files"""
+        results = self.generate_all()
+        plan_path = self.write_plan(results)
+        updates = {name: self.generate_update(name) for name in self.updates}
+        return {
+            'plan': str(plan_path),
+            'objects': {name: dict(result, files=[str(path) for path in result['files']])
+                        for name, result in results.items()},
+            'deferred': self.deferred,
+            'updates': {name: dict(result, file=str(result['file']) if result['file'] else None)
+                        for name, result in updates.items()},
+            'records': sum(result['records'] for result in results.values()),
+            'files': sum(len(result['files']) for result in results.values())
+        }
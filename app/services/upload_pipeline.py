@@ -0,0 +1,414 @@
+"""
+Upload Pipeline
+Workbook sheet -> field mapping and cleanup -> chunked Bulk API load -> per-record results,
+run in the background with progress events; several objects load in dependency waves
+"""
+import threading
+import time
+from datetime import date, datetime, time as dt_time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from app.services.bulk_jobs import bulk_job_manager
+from app.services.describe_cache import describe_cache
+from app.services.integrity_index import WORKBOOK_OBJECT_SHEETS
+from app.services.job_runner import Job, job_runner, progress_rate
+from app.services.load_planner import (OBJECT_REFERENCES, LoadPlan, merge_references, plan_loads,
+                                       references_from_describe, run_plan)
+from app.services.sheet_fingerprints import fingerprint_store, row_hash
+from app.services.workbook_reader import SheetTable, WorkbookReader, clean_header
+
+# Failures included in a pipeline result (the rest stay queryable in the bulk journal)
+RESULT_FAILURE_LIMIT = 100
+
+
+def format_value(value: Any, field_type: Optional[str] = None) -> str:
+    """A cell value as Bulk API CSV text"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime):
+        if field_type == 'date':
+            return value.strftime('%Y-%m-%d')
+        return value.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, dt_time):
+        return value.strftime('%H:%M:%S.000Z')
+    if isinstance(value, float) and value.is_integer() and field_type in (None, 'int', 'reference', 'string'):
+        return str(int(value))
+    if isinstance(value, str):
+        text = value.strip()
+        if field_type == 'boolean' and text.lower() in ('true', 'false', 'yes', 'no', '1', '0'):
+            return 'true' if text.lower() in ('true', 'yes', '1') else 'false'
+        return text
+    return str(value)
+
+
+class FieldMapping:
+    """Which sheet columns are loaded, and as which fields"""
+
+    def __init__(self, columns: List[Tuple[int, str, Optional[str]]], skipped: List[str]):
+        self.columns = columns  # (position in the sheet table, field name, describe type)
+        self.skipped = skipped  # headers not loaded (unknown, read-only or display-only)
+
+    @property
+    def fields(self) -> List[str]:
+        return [field for _, field, _ in self.columns]
+
+
+def map_fields(table: SheetTable, field_describes: Dict[str, Dict], operation: str) -> FieldMapping:
+    """
+    Map sheet headers to writable fields
+
+    Relationship display columns (Product2.Name), fields missing from the describe and
+    fields the operation can't write are skipped. Id is kept for update/upsert.
+    """
+    columns, skipped, seen = [], [], set()
+    for position, header in enumerate(table.headers):
+        field = clean_header(header)
+        if not field or field in seen:
+            continue
+        describe = field_describes.get(field)
+        if field == 'Id':
+            writable = operation in ('update', 'upsert', 'delete')
+        elif '.' in field or describe is None:
+            writable = False
+        elif operation == 'insert':
+            writable = bool(describe.get('createable'))
+        else:
+            writable = bool(describe.get('createable') or describe.get('updateable'))
+        if writable:
+            columns.append((position, field, describe.get('type') if describe else None))
+            seen.add(field)
+        else:
+            skipped.append(field)
+    return FieldMapping(columns, skipped)
+
+
+def build_rows(table: SheetTable, mapping: FieldMapping) -> Tuple[List[List[str]], List[int]]:
+    """Cleaned CSV values per row (rows with no mapped values dropped), with their sheet row numbers"""
+    columns = [(table.columns[position], field_type) for position, _, field_type in mapping.columns]
+    row_numbers = table.row_numbers or list(range(2, len(table) + 2))
+    rows, numbers = [], []
+    for index in range(len(table)):
+        values = [format_value(column[index], field_type) for column, field_type in columns]
+        if any(values):
+            rows.append(values)
+            numbers.append(row_numbers[index])
+    return rows, numbers
+
+
+class UploadCancelled(Exception):
+    """Raised between stages once an upload's cancel event is set"""
+
+
+class UploadPipeline:
+    """
+    Loads one object's sheet from a workbook into an org
+
+    With changed_only, rows loaded successfully before with the same values (by row
+    hash, per external id / Id, in the workbook's fingerprint store) are not sent again.
+    With deltas_only, rows are first diffed against a fresh query of the org's records
+    (see diff_engine) and only inserts and updates are sent. deferred_fields (reference
+    fields a load plan defers) are left out of the load and set afterwards by
+    load_deferred(), an update by Id of the records the load created or updated.
+    """
+
+    def __init__(self, org: str, object_name: str, workbook_path: Union[str, Path],
+                 sheet_name: Optional[str] = None, operation: Optional[str] = None,
+                 external_id_field: Optional[str] = None, changed_only: bool = False,
+                 deltas_only: bool = False, deferred_fields: Iterable[str] = (),
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None):
+        self.org = org
+        self.object_name = object_name
+        self.workbook_path = Path(workbook_path)
+        self.sheet_name = sheet_name or WORKBOOK_OBJECT_SHEETS.get(object_name, object_name)
+        self.operation = operation
+        self.external_id_field = external_id_field
+        self.changed_only = changed_only
+        self.deltas_only = deltas_only
+        self.deferred_fields = set(deferred_fields)
+        self.on_event = on_event
+        self.cancel_event = cancel_event
+        self.load_id: Optional[str] = None
+        self.deferred_columns: List[str] = []
+        self.deferred_values: Dict[int, List[str]] = {}  # sheet row number -> deferred field values
+
+    def emit(self, event_type: str, **data) -> None:
+        if self.on_event:
+            self.on_event({'type': event_type, 'object': self.object_name, 'time': time.time(), **data})
+
+    def run(self) -> Dict[str, Any]:
+        """Run every stage; returns the outcome summary (never raises)"""
+        try:
+            return self._run()
+        except UploadCancelled:
+            self.emit('stage', stage='cancelled', message="Upload cancelled")
+            return {'success': False, 'cancelled': True, 'object': self.object_name, 'error': 'Cancelled'}
+        except Exception as e:
+            self.emit('error', message=str(e))
+            return {'success': False, 'object': self.object_name, 'error': str(e)}
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise UploadCancelled()
+
+    def _run(self) -> Dict[str, Any]:
+        # 1. Read the sheet (streamed, read-only)
+        self.emit('stage', stage='read', message=f"Reading {self.sheet_name}")
+        with WorkbookReader(self.workbook_path) as reader:
+            if self.sheet_name not in reader.sheet_names:
+                raise ValueError(f"Sheet {self.sheet_name} not found in workbook")
+            table = reader.read_sheet(self.sheet_name)
+
+        # 2. Map and clean fields against the org's describe
+        self.check_cancelled()
+        self.emit('stage', stage='map', message=f"Mapping {len(table)} rows to {self.object_name} fields")
+        field_describes = describe_cache.fields(self.org, self.object_name)
+        if not field_describes:
+            raise ValueError(f"Object {self.object_name} could not be described in org {self.org}")
+        has_ids = any(table.get('Id') or [])
+        operation = self.operation or ('upsert' if self.external_id_field or has_ids else 'insert')
+        external_id_field = self.external_id_field or ('Id' if operation == 'upsert' else None)
+        mapping = map_fields(table, field_describes, operation)
+        if not mapping.columns:
+            raise ValueError(f"No loadable {self.object_name} fields in sheet {self.sheet_name}")
+        if external_id_field and external_id_field not in mapping.fields:
+            raise ValueError(f"External id field {external_id_field} not in sheet {self.sheet_name}")
+        rows, row_numbers = build_rows(table, mapping)
+        if mapping.skipped:
+            self.emit('stage', stage='map', message=f"Skipping columns: {', '.join(mapping.skipped)}")
+        # Imported here: the diff engine uses this module's field mapping
+        from app.services.diff_engine import diff_object, org_record_snapshots
+
+        unchanged = 0
+        if self.deltas_only:
+            # A fresh snapshot: the cached one may predate changes made in the org since
+            diff = diff_object(self.org, self.object_name, table,
+                               external_id_field if external_id_field != 'Id' else None, refresh=True)
+            if not diff['success']:
+                raise ValueError(diff['error'])
+            deltas = diff['diff'].delta_rows
+            keep = [i for i, number in enumerate(row_numbers) if number in deltas]
+            unchanged = len(rows) - len(keep)
+            rows = [rows[i] for i in keep]
+            row_numbers = [row_numbers[i] for i in keep]
+            self.emit('stage', stage='map', message=f"{unchanged} rows already match the org, "
+                                                    f"{len(rows)} to send")
+
+        fingerprints = row_keys = row_hashes = None
+        if self.changed_only:
+            fingerprints = fingerprint_store(self.workbook_path)
+            row_hashes = [row_hash(mapping.fields, row) for row in rows]
+            key_position = mapping.fields.index(external_id_field) if external_id_field else None
+            row_keys = [(row[key_position] if key_position is not None else '') or digest
+                        for row, digest in zip(rows, row_hashes)]
+            changed = fingerprints.changed_rows(self.org, self.object_name, row_keys, row_hashes)
+            unchanged += len(rows) - len(changed)
+            rows = [rows[i] for i in changed]
+            row_numbers = [row_numbers[i] for i in changed]
+            row_keys = [row_keys[i] for i in changed]
+            row_hashes = [row_hashes[i] for i in changed]
+            self.emit('stage', stage='map', message=f"{unchanged} rows unchanged since the last load, "
+                                                    f"{len(rows)} to send")
+
+        # Deferred references wait for the second pass
+        fields = mapping.fields
+        if self.deferred_fields & set(fields):
+            held = [i for i, field in enumerate(fields) if field in self.deferred_fields]
+            kept = [i for i, field in enumerate(fields) if field not in self.deferred_fields]
+            self.deferred_columns = [fields[i] for i in held]
+            self.deferred_values = {number: [row[i] for i in held]
+                                    for number, row in zip(row_numbers, rows) if any(row[i] for i in held)}
+            fields = [fields[i] for i in kept]
+            rows = [[row[i] for i in kept] for row in rows]
+            self.emit('stage', stage='map', message=f"Deferring {', '.join(self.deferred_columns)} "
+                                                    f"to the second pass")
+
+        # 3. Chunked Bulk API load (stops submitting chunks once cancelled)
+        self.check_cancelled()
+        self.emit('stage', stage='load', message=f"{operation.capitalize()} of {len(rows)} records",
+                  total=len(rows))
+        started = time.monotonic()
+
+        def on_progress(progress):
+            rate, eta = progress_rate(progress['processed'], progress['total'], time.monotonic() - started)
+            self.emit('progress', **progress, records_per_second=rate, eta_seconds=eta)
+
+        load = bulk_job_manager.load(
+            self.org, self.object_name, operation, fields, rows,
+            external_id_field=external_id_field, row_numbers=row_numbers, on_progress=on_progress,
+            cancel_event=self.cancel_event
+        )
+        self.load_id = load.get('load_id')
+        # Diff previews of this object must see what the load changed
+        org_record_snapshots.invalidate(self.org, self.object_name)
+
+        # 4. Per-record outcomes
+        self.emit('stage', stage='results', message="Collecting results")
+        result = {
+            'success': load['success'] and not load.get('failed'),
+            'cancelled': load.get('cancelled', False),
+            'object': self.object_name,
+            'sheet': self.sheet_name,
+            'operation': operation,
+            'external_id_field': external_id_field,
+            'load_id': load.get('load_id'),
+            'total': len(rows),
+            'processed': load.get('processed', 0),
+            'unchanged': unchanged,
+            'failed': load.get('failed', 0),
+            'skipped_columns': mapping.skipped,
+            'deferred_columns': self.deferred_columns,
+            'errors': load.get('errors') or ([load['error']] if load.get('error') else []),
+            'failures': []
+        }
+        if load.get('load_id'):
+            journal = bulk_job_manager.journal
+            result['failures'] = [
+                {'row': r['row_number'], 'error': r['error'], 'record': r['record']}
+                for r in journal.results(load_id=load['load_id'], outcome='failed', limit=RESULT_FAILURE_LIMIT)
+            ]
+            counts = journal.outcome_counts(load['load_id'])
+            result['created'] = counts.get('created', 0)
+            result['updated'] = counts.get('updated', 0)
+            if fingerprints is not None:
+                by_number = {number: i for i, number in enumerate(row_numbers)}
+                loaded = [by_number[n] for n in journal.loaded_row_numbers(load['load_id']) if n in by_number]
+                fingerprints.record_loaded(self.org, self.object_name,
+                                           [row_keys[i] for i in loaded], [row_hashes[i] for i in loaded])
+        self.emit('complete', success=result['success'], processed=result['processed'], failed=result['failed'])
+        return result
+
+    def load_deferred(self) -> Dict[str, Any]:
+        """Second pass after run(): update the deferred fields, by Id, on the records it loaded"""
+        from app.services.diff_engine import org_record_snapshots
+
+        ids = bulk_job_manager.journal.loaded_record_ids(self.load_id) if self.load_id else {}
+        numbers = [number for number in self.deferred_values if number in ids]
+        if not numbers:
+            return {'success': True, 'fields': self.deferred_columns, 'total': 0, 'processed': 0, 'failed': 0}
+
+        self.emit('stage', stage='second_pass', total=len(numbers),
+                  message=f"Setting {', '.join(self.deferred_columns)} on {len(numbers)} records")
+        load = bulk_job_manager.load(
+            self.org, self.object_name, 'update', ['Id'] + self.deferred_columns,
+            [[ids[number]] + self.deferred_values[number] for number in numbers],
+            row_numbers=numbers, cancel_event=self.cancel_event
+        )
+        org_record_snapshots.invalidate(self.org, self.object_name)
+        result = {
+            'success': load['success'] and not load.get('failed'),
+            'fields': self.deferred_columns,
+            'load_id': load.get('load_id'),
+            'total': len(numbers),
+            'processed': load.get('processed', 0),
+            'failed': load.get('failed', 0),
+            'errors': load.get('errors') or ([load['error']] if load.get('error') else [])
+        }
+        if load.get('load_id'):
+            result['failures'] = [
+                {'row': r['row_number'], 'error': r['error'], 'record': r['record']}
+                for r in bulk_job_manager.journal.results(load_id=load['load_id'], outcome='failed',
+                                                          limit=RESULT_FAILURE_LIMIT)
+            ]
+        self.emit('complete', stage='second_pass', success=result['success'], processed=result['processed'],
+                  failed=result['failed'])
+        return result
+
+
+def start_upload(org: str, object_name: str, workbook_path: Union[str, Path], **options) -> Tuple[Job, bool]:
+    """
+    Run an upload pipeline as a background job; returns (job, created)
+
+    An identical upload that is still queued or running is returned instead of a new one.
+    """
+    key = ('upload', org, object_name, str(Path(workbook_path).resolve()), tuple(sorted(options.items())))
+
+    def run(job: Job) -> Dict[str, Any]:
+        return UploadPipeline(org, object_name, workbook_path, on_event=job.add_event,
+                              cancel_event=job.cancel_event, **options).run()
+
+    return job_runner.submit('upload', run, key=key, label=f"Upload {object_name} to {org}")
+
+
+class PlanUpload:
+    """
+    Loads several objects' sheets in dependency waves (see load_planner)
+
+    The objects of a wave load concurrently, each through an UploadPipeline with the
+    plan's deferred references held back; objects depending on a failed one are
+    skipped. Once every wave has loaded, the deferred references are set by Id.
+    """
+
+    def __init__(self, org: str, objects: Iterable[str], workbook_path: Union[str, Path],
+                 references: Optional[Dict[str, Dict[str, str]]] = None,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None, **options):
+        self.org = org
+        self.objects = list(dict.fromkeys(objects))
+        self.workbook_path = Path(workbook_path)
+        self.references = references
+        self.on_event = on_event
+        self.cancel_event = cancel_event
+        self.options = options
+        self.pipelines: Dict[str, UploadPipeline] = {}
+
+    def emit(self, event_type: str, **data) -> None:
+        if self.on_event:
+            self.on_event({'type': event_type, 'time': time.time(), **data})
+
+    def plan(self) -> LoadPlan:
+        """Waves from the known lookups plus the org's describe of the objects"""
+        references = self.references
+        if references is None:
+            references = merge_references(OBJECT_REFERENCES, references_from_describe(self.org, self.objects))
+        return plan_loads(self.objects, references)
+
+    def load(self, object_name: str, deferred_fields: List[str]) -> Dict[str, Any]:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return {'success': False, 'cancelled': True, 'object': object_name, 'error': 'Cancelled'}
+        pipeline = UploadPipeline(self.org, object_name, self.workbook_path, deferred_fields=deferred_fields,
+                                  on_event=self.on_event, cancel_event=self.cancel_event, **self.options)
+        self.pipelines[object_name] = pipeline
+        return pipeline.run()
+
+    def second_pass(self, object_name: str, deferred: Dict[str, str]) -> Dict[str, Any]:
+        return self.pipelines[object_name].load_deferred()
+
+    def run(self) -> Dict[str, Any]:
+        plan = self.plan()
+        self.emit('plan', **plan.to_dict())
+        completed = {'objects': 0, 'records': 0}
+
+        def on_result(object_name, result):
+            completed['objects'] += 1
+            completed['records'] += result.get('processed', 0)
+            self.emit('progress', object=object_name, success=result.get('success'),
+                      completed=completed['objects'], total=len(plan.order), records=completed['records'])
+
+        results = run_plan(plan, self.load, self.second_pass, on_result=on_result)
+        return {
+            'success': all(result.get('success') and result.get('second_pass', {}).get('success', True)
+                           for result in results.values()),
+            'cancelled': self.cancel_event is not None and self.cancel_event.is_set(),
+            'plan': plan.to_dict(),
+            'objects': results
+        }
+
+
+def start_plan_upload(org: str, objects: Iterable[str], workbook_path: Union[str, Path],
+                      **options) -> Tuple[Job, bool]:
+    """Run a multi-object PlanUpload as a background job; returns (job, created)"""
+    objects = list(dict.fromkeys(objects))
+    key = ('upload_plan', org, tuple(sorted(objects)), str(Path(workbook_path).resolve()),
+           tuple(sorted(options.items())))
+
+    def run(job: Job) -> Dict[str, Any]:
+        return PlanUpload(org, objects, workbook_path, on_event=job.add_event,
+                          cancel_event=job.cancel_event, **options).run()
+
+    return job_runner.submit('upload', run, key=key, label=f"Upload {len(objects)} objects to {org}")
@@ -0,0 +1,173 @@
+"""
+Workbook Cache
+Keeps parsed workbook sheets in memory so repeat views don't re-read the .xlsx
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config.settings.app_config import WORKBOOK_CACHE_MAX_MB, WORKBOOK_CACHE_MAX_SHEETS
+from app.services.workbook_reader import WorkbookReader
+
+
+class WorkbookCache:
+    """LRU cache of parsed sheets keyed by workbook path plus mtime/size
+
+    A workbook rewritten on disk (sync, upload, manual edit) gets a new
+    mtime/size signature, so its stale sheets are dropped on the next lookup.
+    """
+
+    def __init__(self, max_bytes: int, max_sheets: int):
+        self.max_bytes = max_bytes
+        self.max_sheets = max_sheets
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # (path, sheet_name) -> (signature, dataframe, size in bytes)
+        self._sheets = OrderedDict()
+        # path -> (signature, sheet names)
+        self._sheet_names = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _signature(workbook_path: str) -> Tuple[int, int]:
+        """Return the (mtime_ns, size) pair identifying a version of the file"""
+        stat = os.stat(workbook_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _drop_stale(self, path: str, signature: Tuple[int, int]) -> None:
+        """Evict every entry for path that was parsed from another version"""
+        cached = self._sheet_names.get(path)
+        if cached and cached[0] != signature:
+            del self._sheet_names[path]
+        for key in [k for k, v in self._sheets.items() if k[0] == path and v[0] != signature]:
+            self._evict(key)
+
+    def _evict(self, key: Tuple[str, str]) -> None:
+        _, _, nbytes = self._sheets.pop(key)
+        self.current_bytes -= nbytes
+
+    def _store(self, key: Tuple[str, str], signature: Tuple[int, int], df: pd.DataFrame) -> None:
+        """Insert a parsed sheet and evict least recently used ones over the ceiling"""
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            # Larger than the whole cache; serve it uncached
+            return
+
+        if key in self._sheets:
+            self._evict(key)
+        self._sheets[key] = (signature, df, nbytes)
+        self.current_bytes += nbytes
+
+        while self._sheets and (self.current_bytes > self.max_bytes or
+                                len(self._sheets) > self.max_sheets):
+            self._evict(next(iter(self._sheets)))
+
+    def get_sheet_names(self, workbook_path: str) -> List[str]:
+        """Get the sheet names of a workbook"""
+        path = os.path.abspath(workbook_path)
+        with self._lock:
+            signature = self._signature(path)
+            self._drop_stale(path, signature)
+            cached = self._sheet_names.get(path)
+            if cached:
+                return list(cached[1])
+
+        with WorkbookReader(path) as reader:
+            names = reader.sheet_names
+
+        with self._lock:
+            self._sheet_names[path] = (signature, names)
+        return list(names)
+
+    def get_sheets(self, workbook_path: str, sheet_names: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Get several parsed sheets, opening the workbook at most once for the misses
+
+        Sheets that don't exist in the workbook are left out of the result.
+        The returned frames share data with the cache and must be treated as read-only.
+        """
+        path = os.path.abspath(workbook_path)
+        result = {}
+        missing = []
+
+        with self._lock:
+            signature = self._signature(path)
+            self._drop_stale(path, signature)
+            known = self._sheet_names.get(path)
+            for sheet_name in sheet_names:
+                if known and sheet_name not in known[1]:
+                    continue
+                entry = self._sheets.get((path, sheet_name))
+                if entry:
+                    self._sheets.move_to_end((path, sheet_name))
+                    self.hits += 1
+                    result[sheet_name] = entry[1].copy(deep=False)
+                else:
+                    missing.append(sheet_name)
+
+        if not missing:
+            return result
+
+        # Parse outside the lock so other readers aren't blocked by a slow workbook
+        parsed = {}
+        with WorkbookReader(path) as reader:
+            available = reader.sheet_names
+            for sheet_name in missing:
+                if sheet_name in available:
+                    parsed[sheet_name] = reader.read_sheet(sheet_name).to_dataframe()
+
+        with self._lock:
+            self.misses += len(missing)
+            # Only cache if the file didn't change while we were reading it
+            if self._signature(path) == signature:
+                self._sheet_names[path] = (signature, available)
+                for sheet_name, df in parsed.items():
+                    self._store((path, sheet_name), signature, df)
+
+        for sheet_name, df in parsed.items():
+            result[sheet_name] = df.copy(deep=False)
+        return result
+
+    def get_sheet(self, workbook_path: str, sheet_name: str) -> pd.DataFrame:
+        """
+        Get a single parsed sheet
+
+        Raises ValueError if the sheet doesn't exist.
+        """
+        sheets = self.get_sheets(workbook_path, [sheet_name])
+        if sheet_name not in sheets:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return sheets[sheet_name]
+
+    def invalidate(self, workbook_path: Optional[str] = None) -> None:
+        """Drop cached sheets for one workbook, or everything if no path is given"""
+        with self._lock:
+            if workbook_path is None:
+                self._sheets.clear()
+                self._sheet_names.clear()
+                self.current_bytes = 0
+                return
+
+            path = os.path.abspath(workbook_path)
+            self._sheet_names.pop(path, None)
+            for key in [k for k in self._sheets if k[0] == path]:
+                self._evict(key)
+
+    def get_stats(self) -> Dict:
+        """Get cache usage statistics"""
+        with self._lock:
+            return {
+                'sheets': len(self._sheets),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Singleton instance
+workbook_cache = WorkbookCache(WORKBOOK_CACHE_MAX_MB * 1024 * 1024, WORKBOOK_CACHE_MAX_SHEETS)
@@ -0,0 +1,176 @@
+"""
+Workbook Exporter
+Exports workbook sheets to CSV (optionally Parquet / Arrow) in one read-only pass, split into
+pass1 / pass2 column sets, skipping sheets whose fingerprint is unchanged since the last export
+"""
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from config.settings.app_config import EXPORT_WORKERS
+from app.services.integrity_index import WORKBOOK_OBJECT_SHEETS
+from app.services.sheet_fingerprints import combine, fingerprint_store
+from app.services.workbook_reader import SheetTable, WorkbookReader
+
+# Stage name for the sheets' recorded inputs in the fingerprint store
+EXPORT_STAGE = 'export'
+
+# Output formats besides CSV (file suffix per format)
+EXPORT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Generated external ids per object: (column, prefix), filled in where the column is empty
+GENERATED_EXTERNAL_IDS = {
+    'Product2': ('ProductCode__c', 'PROD'),
+    'ProductCategory': ('CategoryCode__c', 'CAT'),
+    'ProductCatalog': ('CatalogCode__c', 'CATALOG'),
+    'AttributeDefinition': ('AttributeCode__c', 'ATTR'),
+    'ProductSellingModel': ('ModelCode__c', 'MODEL')
+}
+
+
+def is_pass2_column(header: str) -> bool:
+    """Relationship columns (Parent__r.Code__c) need the records loaded by pass1"""
+    return '__r.' in header
+
+
+def fill_external_ids(table: SheetTable, column: str, prefix: str) -> int:
+    """Fill empty cells of an external-id column (added if missing) with PREFIX001...; returns the count"""
+    if column not in table:
+        table.add_column(column, [None] * len(table))
+    values = table.column(column)
+    empty = [i for i, value in enumerate(values) if value is None or str(value).strip() == '']
+    for i in empty:
+        values[i] = f"{prefix}{i + 1:03d}"
+    return len(empty)
+
+
+def _arrow_column(values: List[Any]):
+    """An Arrow array for a column; mixed-type columns are written as text"""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+class WorkbookExporter:
+    """
+    Exports every sheet of a workbook
+
+    The workbook is read once, sheet after sheet; each sheet's files are written on a
+    thread pool while the next sheet is read. With split_passes, pass1/<sheet> holds
+    the columns without relationship references and pass2/<sheet> all columns;
+    otherwise <sheet> holds all columns. A sheet is skipped when its fingerprint and
+    the export options match what the last export of it recorded and its files exist.
+    """
+
+    def __init__(self, workbook_path: Union[str, Path], output_dir: Union[str, Path],
+                 split_passes: bool = True, formats: Sequence[str] = ('csv',),
+                 external_ids: bool = False, max_workers: int = EXPORT_WORKERS):
+        unknown = [f for f in formats if f not in EXPORT_FORMATS]
+        if unknown:
+            raise ValueError(f"Unknown export format(s): {', '.join(unknown)}")
+        if pa is None and any(f != 'csv' for f in formats):
+            raise ValueError("Parquet / Arrow export requires pyarrow (pip install pyarrow)")
+        self.workbook_path = Path(workbook_path)
+        self.output_dir = Path(output_dir)
+        self.split_passes = split_passes
+        self.formats = list(dict.fromkeys(formats))
+        self.external_ids = external_ids
+        self.max_workers = max_workers
+        self.fingerprints = fingerprint_store(self.workbook_path)
+        self._sheet_objects = {sheet: name for name, sheet in WORKBOOK_OBJECT_SHEETS.items()}
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        return {'split_passes': self.split_passes, 'formats': self.formats, 'external_ids': self.external_ids}
+
+    def _targets(self, table: SheetTable) -> Dict[str, List[int]]:
+        """Output path stem -> column positions"""
+        if not self.split_passes:
+            return {table.name: list(range(len(table.headers)))}
+        pass1 = [i for i, header in enumerate(table.headers) if not is_pass2_column(header)]
+        return {f"pass1/{table.name}": pass1, f"pass2/{table.name}": list(range(len(table.headers)))}
+
+    def _write_sheet(self, table: SheetTable) -> List[str]:
+        """Write one sheet's files; returns their paths relative to the output directory"""
+        written = []
+        for stem, positions in self._targets(table).items():
+            headers = [table.headers[p] for p in positions]
+            columns = [table.columns[p] for p in positions]
+            for fmt in self.formats:
+                path = self.output_dir / f"{stem}{EXPORT_FORMATS[fmt]}"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if fmt == 'csv':
+                    with open(path, 'w', encoding='utf-8', newline='') as f:
+                        writer = csv.writer(f)
+                        writer.writerow(headers)
+                        writer.writerows(zip(*columns))
+                else:
+                    arrow_table = pa.table({h: _arrow_column(c) for h, c in zip(headers, columns)})
+                    if fmt == 'parquet':
+                        pq.write_table(arrow_table, path)
+                    else:
+                        feather.write_feather(arrow_table, path)
+                written.append(path.relative_to(self.output_dir).as_posix())
+        return written
+
+    def export(self, sheet_names: Optional[Iterable[str]] = None, force: bool = False) -> Dict[str, Any]:
+        """Export sheets (all by default); force rewrites unchanged sheets too"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        target = str(self.output_dir.resolve())
+        consumed = {} if force else self.fingerprints.consumed(EXPORT_STAGE, target)
+        exported, unchanged, pending = [], [], {}
+
+        def is_unchanged(name, root):
+            entry = consumed.get(name)
+            return (entry is not None and entry['digest'] == combine(root, self.options)
+                    and all((self.output_dir / f).exists() for f in entry['detail'] or []))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix='export') as executor:
+            with WorkbookReader(self.workbook_path) as reader:
+                names = reader.sheet_names if sheet_names is None else [
+                    n for n in sheet_names if n in reader.sheet_names]
+                for name in names:
+                    # A fingerprint cached for this version of the workbook avoids reading the sheet
+                    cached = self.fingerprints.cached(name)
+                    if cached is not None and is_unchanged(name, cached.root):
+                        unchanged.append(name)
+                        continue
+                    table = reader.read_sheet(name)
+                    root = self.fingerprints.fingerprint(table).root
+                    if is_unchanged(name, root):
+                        unchanged.append(name)
+                        continue
+                    object_name = self._sheet_objects.get(name)
+                    if self.external_ids and object_name in GENERATED_EXTERNAL_IDS:
+                        fill_external_ids(table, *GENERATED_EXTERNAL_IDS[object_name])
+                    pending[name] = (root, len(table), executor.submit(self._write_sheet, table))
+
+            # Failed sheets are not recorded, so the next export retries them
+            errors = {}
+            for name, (root, rows, future) in pending.items():
+                try:
+                    files = future.result()
+                except Exception as e:
+                    errors[name] = str(e)
+                    print(f"  ⚠️  {name} export failed: {e}")
+                    continue
+                self.fingerprints.record_consumed(EXPORT_STAGE, target, name, combine(root, self.options), files)
+                exported.append(name)
+                print(f"Exported {name} ({rows} rows)")
+
+        return {
+            'success': not errors,
+            'output_dir': str(self.output_dir),
+            'exported': exported,
+            'unchanged': unchanged,
+            'errors': errors
+        }
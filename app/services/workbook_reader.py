@@ -0,0 +1,208 @@
+"""
+Workbook Reader
+Read-only, streaming access to workbook sheets as column-oriented tables
+"""
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from openpyxl import load_workbook
+
+
+def clean_header(header: Any) -> str:
+    """Header text without the '*' required-field markers"""
+    return str(header).replace('*', '').strip() if header is not None else ''
+
+
+def _unique_headers(raw_headers: Sequence[Any]) -> List[str]:
+    """Header names the way pandas.read_excel makes them: 'Unnamed: n' for blanks, '.1' suffixes for repeats"""
+    headers, seen = [], {}
+    for index, header in enumerate(raw_headers):
+        name = f'Unnamed: {index}' if header is None or header == '' else str(header)
+        if name in seen:
+            seen[name] += 1
+            candidate = f'{name}.{seen[name]}'
+            while candidate in seen:
+                seen[name] += 1
+                candidate = f'{name}.{seen[name]}'
+            seen[candidate] = 0
+            name = candidate
+        else:
+            seen[name] = 0
+        headers.append(name)
+    return headers
+
+
+def _value_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, (datetime, date, time)):
+        return 'datetime'
+    return 'str'
+
+
+class SheetTable:
+    """
+    One sheet as columns: headers plus one list of cell values per column
+
+    Values are the raw cell values (None for empty cells); rows that were entirely
+    empty are not included, so row_numbers holds each row's 1-based sheet row.
+    """
+
+    def __init__(self, name: str, headers: List[str], columns: List[List[Any]],
+                 row_numbers: Optional[List[int]] = None):
+        self.name = name
+        self.headers = headers
+        self.columns = columns
+        self.row_numbers = row_numbers
+        self._index = {header: i for i, header in enumerate(headers)}
+        for i, header in enumerate(headers):
+            self._index.setdefault(clean_header(header), i)
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def __contains__(self, header: str) -> bool:
+        return header in self._index
+
+    def column(self, header: str) -> List[Any]:
+        """Values of a column, by header (with or without '*' markers)"""
+        if header not in self._index:
+            raise KeyError(f"Column '{header}' not in sheet {self.name}")
+        return self.columns[self._index[header]]
+
+    def get(self, header: str, default: Optional[List[Any]] = None) -> Optional[List[Any]]:
+        return self.column(header) if header in self._index else default
+
+    def add_column(self, header: str, values: List[Any]) -> None:
+        """Append a column (one value per row)"""
+        self.headers.append(header)
+        self.columns.append(values)
+        self._index.setdefault(header, len(self.headers) - 1)
+        self._index.setdefault(clean_header(header), len(self.headers) - 1)
+
+    def column_type(self, header: str) -> str:
+        """'empty', 'bool', 'int', 'float', 'datetime', 'str', or 'mixed'"""
+        types = {_value_type(v) for v in self.column(header) if v is not None}
+        if not types:
+            return 'empty'
+        if types == {'int', 'float'}:
+            return 'float'
+        return types.pop() if len(types) == 1 else 'mixed'
+
+    @property
+    def clean_headers(self) -> List[str]:
+        return [clean_header(h) for h in self.headers]
+
+    def rows(self) -> Iterator[Tuple[Any, ...]]:
+        """Row tuples in header order"""
+        return zip(*self.columns)
+
+    def records(self, drop_nulls: bool = False, clean: bool = False) -> List[Dict[str, Any]]:
+        """Rows as dicts (keys optionally without '*' markers; empty cells optionally omitted)"""
+        headers = self.clean_headers if clean else self.headers
+        if drop_nulls:
+            return [{h: v for h, v in zip(headers, row) if v is not None} for row in self.rows()]
+        return [dict(zip(headers, row)) for row in self.rows()]
+
+    def to_dataframe(self):
+        """Build a pandas DataFrame straight from the columns"""
+        import pandas as pd
+
+        return pd.DataFrame({h: c for h, c in zip(self.headers, self.columns)}, columns=self.headers)
+
+
+class WorkbookReader:
+    """Read-only workbook handle; sheets are streamed row by row, never loaded as cell objects"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.wb = load_workbook(self.path, read_only=True, data_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.wb.close()
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self.wb.sheetnames)
+
+    def _worksheet(self, sheet_name: str):
+        if sheet_name not in self.wb.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return self.wb[sheet_name]
+
+    def headers(self, sheet_name: str) -> List[Any]:
+        """Raw header row values"""
+        return list(next(self._worksheet(sheet_name).iter_rows(max_row=1, values_only=True), ()))
+
+    def iter_rows(self, sheet_name: str, skip_blank: bool = True) -> Iterator[Tuple[Any, ...]]:
+        """Data rows (after the header) as value tuples padded to the header width"""
+        for _, row in self.iter_numbered_rows(sheet_name, skip_blank):
+            yield row
+
+    def iter_numbered_rows(self, sheet_name: str, skip_blank: bool = True) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+        """(1-based sheet row number, values) for each data row"""
+        rows = self._worksheet(sheet_name).iter_rows(values_only=True)
+        width = len(next(rows, ()))
+        for row_number, row in enumerate(rows, 2):
+            if skip_blank and all(v is None for v in row):
+                continue
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            yield row_number, (row[:width] if len(row) > width else row)
+
+    def read_sheet(self, sheet_name: str, columns: Optional[Sequence[str]] = None,
+                   max_rows: Optional[int] = None) -> SheetTable:
+        """
+        Read a sheet into a SheetTable
+
+        columns limits the result to those headers (matched with or without '*'
+        markers); max_rows stops after that many data rows.
+        """
+        raw_headers = self.headers(sheet_name)
+        headers = _unique_headers(raw_headers)
+
+        if columns is not None:
+            lookup = {}
+            for i, header in enumerate(headers):
+                lookup.setdefault(header, i)
+                lookup.setdefault(clean_header(header), i)
+            positions = [lookup[c] for c in columns if c in lookup]
+        else:
+            positions = list(range(len(headers)))
+
+        data: List[List[Any]] = [[] for _ in positions]
+        appenders = [column.append for column in data]
+        row_numbers: List[int] = []
+        for count, (row_number, row) in enumerate(self.iter_numbered_rows(sheet_name)):
+            if max_rows is not None and count >= max_rows:
+                break
+            row_numbers.append(row_number)
+            for append, position in zip(appenders, positions):
+                append(row[position])
+
+        return SheetTable(sheet_name, [headers[p] for p in positions], data, row_numbers)
+
+
+def read_sheet(path: Union[str, Path], sheet_name: str, columns: Optional[Sequence[str]] = None,
+               max_rows: Optional[int] = None) -> SheetTable:
+    """Read one sheet of a workbook"""
+    with WorkbookReader(path) as reader:
+        return reader.read_sheet(sheet_name, columns=columns, max_rows=max_rows)
+
+
+def read_sheets(path: Union[str, Path], sheet_names: Optional[Sequence[str]] = None) -> Dict[str, SheetTable]:
+    """Read several sheets (all by default) in one pass over the file; missing names are skipped"""
+    with WorkbookReader(path) as reader:
+        names = reader.sheet_names if sheet_names is None else [n for n in sheet_names if n in reader.sheet_names]
+        return {name: reader.read_sheet(name) for name in names}
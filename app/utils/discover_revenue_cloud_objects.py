@@ -5,8 +5,15 @@ Discover which Revenue Cloud objects are available in the Salesforce org
 
 import subprocess
 import json
+import os
 import sys
 
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.services.salesforce_client import get_client, SalesforceApiError
+from app.services.describe_cache import describe_cache
+
 # List of potential Revenue Cloud objects to check
 REVENUE_CLOUD_OBJECTS = [
     'ProductCatalog',
@@ -46,33 +53,23 @@ REVENUE_CLOUD_OBJECTS = [
 
 def check_object_exists(org, object_name):
     """Check if an object exists and get its field information"""
-    cmd = [
-        'sf', 'sobject', 'describe',
-        '--sobject', object_name,
-        '--target-org', org,
-        '--json'
-    ]
-    
-    try:
-        with open('/dev/null', 'w') as devnull:
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=devnull, text=True)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
-            if data.get('status') == 0:
-                fields = data.get('result', {}).get('fields', [])
-                field_names = [f['name'] for f in fields if f.get('name')]
-                return True, field_names
-    except:
-        pass
-    
-    return False, []
+    field_names = describe_cache.field_names(org, object_name)
+    return bool(field_names), field_names
 
 def get_sample_data(org, object_name, fields):
     """Get sample data to verify object accessibility"""
     field_list = ', '.join(fields[:5])  # Get first 5 fields
     query = f"SELECT {field_list} FROM {object_name} LIMIT 1"
     
+    client = get_client(org)
+    if client:
+        try:
+            result = client.request('GET', 'query', params={'q': query})
+            return True, result.get('totalSize', 0)
+        except SalesforceApiError as e:
+            if e.status_code == 400:
+                return False, 0
+    
     cmd = [
         'sf', 'data', 'query',
         '--query', query,
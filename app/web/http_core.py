@@ -0,0 +1,122 @@
+"""
+HTTP Server Core
+Thread-pooled HTTP server shared by the web entry points (server.py and main.py)
+"""
+import json
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer
+
+from config.settings.app_config import WEB_MAX_WORKERS, WEB_MAX_QUEUED, BLOCKING_MAX_WORKERS
+
+# Separate pool for heavy blocking work (pandas parsing, CLI subprocesses) so only a
+# bounded number of those run at once, whatever the number of request workers
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_MAX_WORKERS, thread_name_prefix='blocking')
+
+# Set once the server starts shutting down; long-lived responses (event streams) end on it
+shutdown_event = threading.Event()
+
+
+def run_blocking(func, *args, timeout=None, **kwargs):
+    """Run a blocking call on the blocking pool and wait for its result"""
+    return blocking_executor.submit(func, *args, **kwargs).result(timeout=timeout)
+
+
+def send_event_stream(handler, events):
+    """
+    Answer a request with a Server-Sent Events stream
+
+    events yields (id, event name, data) tuples, or None to send a keep-alive comment.
+    Returns when the iterator ends or the client disconnects. The stream holds one
+    request worker for its duration.
+    """
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'text/event-stream')
+    handler.send_header('Cache-Control', 'no-cache')
+    handler.send_header('Connection', 'close')
+    handler.end_headers()
+    try:
+        for item in events:
+            if item is None:
+                handler.wfile.write(b': keep-alive\n\n')
+            else:
+                event_id, name, data = item
+                message = f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+                handler.wfile.write(message.encode('utf-8'))
+            handler.wfile.flush()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    finally:
+        handler.close_connection = True
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that handles requests on a bounded worker pool"""
+
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler_class, max_workers=WEB_MAX_WORKERS, max_queued=WEB_MAX_QUEUED):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http')
+        # Running + queued requests; when full, the accept loop waits and new
+        # connections back up in the listen backlog instead of piling up in memory
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    def process_request(self, request, client_address):
+        """Hand the request to the worker pool"""
+        self._slots.acquire()
+        try:
+            self.executor.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # Pool already shut down
+            self._slots.release()
+            self.shutdown_request(request)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        """Stop listening and wait for in-flight requests to finish"""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def serve(handler_class, host, port, on_start=None, on_shutdown=None):
+    """
+    Run a pooled server until Ctrl+C or SIGTERM, then shut down gracefully
+
+    In-flight requests are allowed to finish; queued blocking work is cancelled.
+    shutdown_event is set and on_shutdown called first, so event streams and the
+    background work they follow can stop instead of holding up the shutdown.
+    """
+    server = PooledHTTPServer((host, port), handler_class)
+
+    def request_shutdown(signum=None, frame=None):
+        # shutdown() waits for serve_forever to exit, so it can't run on the serving thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, request_shutdown)
+
+    if on_start:
+        on_start(server)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n\nShutting down server...")
+    finally:
+        shutdown_event.set()
+        if on_shutdown:
+            on_shutdown()
+        server.server_close()
+        blocking_executor.shutdown(wait=False, cancel_futures=True)
+
+    return server
@@ -5,11 +5,11 @@ Provides separate paths for new implementations and ongoing data management.
 """
 
 import http.server
-import socketserver
 import subprocess
 import json
 import threading
 import os
+import sys
 from urllib.parse import urlparse, parse_qs
 from pathlib import Path
 
@@ -18,6 +18,9 @@ org = "fortradp2"
 
 # Get the project root directory (2 levels up from web-ui)
 PROJECT_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.web.http_core import serve, run_blocking, send_event_stream, shutdown_event
 workbook = str(PROJECT_ROOT / "data/templates/master/Revenue_Cloud_Complete_Upload_Template.xlsx")
 
 # HTML content for main page
@@ -1059,7 +1062,7 @@ DATA_MANAGEMENT_HTML = """
         }
         
         let syncSessionId = null;
-        let progressPollInterval = null;
+        let syncEvents = null;
         
         function syncAll() {
             if (!confirm('This will sync all objects from Salesforce to your local workbook. A backup will be created. Continue?')) {
@@ -1095,30 +1098,48 @@ DATA_MANAGEMENT_HTML = """
             });
         }
         
+        function formatEta(seconds) {
+            if (seconds === null || seconds === undefined) {
+                return '';
+            }
+            const minutes = Math.floor(seconds / 60);
+            return minutes > 0 ? `${minutes}m ${Math.round(seconds % 60)}s` : `${Math.round(seconds)}s`;
+        }
+        
+        function finishSync(data) {
+            hideSyncProgress();
+            
+            const result = data.result;
+            if (data.status === 'cancelled') {
+                alert('Sync cancelled. The workbook was not changed.');
+            } else if (!result) {
+                alert('Sync failed: ' + (data.error || data.message || 'Unknown error'));
+            } else if (result.success) {
+                alert(`Sync completed successfully!\\n\\nSynced: ${result.success_count} objects\\nTotal records: ${result.total_records}\\nBackup saved: ${result.backup_path}`);
+                location.reload();
+            } else {
+                alert(`Sync completed with errors:\\n\\nSuccessful: ${result.success_count}\\nErrors: ${result.error_count}\\nTotal records: ${result.total_records}`);
+            }
+        }
+        
         function pollSyncProgress() {
-            progressPollInterval = setInterval(() => {
-                fetch(`/api/sync/progress/${syncSessionId}`)
-                    .then(response => response.json())
-                    .then(data => {
-                        updateSyncProgress(data);
-                        
-                        if (data.status === 'completed') {
-                            clearInterval(progressPollInterval);
-                            hideSyncProgress();
-                            
-                            const result = data.result;
-                            if (result.success) {
-                                alert(`Sync completed successfully!\\n\\nSynced: ${result.success_count} objects\\nTotal records: ${result.total_records}\\nBackup saved: ${result.backup_path}`);
-                                location.reload();
-                            } else {
-                                alert(`Sync completed with errors:\\n\\nSuccessful: ${result.success_count}\\nErrors: ${result.error_count}\\nTotal records: ${result.total_records}`);
-                            }
-                        }
-                    })
-                    .catch(error => {
-                        console.error('Error polling progress:', error);
-                    });
-            }, 1000); // Poll every second
+            // Progress is pushed over Server-Sent Events; the browser reconnects on its own
+            // and resumes after the last event it saw
+            syncEvents = new EventSource(`/api/jobs/${syncSessionId}/events`);
+            syncEvents.addEventListener('progress', event => {
+                updateSyncProgress(JSON.parse(event.data));
+            });
+            syncEvents.addEventListener('end', event => {
+                syncEvents.close();
+                syncEvents = null;
+                finishSync(JSON.parse(event.data));
+            });
+            syncEvents.onerror = () => {
+                if (syncEvents && syncEvents.readyState === EventSource.CLOSED) {
+                    syncEvents = null;
+                    finishSync({status: 'failed', error: 'Lost connection to the sync job'});
+                }
+            };
         }
         
         function updateSyncProgress(data) {
@@ -1140,7 +1161,14 @@ DATA_MANAGEMENT_HTML = """
             }
             
             if (objectListEl && data.completed !== undefined && data.total) {
-                objectListEl.textContent = `Progress: ${data.completed} of ${data.total} objects`;
+                let text = `Progress: ${data.completed} of ${data.total} objects`;
+                if (data.records_per_second) {
+                    text += ` · ${data.records_per_second} records/sec`;
+                }
+                if (data.eta_seconds) {
+                    text += ` · about ${formatEta(data.eta_seconds)} left`;
+                }
+                objectListEl.textContent = text;
             }
         }
         
@@ -1162,6 +1190,7 @@ DATA_MANAGEMENT_HTML = """
                     <p id="sync-status" style="font-size:1.1em;margin:10px 0">Initializing sync...</p>
                     <p id="sync-current-object" style="font-weight:bold;color:#3498db;margin:10px 0"></p>
                     <p id="sync-object-list" style="font-size:0.9em;margin:10px 0"></p>
+                    <button onclick="cancelSync()" style="margin-top:10px;padding:8px 16px;border:1px solid #e74c3c;background:white;color:#e74c3c;border-radius:5px;cursor:pointer">Cancel Sync</button>
                 </div>
                 <div style="margin-top:30px;padding-top:20px;border-top:1px solid #e0e0e0">
                     <h4 style="margin:10px 0">Objects to Sync:</h4>
@@ -1182,10 +1211,24 @@ DATA_MANAGEMENT_HTML = """
             document.body.appendChild(overlay);
         }
         
+        function cancelSync() {
+            if (!syncSessionId) {
+                return;
+            }
+            fetch(`/api/jobs/${syncSessionId}/cancel`, {method: 'POST'})
+                .then(response => response.json())
+                .then(data => {
+                    const statusText = document.getElementById('sync-status');
+                    if (statusText && data.success) {
+                        statusText.textContent = 'Cancelling...';
+                    }
+                });
+        }
+        
         function hideSyncProgress() {
-            if (progressPollInterval) {
-                clearInterval(progressPollInterval);
-                progressPollInterval = null;
+            if (syncEvents) {
+                syncEvents.close();
+                syncEvents = null;
             }
             
             const overlay = document.getElementById('sync-overlay');
@@ -2135,9 +2178,7 @@ OBJECT_EDITOR_HTML = """
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
-                    showStatus('Upload completed successfully!', 'success');
-                    progressFill.style.width = '100%';
-                    progressText.textContent = '100% Complete';
+                    streamUpload(data.upload_id);
                 } else {
                     showStatus('Upload failed: ' + data.error, 'error');
                 }
@@ -2145,20 +2186,59 @@ OBJECT_EDITOR_HTML = """
             .catch(error => {
                 showStatus('Error: ' + error.message, 'error');
             });
+        }
+        
+        function streamUpload(uploadId) {
+            const logOutput = document.getElementById('log-output');
+            const progressFill = document.getElementById('progress-fill');
+            const progressText = document.getElementById('progress-text');
+            const events = new EventSource(`/api/jobs/${uploadId}/events`);
+            
+            const log = message => {
+                logOutput.innerHTML += message + '<br>';
+                logOutput.scrollTop = logOutput.scrollHeight;
+            };
             
-            // Simulate progress updates
-            let progress = 0;
-            const interval = setInterval(() => {
-                progress += 10;
-                if (progress <= 90) {
-                    progressFill.style.width = progress + '%';
-                    progressText.textContent = progress + '% Complete';
-                    logOutput.innerHTML += `Processing batch ${progress/10} of 10...<br>`;
-                    logOutput.scrollTop = logOutput.scrollHeight;
+            events.addEventListener('stage', event => log(JSON.parse(event.data).message));
+            events.addEventListener('error', event => {
+                if (event.data) {
+                    log(JSON.parse(event.data).message);
+                }
+            });
+            events.addEventListener('progress', event => {
+                const progress = JSON.parse(event.data);
+                let message = `Processed chunk ${progress.chunks_done} of ${progress.chunks}: ` +
+                    `${progress.processed}/${progress.total} records, ${progress.failed} failed ` +
+                    `(${progress.records_per_second} records/sec`;
+                if (progress.eta_seconds) {
+                    message += `, about ${Math.round(progress.eta_seconds)}s left`;
+                }
+                log(message + ')');
+                if (progress.total) {
+                    const percent = Math.round(progress.processed * 100 / progress.total);
+                    progressFill.style.width = percent + '%';
+                    progressText.textContent = percent + '% Complete';
+                }
+            });
+            events.addEventListener('end', event => {
+                events.close();
+                const upload = JSON.parse(event.data);
+                const result = upload.result || {error: upload.error};
+                (result.failures || []).slice(0, 20).forEach(failure => {
+                    log(`Row ${failure.row}: ${failure.error}`);
+                });
+                if (upload.status === 'completed') {
+                    progressFill.style.width = '100%';
+                    progressText.textContent = '100% Complete';
+                    showStatus(`Upload completed: ${result.processed} records ` +
+                               `(${result.created || 0} created, ${result.updated || 0} updated)`, 'success');
+                } else if (upload.status === 'cancelled') {
+                    showStatus('Upload cancelled', 'error');
                 } else {
-                    clearInterval(interval);
+                    showStatus('Upload failed: ' + (result.error ||
+                               `${result.failed} of ${result.total} records failed`), 'error');
                 }
-            }, 500);
+            });
         }
         
         function showStatus(message, type) {
@@ -2289,8 +2369,7 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
             }
             
             try:
-                import pandas as pd
-                xl = pd.ExcelFile(workbook)
+                from app.services.workbook_cache import workbook_cache
                 
                 # Map of object names to sheet names
                 sheet_mapping = {
@@ -2306,10 +2385,10 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
                     # Add more mappings as needed
                 }
                 
+                sheets = run_blocking(workbook_cache.get_sheets, workbook, list(sheet_mapping.values()))
                 for obj_name, sheet_name in sheet_mapping.items():
-                    if sheet_name in xl.sheet_names:
-                        df = pd.read_excel(xl, sheet_name=sheet_name)
-                        response['counts'][obj_name] = len(df)
+                    if sheet_name in sheets:
+                        response['counts'][obj_name] = len(sheets[sheet_name])
                     else:
                         response['counts'][obj_name] = 0
                         
@@ -2335,7 +2414,9 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
                 return
             
             try:
-                import pandas as pd
+                from app.services.workbook_cache import workbook_cache
+                from app.services.sheet_query import (parse_view_params, query_sheet, frame_to_records,
+                                                      distinct_values, SheetQueryError)
                 
                 # Object to sheet mapping - corrected based on actual sheet names
                 sheet_mapping = {
@@ -2397,30 +2478,43 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
                                 'error': f'Workbook not found: {workbook}'
                             }
                         else:
-                            # Read the Excel sheet
-                            df = pd.read_excel(workbook, sheet_name=sheet_name)
+                            options = parse_view_params(query_params)
+                            
+                            # Read the Excel sheet (served from the parsed-workbook cache)
+                            df = run_blocking(workbook_cache.get_sheet, workbook, sheet_name)
                             
                             # Remove asterisks from column names if present
                             df.columns = df.columns.str.replace('*', '', regex=False)
                             
-                            # Convert DataFrame to list of dictionaries
-                            records = df.to_dict('records')
-                            
-                            # Convert NaN values to None for proper JSON serialization
-                            for record in records:
-                                for key, value in record.items():
-                                    if pd.isna(value):
-                                        record[key] = None
-                                    elif isinstance(value, (pd.Timestamp, pd.DatetimeTZDtype)):
-                                        record[key] = str(value)
-                            
-                            response = {
-                                'success': True,
-                                'data': records,
-                                'workbook': workbook,
-                                'sheet': sheet_name,
-                                'message': f'Loaded {len(records)} records from {sheet_name}'
-                            }
+                            if options['distinct']:
+                                # Values for a column filter picker, over the whole sheet
+                                response = {
+                                    'success': True,
+                                    'column': options['distinct'],
+                                    'values': distinct_values(df, options['distinct']),
+                                    'sheet': sheet_name
+                                }
+                            else:
+                                page, total = query_sheet(df, options)
+                                
+                                # NaN -> None for proper JSON serialization
+                                records = frame_to_records(page)
+                                
+                                response = {
+                                    'success': True,
+                                    'data': records,
+                                    'total': total,
+                                    'offset': options['offset'],
+                                    'limit': options['limit'],
+                                    'workbook': workbook,
+                                    'sheet': sheet_name,
+                                    'message': f'Loaded {len(records)} of {total} records from {sheet_name}'
+                                }
+                    except SheetQueryError as e:
+                        response = {
+                            'success': False,
+                            'error': str(e)
+                        }
                     except ValueError as e:
                         # Sheet doesn't exist
                         response = {
@@ -2449,8 +2543,10 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
+            if 'total' in response:
+                self.send_header('X-Total-Count', str(response['total']))
             self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.wfile.write(json.dumps(response, default=str).encode())
         
         elif parsed_path.path == '/api/workbook/open':
             # Open workbook in system's default application
@@ -2459,42 +2555,133 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({'success': False, 'error': 'Not implemented'}).encode())
         
-        elif parsed_path.path.startswith('/api/sync/progress/'):
-            # Get progress for a sync session
-            session_id = parsed_path.path.split('/')[-1]
-            progress_file = f"/tmp/sync_progress_{session_id}.json"
-            result_file = f"/tmp/sync_result_{session_id}.json"
+        elif parsed_path.path.startswith('/api/upload/status/'):
+            # Get status and new events of a background upload
+            from app.services.job_runner import job_runner
+            upload_id = parsed_path.path.split('/')[-1]
+            since = parse_qs(parsed_path.query).get('since', ['0'])[0]
+            if not since.isdigit():
+                self.send_response(400)
+                self.send_header('Content-type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'error': 'since must be an event number'}).encode())
+                return
+            response = job_runner.status(upload_id, int(since))
             
-            response = {}
+            self.send_response(200 if response else 404)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(response or {'error': 'Unknown upload'}, default=str).encode())
+        
+        elif parsed_path.path.startswith('/api/sync/progress/'):
+            # Get progress for a sync job
+            from app.services.job_runner import job_runner
+            job = job_runner.status(parsed_path.path.split('/')[-1])
             
-            # Check if sync is complete
-            if os.path.exists(result_file):
-                with open(result_file, 'r') as f:
-                    result = json.load(f)
+            if job is None:
                 response = {
-                    'status': 'completed',
-                    'result': result
+                    'status': 'unknown',
+                    'message': 'Sync not found'
                 }
-                # Clean up files
-                try:
-                    os.remove(progress_file)
-                    os.remove(result_file)
-                except:
-                    pass
-            elif os.path.exists(progress_file):
-                # Read progress
-                with open(progress_file, 'r') as f:
-                    response = json.load(f)
-            else:
+            elif job['status'] == 'queued':
                 response = {
                     'status': 'initializing',
-                    'message': 'Preparing sync...'
+                    'message': 'Waiting for another job to finish...'
+                }
+            elif job['status'] == 'running':
+                # The job's own status: the sync's last progress event may already say
+                # 'completed' before its result is stored
+                if job['progress']:
+                    response = dict(job['progress'], status='syncing')
+                else:
+                    response = {
+                        'status': 'initializing',
+                        'message': 'Preparing sync...'
+                    }
+            else:
+                response = {
+                    'status': job['status'],
+                    'result': job['result'],
+                    'error': job['error']
                 }
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
+            self.wfile.write(json.dumps(response, default=str).encode())
+        
+        elif parsed_path.path.startswith('/api/jobs/') and parsed_path.path.endswith('/events'):
+            # Server-Sent Events stream of a job's progress, ending with its result
+            from app.services.job_runner import job_runner
+            job = job_runner.get(parsed_path.path.split('/')[-2])
+            if job is None:
+                self.send_error(404, "Job not found")
+                return
+            
+            last_event_id = self.headers.get('Last-Event-ID')
+            query_since = parse_qs(parsed_path.query).get('since', ['0'])[0]
+            if last_event_id is not None and last_event_id.isdigit():
+                since = int(last_event_id) + 1
+            elif query_since.isdigit():
+                since = int(query_since)
+            else:
+                since = 0
+            
+            def job_events():
+                for item in job.stream(since, stop=shutdown_event):
+                    if item is None:
+                        yield None
+                    else:
+                        number, event = item
+                        yield number, event.get('type', 'message'), event
+                final = job.snapshot()
+                yield final['next_event'], 'end', {
+                    'status': final['status'],
+                    'result': final['result'],
+                    'error': final['error']
+                }
+            
+            send_event_stream(self, job_events())
+        
+        elif parsed_path.path == '/api/diff':
+            # Dry-run upsert preview: workbook sheet vs the org's records
+            query_params = parse_qs(parsed_path.query)
+            object_name = query_params.get('object', [''])[0]
+            
+            if not object_name:
+                self.send_response(400)
+                self.send_header('Content-type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'success': False, 'error': 'No object specified'}).encode())
+                return
+            
+            from app.services.diff_engine import diff_workbook_sheet
+            try:
+                limit = int(query_params.get('limit', ['100'])[0])
+                response = diff_workbook_sheet(
+                    query_params.get('org', [org])[0], object_name, workbook,
+                    sheet_name=query_params.get('sheet', [None])[0],
+                    key_field=query_params.get('key', [None])[0],
+                    refresh=query_params.get('refresh', ['0'])[0] in ('1', 'true'),
+                    limit=limit
+                )
+            except Exception as e:
+                response = {'success': False, 'error': str(e)}
+            
+            self.send_response(200 if response['success'] else 400)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(response, default=str).encode())
+        
+        elif parsed_path.path == '/api/jobs':
+            # Recent and running background jobs
+            from app.services.job_runner import job_runner
+            kind = parse_qs(parsed_path.query).get('kind', [None])[0]
+            
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'jobs': job_runner.list_jobs(kind)}, default=str).encode())
         
         else:
             self.send_error(404, "Page not found")
@@ -2506,33 +2693,47 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
             data = json.loads(post_data.decode('utf-8'))
             
             object_name = data.get('object')
+            objects = data.get('objects') if isinstance(data.get('objects'), list) else None
             use_template = data.get('useTemplate', True)
             org = data.get('org', 'fortradp2')
             
-            # Execute the actual upload command
-            uploader_script = str(PROJECT_ROOT / "src/data-processing/revenue_cloud_data_uploader.py")
+            status = 200
             if use_template:
-                cmd = f"python3 {uploader_script} --org {org} --object {object_name} --data-file {workbook}"
+                data_file = workbook
             else:
-                # Handle custom file upload
-                cmd = f"python3 {uploader_script} --org {org} --object {object_name}"
+                # Only files the file upload service saved, never arbitrary server paths
+                from app.services.file_upload_service import file_upload_service
+                data_file = file_upload_service.saved_upload_path(data.get('dataFile'))
             
-            try:
-                # Run the command
-                result = subprocess.run(cmd.split(), capture_output=True, text=True)
-                
-                response = {
-                    'success': result.returncode == 0,
-                    'output': result.stdout,
-                    'error': result.stderr if result.returncode != 0 else None
-                }
-            except Exception as e:
+            if not (object_name or objects) or not data_file:
+                status = 400
                 response = {
                     'success': False,
-                    'error': str(e)
+                    'error': 'object (or objects) and an uploaded data file are required'
                 }
+            else:
+                # Runs on the background job pool; progress via /api/upload/status/<id>.
+                # Several objects load in dependency waves, deferred references in a second pass
+                from app.services.upload_pipeline import start_plan_upload, start_upload
+                options = {option: True for option, flag in (('changed_only', 'changedOnly'), ('deltas_only', 'deltasOnly'))
+                           if data.get(flag)}
+                try:
+                    if objects:
+                        job, created = start_plan_upload(org, objects, data_file, **options)
+                    else:
+                        job, created = start_upload(org, object_name, data_file, **options)
+                    response = {
+                        'success': True,
+                        'upload_id': job.id,
+                        'message': 'Upload started' if created else 'Upload already running'
+                    }
+                except Exception as e:
+                    response = {
+                        'success': False,
+                        'error': str(e)
+                    }
             
-            self.send_response(200)
+            self.send_response(status)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
             self.wfile.write(json.dumps(response).encode())
@@ -2545,29 +2746,30 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
             org = data.get('org', 'fortradp2')
             action = data.get('action', 'sync_all')
             
-            # Generate unique session ID for this sync
-            import uuid
-            session_id = str(uuid.uuid4())
-            progress_file = f"/tmp/sync_progress_{session_id}.json"
-            result_file = f"/tmp/sync_result_{session_id}.json"
-            
-            # Start sync in background
-            sync_script = str(PROJECT_ROOT / "src/data-processing/revenue_cloud_sync.py")
-            cmd = [
-                'python3', sync_script,
-                '--org', org,
-                '--workbook', workbook,
-                '--output-json', result_file,
-                '--progress-file', progress_file
-            ]
-            
-            # Start process in background
-            subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # Runs on the background job pool; an identical running sync is reused
+            from app.data.revenue_cloud_sync import start_sync
+            job, created = start_sync(org, workbook, data.get('objects'),
+                                      full_refresh=bool(data.get('full_refresh') or action == 'full_refresh'))
             
             response = {
                 'success': True,
-                'session_id': session_id,
-                'message': 'Sync started'
+                'session_id': job.id,
+                'message': 'Sync started' if created else 'Sync already running'
+            }
+            
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(response).encode())
+            
+        elif self.path.startswith('/api/jobs/') and self.path.endswith('/cancel'):
+            # Cancel a queued or running sync/upload job
+            from app.services.job_runner import job_runner
+            job_id = self.path.split('/')[-2]
+            cancelled = job_runner.cancel(job_id)
+            response = {
+                'success': cancelled,
+                'error': None if cancelled else 'Job not found or already finished'
             }
             
             self.send_response(200)
@@ -2634,10 +2836,16 @@ class RequestHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error(404, "Endpoint not found")
 
 def start_server():
-    with socketserver.TCPServer(("", PORT), RequestHandler) as httpd:
+    def on_start(httpd):
         print(f"Revenue Cloud Migration Tool running at http://localhost:{PORT}")
         print("Press Ctrl-C to stop the server")
-        httpd.serve_forever()
+    
+    def on_shutdown():
+        # Running syncs / uploads stop at their next checkpoint; their event streams end now
+        from app.services.job_runner import job_runner
+        job_runner.shutdown()
+    
+    serve(RequestHandler, "", PORT, on_start=on_start, on_shutdown=on_shutdown)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,129 @@
+"""
+Multipart Parser
+Streaming multipart/form-data parsing; file parts are written out chunk by chunk
+"""
+from email.parser import HeaderParser
+from typing import Callable, Dict, Iterator, Tuple
+
+from config.settings.app_config import CHUNK_SIZE
+
+MAX_FIELD_SIZE = 64 * 1024  # plain form fields are kept in memory
+MAX_PART_HEADER_SIZE = 16 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # body bytes allowed beyond the file itself (delimiters, fields)
+
+
+class MultipartError(ValueError):
+    """Malformed or truncated multipart body"""
+
+
+def get_boundary(content_type: str) -> bytes:
+    """Extract the boundary from a multipart/form-data Content-Type header"""
+    message = HeaderParser().parsestr(f'Content-Type: {content_type}\r\n\r\n')
+    if message.get_content_type() != 'multipart/form-data':
+        raise MultipartError('Invalid content type')
+    boundary = message.get_param('boundary')
+    if not boundary or len(boundary) > 200:
+        raise MultipartError('Missing multipart boundary')
+    return boundary.encode('latin-1')
+
+
+def _read_body(rfile, content_length: int, chunk_size: int) -> Iterator[bytes]:
+    """Yield exactly content_length bytes from the request stream"""
+    remaining = content_length
+    while remaining > 0:
+        chunk = rfile.read(min(chunk_size, remaining))
+        if not chunk:
+            raise MultipartError('Request body ended early')
+        remaining -= len(chunk)
+        yield chunk
+
+
+def parse_multipart(rfile, content_type: str, content_length: int,
+                    open_file: Callable[[str, str], object],
+                    chunk_size: int = CHUNK_SIZE) -> Tuple[Dict[str, str], Dict[str, Dict]]:
+    """
+    Parse a multipart/form-data request body without buffering file contents
+
+    open_file(field_name, filename) is called for each non-empty file part and must
+    return an object with write(bytes); file data is passed to it in chunks of at most
+    chunk_size. Returns (fields, files) where files maps field name to
+    {'filename', 'size', 'target'}. Exceptions raised by the target propagate.
+    """
+    delimiter = b'--' + get_boundary(content_type)
+    separator = b'\r\n' + delimiter
+    body = _read_body(rfile, content_length, chunk_size)
+    buffer = bytearray()
+    fields: Dict[str, str] = {}
+    files: Dict[str, Dict] = {}
+
+    def fill():
+        chunk = next(body, None)
+        if chunk is None:
+            raise MultipartError('Request body ended early')
+        buffer.extend(chunk)
+
+    # Skip the preamble up to the first delimiter
+    while True:
+        index = buffer.find(delimiter)
+        if index >= 0:
+            del buffer[:index + len(delimiter)]
+            break
+        del buffer[:max(0, len(buffer) - len(delimiter))]
+        fill()
+
+    while True:
+        while len(buffer) < 2:
+            fill()
+        if buffer[:2] == b'--':
+            break  # closing delimiter
+        if buffer[:2] != b'\r\n':
+            raise MultipartError('Malformed multipart delimiter')
+        del buffer[:2]
+
+        # Part headers
+        while True:
+            end = buffer.find(b'\r\n\r\n')
+            if end >= 0:
+                break
+            if len(buffer) > MAX_PART_HEADER_SIZE:
+                raise MultipartError('Multipart part headers too large')
+            fill()
+        headers = HeaderParser().parsestr(buffer[:end].decode('utf-8', 'replace') + '\r\n\r\n')
+        del buffer[:end + 4]
+
+        name = headers.get_param('name', header='content-disposition')
+        filename = headers.get_filename()
+        if filename is not None:
+            # Browsers send an empty filename when no file was chosen
+            target = open_file(name, filename) if filename else None
+            part = files[name] = {'filename': filename, 'size': 0, 'target': target}
+        else:
+            value = bytearray()
+
+        # Part body, streamed up to the next delimiter
+        while True:
+            index = buffer.find(separator)
+            ready = index if index >= 0 else max(0, len(buffer) - len(separator) + 1)
+            if ready:
+                if filename is None:
+                    if len(value) + ready > MAX_FIELD_SIZE:
+                        raise MultipartError(f"Form field '{name}' too large")
+                    value.extend(buffer[:ready])
+                else:
+                    if target is not None:
+                        target.write(bytes(buffer[:ready]))
+                    part['size'] += ready
+                del buffer[:ready]
+            if index >= 0:
+                del buffer[:len(separator)]
+                break
+            fill()
+
+        if filename is None and name is not None:
+            fields[name] = value.decode('utf-8', 'replace')
+
+    # Drain the epilogue so the whole request has been consumed
+    for _ in body:
+        pass
+
+    return fields, files
@@ -4,7 +4,7 @@ Simple working server implementation
 """
 import sys
 import os
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
 import json
 from urllib.parse import urlparse
 import uuid
@@ -15,7 +15,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspa
 from app.services.connection_manager import connection_manager
 from app.services.session_manager import session_manager
 from app.services.file_upload_service import file_upload_service
-from config.settings.app_config import HOST, PORT, TEMPLATES_ROOT, STATIC_ROOT
+from app.services.workbook_cache import workbook_cache
+from app.services.sheet_query import parse_view_params, query_sheet, frame_to_records, distinct_values, SheetQueryError
+from app.web.http_core import serve, run_blocking
+from app.web.multipart import parse_multipart, MULTIPART_OVERHEAD
+from config.settings.app_config import HOST, PORT, TEMPLATES_ROOT, STATIC_ROOT, MAX_UPLOAD_SIZE_MB
 
 class SimpleHandler(BaseHTTPRequestHandler):
     """Simple request handler without complex inheritance"""
@@ -212,7 +216,7 @@ class SimpleHandler(BaseHTTPRequestHandler):
             
             # Set active connection
             session = session_manager.get_session(session_id)
-            connection_manager.set_active_connection(session, connection_id)
+            run_blocking(connection_manager.set_active_connection, session, connection_id)
             
             # Send response with session cookie
             response = {
@@ -273,13 +277,15 @@ class SimpleHandler(BaseHTTPRequestHandler):
             print(f"Error adding connection: {e}")
             self.send_error(500)
     
-    def send_json_response(self, data):
+    def send_json_response(self, data, headers=None):
         """Send JSON response"""
         try:
-            content = json.dumps(data).encode()
+            content = json.dumps(data, default=str).encode()
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.send_header('Content-Length', len(content))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
             self.end_headers()
             self.wfile.write(content)
         except Exception as e:
@@ -374,34 +380,44 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 })
                 return
             
-            # For simple implementation, we'll use cgi module
-            import cgi
-            from io import BytesIO
+            content_length = int(self.headers.get('Content-Length', 0) or 0)
+            if content_length > file_upload_service.max_size + MULTIPART_OVERHEAD:
+                self.send_json_response({
+                    'success': False,
+                    'error': f"File too large. Maximum size: {MAX_UPLOAD_SIZE_MB}MB"
+                })
+                return
             
-            # Create environment for cgi
-            environ = {
-                'REQUEST_METHOD': 'POST',
-                'CONTENT_TYPE': content_type,
-                'CONTENT_LENGTH': self.headers.get('Content-Length', '0')
-            }
+            # Stream the body; the file part goes straight to disk
+            writers = []
             
-            # Parse form data
-            form = cgi.FieldStorage(
-                fp=self.rfile,
-                headers=self.headers,
-                environ=environ
-            )
+            def open_file(field_name, filename):
+                if field_name != 'file' or writers:
+                    return None
+                writer = file_upload_service.open_upload(filename, session_id)
+                writers.append(writer)
+                return writer
+            
+            try:
+                form, files = parse_multipart(self.rfile, content_type, content_length, open_file)
+            except Exception as e:
+                for writer in writers:
+                    writer.discard()
+                self.send_json_response({
+                    'success': False,
+                    'error': str(e)
+                })
+                return
             
             # Get file and form fields
-            if 'file' not in form:
+            if 'file' not in files:
                 self.send_json_response({
                     'success': False,
                     'error': 'No file provided'
                 })
                 return
             
-            file_item = form['file']
-            if not file_item.filename:
+            if not writers:
                 self.send_json_response({
                     'success': False,
                     'error': 'No file selected'
@@ -409,33 +425,21 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 return
             
             # Get other form fields
-            object_name = form.getvalue('object', '')
-            operation = form.getvalue('operation', 'upsert')
-            external_id = form.getvalue('externalId', '')
+            object_name = form.get('object', '')
+            operation = form.get('operation', 'upsert')
+            external_id = form.get('externalId', '')
             
             if not object_name:
+                writers[0].discard()
                 self.send_json_response({
                     'success': False,
                     'error': 'Object name required'
                 })
                 return
             
-            # Read file data
-            file_data = file_item.file.read()
-            filename = file_item.filename
-            
-            # Validate file
-            valid, error = file_upload_service.validate_file(filename, len(file_data))
-            if not valid:
-                self.send_json_response({
-                    'success': False,
-                    'error': error
-                })
-                return
-            
-            # Save and process file
-            success, result = file_upload_service.save_upload(
-                file_data, filename, object_name, session_id
+            # Move into place and build the preview
+            success, result = run_blocking(
+                file_upload_service.finish_upload, writers[0], object_name, session_id
             )
             
             if success:
@@ -524,7 +528,7 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 return
             
             # Test the connection
-            success, result = connection_manager.test_connection(connection_id)
+            success, result = run_blocking(connection_manager.test_connection, connection_id)
             
             if success:
                 self.send_json_response({
@@ -618,8 +622,6 @@ class SimpleHandler(BaseHTTPRequestHandler):
             cookie = self.headers.get('Cookie', '')
             session_id = session_manager.get_session_cookie(cookie)
             
-            # Import pandas for Excel reading
-            import pandas as pd
             import os
             
             # Path to the main workbook - use absolute path from server location
@@ -684,37 +686,47 @@ class SimpleHandler(BaseHTTPRequestHandler):
                 return
             
             try:
+                # Paging / sort / projection / filter options
+                options = parse_view_params(params)
+                
                 # Read the specific sheet
-                print(f"Reading sheet {sheet_name} from {workbook_path}")
-                df = pd.read_excel(workbook_path, sheet_name=sheet_name)
-                print(f"Successfully read {len(df)} rows")
+                df = run_blocking(workbook_cache.get_sheet, workbook_path, sheet_name)
                 
                 # Remove any rows that are completely empty
                 df = df.dropna(how='all')
                 
-                # Convert to records format
-                records = df.to_dict('records')
+                if options['distinct']:
+                    # Values for a column filter picker, over the whole sheet
+                    self.send_json_response({
+                        'success': True,
+                        'column': options['distinct'],
+                        'values': distinct_values(df, options['distinct']),
+                        'object': object_name,
+                        'sheet': sheet_name
+                    })
+                    return
                 
-                # Clean up the records (remove NaN values)
-                cleaned_records = []
-                for record in records:
-                    cleaned_record = {}
-                    for key, value in record.items():
-                        if pd.notna(value):
-                            cleaned_record[key] = value
-                    if cleaned_record:  # Only add if record has data
-                        cleaned_records.append(cleaned_record)
+                page, total = query_sheet(df, options)
                 
-                print(f"Returning {len(cleaned_records)} cleaned records")
+                # Convert to records, leaving out empty cells
+                records = frame_to_records(page, drop_nulls=True)
                 
                 self.send_json_response({
                     'success': True,
-                    'data': cleaned_records,
+                    'data': records,
+                    'total': total,
+                    'offset': options['offset'],
+                    'limit': options['limit'],
                     'object': object_name,
                     'sheet': sheet_name,
                     'workbook': os.path.basename(workbook_path)
-                })
+                }, headers={'X-Total-Count': total})
                 
+            except SheetQueryError as e:
+                self.send_json_response({
+                    'success': False,
+                    'error': str(e)
+                })
             except Exception as e:
                 print(f"Error reading sheet {sheet_name}: {e}")
                 import traceback
@@ -792,7 +804,6 @@ class SimpleHandler(BaseHTTPRequestHandler):
     def handle_get_object_counts(self):
         """Get actual record counts from workbook"""
         try:
-            import pandas as pd
             import os
             
             # Path to the main workbook
@@ -836,20 +847,16 @@ class SimpleHandler(BaseHTTPRequestHandler):
                     'AttributeBasedAdjustment': '24_AttributeBasedAdj'
                 }
                 
-                # Read workbook once
-                xl_file = pd.ExcelFile(workbook_path)
+                # Read all mapped sheets through the shared cache
+                sheets = run_blocking(workbook_cache.get_sheets, workbook_path, list(sheet_mapping.values()))
                 
                 # First, get counts for all mapped objects
                 for api_name, sheet_name in sheet_mapping.items():
-                    try:
-                        if sheet_name in xl_file.sheet_names:
-                            df = pd.read_excel(xl_file, sheet_name=sheet_name)
-                            # Remove empty rows
-                            df_clean = df.dropna(how='all')
-                            counts[api_name] = len(df_clean)
-                        else:
-                            counts[api_name] = 0
-                    except:
+                    df = sheets.get(sheet_name)
+                    if df is not None:
+                        # Remove empty rows
+                        counts[api_name] = len(df.dropna(how='all'))
+                    else:
                         counts[api_name] = 0
                 
                 # Add 0 counts for objects without sheet mappings
@@ -873,7 +880,7 @@ class SimpleHandler(BaseHTTPRequestHandler):
         """Custom log format"""
         print(f"{self.address_string()} - {format % args}")
 
-def main():
+def run_server():
     """Run the server"""
     print(f"""
 ╔══════════════════════════════════════════════════════════╗
@@ -884,16 +891,14 @@ def main():
 ╚══════════════════════════════════════════════════════════╝
     """)
     
-    server = HTTPServer((HOST, PORT), SimpleHandler)
-    
     try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print("\n\nShutting down server...")
-        server.shutdown()
+        serve(SimpleHandler, HOST, PORT)
     except Exception as e:
         print(f"Server error: {e}")
-        server.shutdown()
+
+def main():
+    """Command-line entry point"""
+    run_server()
 
 if __name__ == "__main__":
     # Kill any existing servers first
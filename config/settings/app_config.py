@@ -37,24 +37,91 @@ DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 HOST = os.getenv('HOST', '127.0.0.1')
 PORT = int(os.getenv('PORT', '8080'))
 
+# Web server concurrency
+WEB_MAX_WORKERS = int(os.getenv('WEB_MAX_WORKERS', '16'))  # concurrent requests
+WEB_MAX_QUEUED = 64  # accepted requests waiting for a worker
+BLOCKING_MAX_WORKERS = int(os.getenv('BLOCKING_MAX_WORKERS', '4'))  # concurrent parses / CLI calls
+
 # Session settings
 SESSION_LIFETIME_HOURS = 12
 SESSION_COOKIE_NAME = 'rcm_session'
 SESSION_COOKIE_SECURE = not DEBUG  # Secure in production
 SESSION_COOKIE_HTTPONLY = True
+SESSION_STORE = os.getenv('SESSION_STORE', 'file')  # 'file' (in-memory + JSON files) or 'sqlite'
+SESSION_DB_PATH = SESSIONS_DIR / 'sessions.db'
+SESSION_FLUSH_INTERVAL = 2  # seconds between write-behind flushes
+SESSION_TOUCH_INTERVAL = 60  # seconds before a SQLite session's last_accessed is rewritten
 
 # Salesforce CLI settings
 DEFAULT_CLI_TIMEOUT = 300  # 5 minutes for long operations
 CLI_COMMAND = 'sf'  # or 'sfdx' for older CLI
 
+# Salesforce API throttling - requests per second and burst size per org alias
+ORG_RATE_LIMITS = {
+    'default': {'rate': 2.0, 'burst': 4},
+}
+API_MAX_RETRIES = 4
+
+# Salesforce REST / Bulk API settings
+SALESFORCE_API_VERSION = '64.0'
+API_TIMEOUT = 120  # seconds per HTTP request
+API_POOL_SIZE = 10  # keep-alive connections per org
+API_CLIENT_RETRY_INTERVAL = 60  # seconds before retrying an org whose API token couldn't be fetched
+BULK_POLL_INTERVAL = 2  # initial seconds between Bulk job status polls
+BULK_JOB_TIMEOUT = 1800  # 30 minutes
+BULK_JOURNAL_DB = DATA_ROOT / 'bulk_jobs.db'  # chunk/job journal and per-record results
+BULK_CHUNK_ROWS = int(os.getenv('BULK_CHUNK_ROWS', '10000'))  # max rows per ingest job
+BULK_CHUNK_MB = 100  # max CSV size per ingest job (the API allows 150 MB)
+BULK_MAX_CONCURRENT_JOBS = int(os.getenv('BULK_MAX_CONCURRENT_JOBS', '4'))
+ID_CROSSWALK_DB = DATA_ROOT / 'id_crosswalk.db'  # external id -> Salesforce Id per org and object
+FINGERPRINTS_DIR = DATA_ROOT / 'fingerprints'  # sheet fingerprint stores, one per workbook / CSV directory
+
+# Sync settings
+SYNC_MAX_WORKERS = int(os.getenv('SYNC_MAX_WORKERS', '4'))
+SYNC_STATE_FILE = DATA_ROOT / 'sync_state.json'  # incremental sync watermarks
+
+# sObject describe cache
+DESCRIBE_CACHE_DIR = DATA_ROOT / 'describe_cache'
+DESCRIBE_CACHE_TTL = int(os.getenv('DESCRIBE_CACHE_TTL', '3600'))  # seconds before revalidating
+
+# Org Id snapshots used for referential integrity checks
+ORG_ID_SNAPSHOT_TTL = int(os.getenv('ORG_ID_SNAPSHOT_TTL', '900'))  # seconds before re-querying an object
+
+# Org record snapshots used for workbook diffs
+ORG_RECORD_SNAPSHOT_TTL = int(os.getenv('ORG_RECORD_SNAPSHOT_TTL', '900'))  # seconds before re-querying an object
+DIFF_RESULT_LIMIT = 500  # rows listed per category in a diff (counts cover all rows)
+
 # File upload settings
 MAX_UPLOAD_SIZE_MB = 100
 ALLOWED_EXTENSIONS = {'.xlsx', '.csv', '.xls'}
 CHUNK_SIZE = 1024 * 1024  # 1MB chunks
 
+# Workbook cache settings
+WORKBOOK_CACHE_MAX_MB = int(os.getenv('WORKBOOK_CACHE_MAX_MB', '256'))
+WORKBOOK_CACHE_MAX_SHEETS = 64
+MAX_VIEW_PAGE_SIZE = 5000  # rows per /api/workbook/view page
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '4'))  # sheets written concurrently by the CSV exporter
+
+# Load planning
+LOAD_PLAN_WORKERS = int(os.getenv('LOAD_PLAN_WORKERS', '4'))  # objects of one wave loaded concurrently
+
+# JSON tree import files
+TREE_FILE_MAX_RECORDS = 200  # records per file (the sObject Tree API limit)
+TREE_GENERATOR_WORKERS = int(os.getenv('TREE_GENERATOR_WORKERS', '4'))  # objects generated concurrently
+
+# Background jobs (sync, upload)
+JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', '2'))  # jobs running at once; the rest queue
+JOB_RESULT_TTL = 3600  # seconds a finished job's status and result stay available
+JOB_MAX_RETAINED = 100  # finished jobs kept at most
+JOB_MAX_EVENTS = 500  # progress events kept per job
+
 # Connection settings
 MAX_SAVED_CONNECTIONS = 10
 CONNECTION_FILE = CONNECTIONS_DIR / 'connections.json'
+CONNECTION_HEALTH_TTL = 300  # seconds a connection status is considered fresh
+CONNECTION_HEALTH_INTERVAL = 60  # seconds between background health sweeps
+CONNECTION_HEALTH_WORKERS = 4  # connections checked concurrently
+CONNECTION_SAVE_DELAY = 1.0  # seconds to coalesce connection file writes
 
 # Logging settings
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')